@@ -0,0 +1,25 @@
+"""
+運勢をtell_fortune()で1回ずつ抽選する方式と、tell_fortunes()でまとめて抽選する方式とを比較
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/bulk_fortune_bench.py`
+"""
+from common import setup_django, measure
+
+setup_django()
+
+from fortune_telling.fortune import tell_fortune, tell_fortunes, count_fortunes  # noqa: E402
+
+DRAWS = 1_000_000
+
+
+def main():
+    weights = (1, 2, 7)
+    print(f'draws per call: {DRAWS:,}')
+    measure('tell_fortune() x N', lambda: [tell_fortune() for _ in range(DRAWS)], number=5)
+    measure('tell_fortunes(N)', lambda: tell_fortunes(DRAWS), number=5)
+    measure('tell_fortunes(N, weights)', lambda: tell_fortunes(DRAWS, weights), number=5)
+    measure('count_fortunes(N, weights)', lambda: count_fortunes(DRAWS, weights), number=5)
+
+
+if __name__ == '__main__':
+    main()
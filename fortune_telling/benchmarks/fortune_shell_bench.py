@@ -0,0 +1,46 @@
+"""
+おみくじ1回あたりの転送量・サーバのCPU時間について、結果画面全体を返す方式と
+キャッシュ済みの外枠へ運勢のみのJSONを返す方式とを比較
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/fortune_shell_bench.py`
+"""
+from common import setup_django, measure
+
+setup_django()
+
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from fortune_telling import views  # noqa: E402
+
+
+def response_bytes(response) -> int:
+    """
+    ステータス行を除くヘッダ・ボディのバイト数
+
+    :param response: HTTPレスポンス
+    :return: バイト数
+    """
+    return len(response.serialize_headers()) + len(response.content)
+
+
+def main():
+    client = Client(HTTP_HOST='localhost')
+    page_url = reverse('おみくじ:結果')
+    draw_url = reverse('おみくじ:抽選')
+
+    page = client.get(page_url)
+    draw = client.get(draw_url)
+    shell = client.get(views.shell_url())
+    print(f'full page per draw:       {response_bytes(page):6,} B')
+    print(f'JSON per draw:            {response_bytes(draw):6,} B')
+    print(f'shell (cached once):      {response_bytes(shell):6,} B')
+    print(f'bytes per draw reduction: {1 - response_bytes(draw) / response_bytes(page):.1%}')
+
+    # ミドルウェアを含めたリクエストあたりのCPU時間
+    measure('full page request', lambda: client.get(page_url), number=5_000)
+    measure('JSON draw request', lambda: client.get(draw_url), number=5_000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+CDNのTailwind CSSスクリプトを読み込む方式と、build_tailwind_cssコマンドで生成したスタイルシートを読み込む方式とで
+画面の描画までに必要な転送量を比較
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/page_weight_bench.py`
+CDNのスクリプトを取得できない環境では `--cdn-bytes` でサイズを指定する
+"""
+import argparse
+import gzip
+import re
+import urllib.request
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+
+from fortune_telling import tailwind  # noqa: E402
+
+CDN_URL = 'https://cdn.tailwindcss.com'
+CDN_SCRIPT = f'<script src="{CDN_URL}"></script>'
+STYLESHEET_LINK_RE = re.compile(r'<link rel="stylesheet" href="[^"]*tailwind\.[0-9a-f]+\.css">')
+
+
+def fetch_cdn_bytes() -> tuple[int, int]:
+    """
+    CDNのスクリプトのサイズを取得
+
+    :return: 圧縮前・gzip圧縮後のサイズ
+    """
+    with urllib.request.urlopen(CDN_URL, timeout=10) as response:
+        body = response.read()
+    return len(body), len(gzip.compress(body))
+
+
+def gzip_size(body: bytes) -> int:
+    """ gzip圧縮後のサイズ """
+    return len(gzip.compress(body, 9))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cdn-bytes', type=int, help='Size of the CDN script when it cannot be downloaded.')
+    args = parser.parse_args()
+
+    if args.cdn_bytes is not None:
+        cdn = (args.cdn_bytes, None)
+    else:
+        try:
+            cdn = fetch_cdn_bytes()
+        except OSError as e:
+            print(f'could not download {CDN_URL}: {e}')
+            cdn = (None, None)
+
+    stylesheet = (settings.STATICFILES_DIRS[0] / tailwind.stylesheet_name(
+        tailwind.build_stylesheet(tailwind.scan_classes())
+    )).read_bytes()
+
+    print(f'{"page":<14} {"before (HTML + CDN script)":>34} {"after (HTML + CSS)":>30}')
+    for template_name, context in (('index.html', {}), ('fortune.html', {'fortune': '大吉'})):
+        after_html = render_to_string(template_name, context).encode('utf-8')
+        before_html = STYLESHEET_LINK_RE.sub(CDN_SCRIPT, after_html.decode('utf-8')).encode('utf-8')
+
+        before = 'unknown' if cdn[0] is None else \
+            f'{len(before_html) + cdn[0]} B' + (f' ({gzip_size(before_html) + cdn[1]} B gzip)' if cdn[1] else '')
+        after = f'{len(after_html) + len(stylesheet)} B ({gzip_size(after_html) + gzip_size(stylesheet)} B gzip)'
+        print(f'{template_name:<14} {before:>34} {after:>30}')
+
+    # CDN方式では、ブラウザがスクリプトを実行してからスタイルを生成するまで描画できない
+    print('render-blocking: before = 1 script (compiles CSS on the main thread), after = 1 stylesheet, no script')
+
+    # 生成処理そのものはビルド時のみ実行される
+    measure('build_stylesheet(scan_classes())', lambda: tailwind.build_stylesheet(tailwind.scan_classes()), number=1000)
+
+
+if __name__ == '__main__':
+    main()
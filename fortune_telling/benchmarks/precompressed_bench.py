@@ -0,0 +1,42 @@
+"""
+トップ画面について、リクエストごとに描画・圧縮する方式と
+PrecompressedCacheで圧縮済みの本文を使い回す方式とを比較
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/precompressed_bench.py`
+"""
+from common import setup_django, measure
+
+setup_django()
+
+import gzip  # noqa: E402
+
+from django.http import HttpResponse  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from fortune_telling.precompressed import PAGE_CACHE  # noqa: E402
+from fortune_telling.views import index  # noqa: E402
+
+
+def compress_per_request() -> HttpResponse:
+    """ GZipMiddlewareと同様に、リクエストごとに描画・圧縮 """
+    response = HttpResponse(gzip.compress(render_to_string('index.html').encode('utf-8'), compresslevel=6))
+    response['Content-Encoding'] = 'gzip'
+    return response
+
+
+def main():
+    factory = RequestFactory()
+    gzip_request = factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+    identity_request = factory.get('/')
+
+    measure('index (render + gzip per request)', compress_per_request, number=10_000)
+    measure('index (precompressed, gzip)', lambda: index(gzip_request))
+    measure('index (precompressed, identity)', lambda: index(identity_request))
+
+    stats = PAGE_CACHE.stats()
+    print(f'hit ratio: {stats.hit_ratio:.4f}, bytes saved: {stats.bytes_saved} B, cache size: {stats.size} B')
+
+
+if __name__ == '__main__':
+    main()
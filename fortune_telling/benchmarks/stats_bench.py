@@ -0,0 +1,56 @@
+"""
+抽選回数を数えることによる、リクエストあたりのオーバーヘッドを計測
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/stats_bench.py`
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.test import RequestFactory  # noqa: E402
+
+from fortune_telling import views  # noqa: E402
+from fortune_telling.stats import DrawCounter  # noqa: E402
+
+THREADS = 8
+INCREMENTS_PER_THREAD = 200_000
+
+
+class NullCounter:
+    """ 何も数えないカウンタ 比較の基準とする """
+
+    def increment(self, fortune: str):
+        pass
+
+
+def main():
+    counter = DrawCounter()
+    request = RequestFactory().get('/')
+
+    measure('DrawCounter.increment', lambda: counter.increment('大吉'), number=1_000_000)
+    measure('DrawCounter.take_pending', counter.take_pending)
+
+    # 複数スレッドから同時に数えたときの1回あたりの所要時間
+    def draw():
+        for _ in range(INCREMENTS_PER_THREAD):
+            counter.increment('中吉')
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        started = time.perf_counter()
+        for future in [executor.submit(draw) for _ in range(THREADS)]:
+            future.result()
+        elapsed = time.perf_counter() - started
+    print(f'{"increment from " + str(THREADS) + " threads":<40} '
+          f'{elapsed / (THREADS * INCREMENTS_PER_THREAD) * 1_000_000:8.2f} us/call')
+
+    # view全体での比較
+    measure('fortune view (with counter)', lambda: views.fortune_telling(request))
+    views.DRAW_COUNTER = NullCounter()
+    measure('fortune view (without counter)', lambda: views.fortune_telling(request))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+config.asgi.applicationへServer-Sent Eventsの接続を多数同時に張り、接続あたりのメモリ使用量を計測
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/stream_soak_bench.py --connections 5000`
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from common import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+# DBを用意せずに済むよう、抽選回数の書き込みは止めておく
+settings.FORTUNE_STATS_FLUSH_INTERVAL = 0
+
+from config.asgi import application  # noqa: E402
+from fortune_telling import views  # noqa: E402
+from fortune_telling.stats import DRAW_COUNTER  # noqa: E402
+
+STREAM_PATH = '/fortune/fortune_telling/stats/stream/'
+
+
+async def connect(first_event: asyncio.Event, counter: dict):
+    """
+    SSEの接続を1つ張り、受け取ったイベントを数え続ける
+
+    :param first_event: 最初のイベントを受け取ったときにセットする
+    :param counter: 受け取ったイベントの数を集計する辞書
+    """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': STREAM_PATH, 'raw_path': STREAM_PATH.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # クライアントからは切断しない
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and message.get('body'):
+            counter['events'] += 1
+            first_event.set()
+
+    await application(scope, receive, send)
+
+
+async def run(connections: int, duration: float):
+    # 分布はプロセス内のカウンタから読み取る
+    async def snapshot():
+        return DRAW_COUNTER.pending()
+
+    views.DISTRIBUTION_BROADCASTER.snapshot = snapshot
+    views.DISTRIBUTION_BROADCASTER.interval = 0.1
+
+    counter = {'events': 0}
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    first_events = [asyncio.Event() for _ in range(connections)]
+    tasks = [asyncio.create_task(connect(first_event, counter)) for first_event in first_events]
+    started = time.perf_counter()
+    await asyncio.gather(*(first_event.wait() for first_event in first_events))
+    connected = time.perf_counter() - started
+
+    # 抽選が続くあいだ、間隔ごとにまとめて配信されるか
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            DRAW_COUNTER.increment('大吉')
+        await asyncio.sleep(0.01)
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    dropped = sum(subscription.dropped for subscription in views.DISTRIBUTION_BROADCASTER.subscribers)
+
+    print(f'connections: {connections:,} (all connected in {connected:.2f} s, slowed down by tracemalloc)')
+    print(f'memory per connection: {(current - before) / connections:,.0f} B (peak {(peak - before) / connections:,.0f} B)')
+    print(f'events delivered: {counter["events"]:,}, frames dropped for slow subscribers: {dropped:,}')
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.connections, args.duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+おみくじ結果画面について、リクエストごとにテンプレートを描画する方式と
+TemplateVariantCacheで描画済みのバイト列を使い回す方式とを比較
+
+実行方法: fortune_tellingディレクトリで `python benchmarks/variant_cache_bench.py`
+"""
+from common import setup_django, measure
+
+setup_django()
+
+from django.http import HttpResponse  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from fortune_telling.fortune import tell_fortune  # noqa: E402
+from fortune_telling.views import fortune_telling, index, FORTUNE_PAGE  # noqa: E402
+
+
+def main():
+    request = RequestFactory().get('/')
+
+    # テンプレートエンジンのみの比較
+    measure('render_to_string(fortune.html)', lambda: render_to_string('fortune.html', {'fortune': tell_fortune()}))
+    measure('TemplateVariantCache.get', lambda: FORTUNE_PAGE.get(tell_fortune()), number=1_000_000)
+
+    # view全体の比較
+    measure(
+        'fortune view (render per request)',
+        lambda: HttpResponse(render_to_string('fortune.html', {'fortune': tell_fortune()}))
+    )
+    measure('fortune view (variant cache)', lambda: fortune_telling(request))
+    measure('index view (render per request)', lambda: HttpResponse(render_to_string('index.html')))
+    measure('index view (variant cache)', lambda: index(request))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# リクエストを処理するプロセスでのみ、抽選回数をDBへ書き込むスレッドを開始
+from django.conf import settings  # noqa: E402
+from fortune_telling.stats import start_flusher  # noqa: E402
+
+start_flusher(settings.FORTUNE_STATS_FLUSH_INTERVAL)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -117,8 +118,40 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
 STATIC_URL = 'static/'
+# build_tailwind_cssコマンドが書き出すスタイルシートなど
+STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# おみくじ
+# Trueであれば、訪問者ごとにその日のあいだ同じ運勢を返す
+FORTUNE_DAILY = False
+# Trueであれば、結果画面をキャッシュ可能な外枠と、運勢のみを返すJSONとに分けて配信する
+FORTUNE_SHELL = False
+# その日の運勢をメモ化する訪問者数の上限
+FORTUNE_DAILY_CACHE_SIZE = 10_000
+# 抽選回数をDBへ書き込む間隔(秒) 0以下であれば書き込まない
+FORTUNE_STATS_FLUSH_INTERVAL = 10
+# 抽選回数の区間を保持する期間 粒度ごとに指定し、含まれない粒度は無期限に保持する
+FORTUNE_ROLLUP_RETENTION = {
+    'minute': timedelta(days=2),
+    'hour': timedelta(days=90),
+    'day': timedelta(days=730),
+}
+# 抽選回数を配信する間隔(秒)
+FORTUNE_STREAM_INTERVAL = 1.0
+# 抽選回数を配信する1つの接続を保つ秒数 過ぎると閉じ、クライアントは再接続する
+# Djangoは配信中にクライアントの切断を検知しないので、切断された接続の購読もこの秒数で破棄される
+FORTUNE_STREAM_MAX_AGE = 60.0
+# 配信する接続が閉じられてから、クライアントが再接続するまで待つ時間(ミリ秒)
+FORTUNE_STREAM_RETRY_MS = 1000
+# 圧縮済みのページを保持する合計サイズの上限(バイト)
+PRECOMPRESSED_PAGE_CACHE_BYTES = 4 * 1024 * 1024
+# export_static_pagesコマンドがページを書き出すディレクトリ
+STATIC_EXPORT_ROOT = BASE_DIR.parent / 'export'
+# Trueであれば、書き出したページをDjangoを経由せずにWSGIの層で返却する
+STATIC_EXPORT_SERVE = False
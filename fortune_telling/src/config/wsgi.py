@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# リクエストを処理するプロセスでのみ、抽選回数をDBへ書き込むスレッドを開始
+from django.conf import settings  # noqa: E402
+from fortune_telling.stats import start_flusher  # noqa: E402
+
+start_flusher(settings.FORTUNE_STATS_FLUSH_INTERVAL)
+
+# 書き出したページは、Djangoへ渡さずにWSGIの層で返却
+if settings.STATIC_EXPORT_SERVE:
+    from fortune_telling.static_export import ExportedPagesApplication  # noqa: E402
+
+    application = ExportedPagesApplication(application, settings.STATIC_EXPORT_ROOT)
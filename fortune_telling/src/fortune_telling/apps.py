@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class FortuneTellingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fortune_telling'
+
+    def ready(self):
+        # 起動時にすべての画面のバリエーションを描画しておく
+        from .views import INDEX_PAGE, FORTUNE_PAGE, FORTUNE_SHELL_PAGE
+        FORTUNE_SHELL_PAGE.render_all()
+        INDEX_PAGE.render_all()
+        FORTUNE_PAGE.render_all()
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 接続を保つためだけに送るSSEのコメント行
+KEEPALIVE_FRAME = b': keepalive\n\n'
+
+
+def encode_retry(milliseconds: int) -> bytes:
+    """
+    接続が閉じられたときに、EventSourceが再接続するまで待つ時間を指定するフィールドを組み立てる
+
+    :param milliseconds: 再接続するまで待つ時間(ミリ秒)
+    :return: フィールドを表すバイト列
+    """
+    return f'retry: {milliseconds}\n\n'.encode('ascii')
+
+
+def encode_event(event: str, data: dict) -> bytes:
+    """
+    Server-Sent Eventsのイベントを組み立てる
+
+    :param event: イベント名
+    :param data: JSONとして送信するデータ
+    :return: イベントを表すバイト列
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class Subscription:
+    """
+    購読者ごとに、まだ送信していない最新のフレームを1つだけ保持することを責務に持つ
+    送信が追いつかない購読者では古いフレームを捨てるので、購読者あたりのメモリは一定に保たれる
+    """
+    __slots__ = ('_frame', '_ready', 'dropped')
+
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._ready = asyncio.Event()
+        # 送信される前に新しいフレームで上書きされた数
+        self.dropped = 0
+
+    def offer(self, frame: bytes):
+        """
+        送信するフレームを差し替える
+
+        :param frame: 送信するフレーム
+        """
+        if self._ready.is_set():
+            self.dropped += 1
+        self._frame = frame
+        self._ready.set()
+
+    async def next_frame(self) -> bytes:
+        """
+        次に送信するフレームを待ち受ける
+
+        :return: 送信するフレーム
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        return self._frame
+
+
+class DistributionBroadcaster:
+    """
+    運勢の分布を一定間隔で読み取り、すべての購読者へ配信することを責務に持つ
+    分布の読み取りは購読者の数に関わらず1間隔に1回とし、分布が変わったときのみ配信する
+    """
+
+    def __init__(self, snapshot: Callable[[], Awaitable[dict]], interval: float = 1.0,
+                 keepalive: float = 15.0, clock: Callable[[], float] = time.monotonic):
+        """
+        :param snapshot: 運勢の分布を読み取るコルーチン関数
+        :param interval: 分布を読み取る間隔(秒)
+        :param keepalive: 分布が変わらないとき、接続を保つためのコメント行を送る間隔(秒)
+        :param clock: 経過時間を計る関数
+        """
+        self.snapshot = snapshot
+        self.interval = interval
+        self.keepalive = keepalive
+        self.clock = clock
+        self.subscribers: set[Subscription] = set()
+        self._last_frame: Optional[bytes] = None
+        self._last_sent_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscription:
+        """
+        購読を開始 最初の購読者が現れたときに配信を開始する
+
+        :return: 購読
+        """
+        subscription = Subscription()
+        self.subscribers.add(subscription)
+        if self._last_frame is not None:
+            subscription.offer(self._last_frame)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        購読を終了
+
+        :param subscription: 購読
+        """
+        self.subscribers.discard(subscription)
+
+    async def stream(self, max_age: float, retry: int) -> AsyncIterator[bytes]:
+        """
+        購読者へ送信するフレームを順に生成 max_age秒が過ぎると生成を終え、購読を終了する
+        クライアントが接続を閉じたことをDjangoは生成を続けている間は検知しないので、
+        接続の寿命を区切らないと、閉じられた接続の購読がいつまでも残る クライアントはretryに従い再接続する
+
+        :param max_age: 1つの接続でフレームを生成し続ける秒数
+        :param retry: 接続が閉じられてから、クライアントが再接続するまで待つ時間(ミリ秒)
+        :return: フレームを生成する非同期イテレータ
+        """
+        subscription = self.subscribe()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age
+        try:
+            yield encode_retry(retry)
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    frame = await asyncio.wait_for(subscription.next_frame(), remaining)
+                except asyncio.TimeoutError:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def publish(self, frame: bytes):
+        """
+        すべての購読者へフレームを配信
+
+        :param frame: 配信するフレーム
+        """
+        self._last_sent_at = self.clock()
+        for subscription in self.subscribers:
+            subscription.offer(frame)
+
+    async def _run(self):
+        """
+        購読者がいるあいだ、分布を読み取って配信し続ける
+        読み取りに失敗したときは、購読者を待たせたまま止まらないよう、記録して次の間隔で読み取り直す
+        """
+        while self.subscribers:
+            try:
+                frame = encode_event('distribution', await self.snapshot())
+            except Exception:
+                logger.exception('Failed to read fortune distribution')
+                frame = self._last_frame
+
+            if frame is not None and frame != self._last_frame:
+                self._last_frame = frame
+                self.publish(frame)
+            elif self.clock() - self._last_sent_at >= self.keepalive:
+                self.publish(KEEPALIVE_FRAME)
+
+            await asyncio.sleep(self.interval)
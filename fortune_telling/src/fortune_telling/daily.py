@@ -0,0 +1,77 @@
+from datetime import date, datetime, time, timedelta
+import secrets
+from typing import Callable, NamedTuple
+
+from django.utils import timezone
+
+from . import fortune as fortune_module
+from .expiring_cache import ExpiringLRUCache
+
+
+def local_today() -> date:
+    """
+    設定TIME_ZONEにおける今日の日付
+
+    :return: 今日の日付
+    """
+    return timezone.localdate()
+
+
+def next_midnight(day: date) -> datetime:
+    """
+    設定TIME_ZONEにおける、指定日の翌日0時
+
+    :param day: 基準となる日付
+    :return: 翌日0時を表すaware datetime
+    """
+    return datetime.combine(day + timedelta(days=1), time.min, tzinfo=timezone.get_current_timezone())
+
+
+def new_visitor_key() -> str:
+    """
+    訪問者を識別するための推測されにくい文字列を生成
+
+    :return: 訪問者を識別する文字列
+    """
+    return secrets.token_urlsafe(16)
+
+
+class DailyFortune(NamedTuple):
+    """ 訪問者のその日の運勢を表現することを責務に持つ """
+    fortune: str
+    body: bytes
+    # 運勢が切り替わる日付の境界 UNIX時間
+    expires_at: float
+
+
+class DailyFortuneCache:
+    """
+    訪問者ごとのその日の運勢・描画結果をメモ化することを責務に持つ
+    要素は設定TIME_ZONEの0時に期限切れとなるので、日付が変わると運勢を占い直す
+    """
+
+    def __init__(self, render: Callable[[str], bytes], maxsize: int = 10_000):
+        """
+        :param render: 運勢から結果画面のボディを描画する関数
+        :param maxsize: メモ化する訪問者数の上限
+        """
+        self.render = render
+        self.cache = ExpiringLRUCache(maxsize)
+
+    def get(self, visitor_key: str) -> DailyFortune:
+        """
+        訪問者のその日の運勢を取得
+
+        :param visitor_key: 訪問者を識別する文字列
+        :return: 訪問者のその日の運勢
+        """
+        day = local_today()
+        key = (visitor_key, day)
+
+        daily_fortune = self.cache.get(key)
+        if daily_fortune is None:
+            fortune = fortune_module.tell_daily_fortune(visitor_key, day)
+            daily_fortune = DailyFortune(fortune, self.render(fortune), next_midnight(day).timestamp())
+            self.cache.set(key, daily_fortune, daily_fortune.expires_at)
+
+        return daily_fortune
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Callable, Hashable
+
+# 有効期限を持たないことを表す値
+NO_EXPIRY = float('inf')
+
+
+class ExpiringLRUCache:
+    """
+    要素数の上限・有効期限を持つLRUキャッシュを責務に持つ
+    上限を超えると最も長く参照されていない要素から、有効期限を過ぎると期限切れの要素をまとめて破棄する
+    """
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time):
+        """
+        :param maxsize: 保持する要素数の上限
+        :param clock: 現在時刻をUNIX時間で返す関数 テストで差し替えられるよう注入する
+        """
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[object, float]] = OrderedDict()
+        # 保持している要素のうち、最も早い有効期限
+        self._next_expiry = NO_EXPIRY
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        """
+        キーと対応する要素を取得
+
+        :param key: キャッシュのキー
+        :param default: 要素が存在しない・期限切れのときの値
+        :return: キーと対応する要素
+        """
+        with self._lock:
+            now = self.clock()
+            if now >= self._next_expiry:
+                self._purge_expired(now)
+
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value, expires_at: float = NO_EXPIRY):
+        """
+        キーと対応する要素を保持
+
+        :param key: キャッシュのキー
+        :param value: 保持する要素
+        :param expires_at: 有効期限 UNIX時間で指定
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._next_expiry = min(self._next_expiry, expires_at)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """ すべての要素を破棄 """
+        with self._lock:
+            self._entries.clear()
+            self._next_expiry = NO_EXPIRY
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _purge_expired(self, now: float):
+        """
+        期限切れの要素をまとめて破棄 ロックを獲得した状態で呼び出す
+
+        :param now: 現在時刻
+        """
+        next_expiry = NO_EXPIRY
+        for key, (_, expires_at) in list(self._entries.items()):
+            if expires_at <= now:
+                del self._entries[key]
+            else:
+                next_expiry = min(next_expiry, expires_at)
+        self._next_expiry = next_expiry
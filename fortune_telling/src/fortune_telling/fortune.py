@@ -1,7 +1,19 @@
+from array import array
+from datetime import date
+from functools import lru_cache
+import hashlib
+import math
 import random
+from typing import Optional, Sequence
 
 FORTUNE_CANDIDATE = ('小吉', '中吉', '大吉')
 
+# 重み付き抽選で参照する表の大きさ 16bitの乱数をそのまま表の添字とする
+DRAW_TABLE_BITS = 16
+DRAW_TABLE_SIZE = 1 << DRAW_TABLE_BITS
+# 一度に生成する乱数の数 大量の抽選でも一時的なメモリ使用量を抑える
+DRAW_CHUNK_SIZE = 1 << 20
+
 
 def tell_fortune() -> str:
     """
@@ -11,3 +23,107 @@ def tell_fortune() -> str:
     """
     fortune = random.randint(0, len(FORTUNE_CANDIDATE) - 1)
     return FORTUNE_CANDIDATE[fortune]
+
+
+def tell_daily_fortune(visitor_key: str, day: date, weights: Optional[Sequence[float]] = None) -> str:
+    """
+    訪問者・日付から運勢の文字列を決定的に生成 同じ訪問者には、その日のあいだ同じ運勢を返す
+
+    :param visitor_key: 訪問者を識別する文字列
+    :param day: 運勢を占う日付
+    :param weights: 候補ごとの重み Noneであれば一様
+    :return: 運勢を表す文字列
+    """
+    table = build_draw_table(normalize_weights(weights))
+    # 訪問者・日付の組み合わせのハッシュ値を、16bitの乱数の代わりに抽選表の添字とする
+    digest = hashlib.blake2b(f'{visitor_key}:{day.isoformat()}'.encode('utf-8'), digest_size=2).digest()
+    return FORTUNE_CANDIDATE[table[int.from_bytes(digest, 'big')]]
+
+
+def normalize_weights(weights: Optional[Sequence[float]]) -> tuple[float, ...]:
+    """
+    運勢の候補ごとの重みを検証し、表のキャッシュキーとして扱えるタプルへ変換
+
+    :param weights: 候補ごとの重み Noneであれば一様とみなす
+    :return: 重みのタプル
+    """
+    if weights is None:
+        return (1.0,) * len(FORTUNE_CANDIDATE)
+
+    weights = tuple(float(weight) for weight in weights)
+    if len(weights) != len(FORTUNE_CANDIDATE):
+        raise ValueError(f'weights must have {len(FORTUNE_CANDIDATE)} elements.')
+    # 無限大・非数、合計が浮動小数点数で表せないほど大きい重みでは、抽選表の枠を割り当てられない
+    if not all(math.isfinite(weight) for weight in weights) or not math.isfinite(sum(weights)):
+        raise ValueError('weights and their sum must be finite numbers.')
+    if any(weight < 0 for weight in weights) or sum(weights) <= 0:
+        raise ValueError('weights must be non-negative and their sum must be positive.')
+    return weights
+
+
+@lru_cache(maxsize=32)
+def build_draw_table(weights: tuple[float, ...]) -> bytes:
+    """
+    重みに比例した数だけ候補の添字を並べた抽選表を組み立てる
+    一様な16bitの乱数で表を引くと、重み付きの抽選となる 重みごとに一度だけ組み立てれば良いのでキャッシュする
+
+    :param weights: 候補ごとの重み normalize_weightsで検証したもの
+    :return: 候補の添字を要素に持つ抽選表 大きさはDRAW_TABLE_SIZE
+    :raises ValueError: 重みから抽選表を組み立てられないとき
+    """
+    total = sum(weights)
+    quotas = [weight / total * DRAW_TABLE_SIZE for weight in weights]
+    slots = [int(quota) for quota in quotas]
+
+    # 切り捨てで余った枠は、端数の大きい候補から割り当てる(最大剰余法)
+    remainders = sorted(range(len(weights)), key=lambda index: quotas[index] - slots[index], reverse=True)
+    for index in remainders[:DRAW_TABLE_SIZE - sum(slots)]:
+        slots[index] += 1
+
+    table = b''.join(bytes([index]) * slot for index, slot in enumerate(slots))
+    # 抽選表より短いと、乱数が表の範囲を超えて参照できなくなる
+    if len(table) != DRAW_TABLE_SIZE:
+        raise ValueError(f'weights {weights} cannot be spread over {DRAW_TABLE_SIZE} slots.')
+    return table
+
+
+def tell_fortunes(n: int, weights: Optional[Sequence[float]] = None, rng: Optional[random.Random] = None) -> array:
+    """
+    重み付きで運勢をn回抽選 抽選ごとのPython処理を挟まないよう、乱数の生成から表の参照までをまとめて処理する
+
+    :param n: 抽選回数
+    :param weights: 候補ごとの重み Noneであれば一様
+    :param rng: 乱数生成器 再現性が必要なときに指定
+    :return: 抽選された候補の添字を要素に持つ配列
+    """
+    if n < 0:
+        raise ValueError('n must be non-negative.')
+
+    table = build_draw_table(normalize_weights(weights))
+    rng = rng or random
+    fortunes = array('B')
+
+    for offset in range(0, n, DRAW_CHUNK_SIZE):
+        size = min(DRAW_CHUNK_SIZE, n - offset)
+        random_values = array('H', rng.randbytes(size * 2))
+        fortunes.frombytes(bytes(map(table.__getitem__, random_values)))
+
+    return fortunes
+
+
+def count_fortunes(n: int, weights: Optional[Sequence[float]] = None,
+                   rng: Optional[random.Random] = None) -> dict[str, int]:
+    """
+    重み付きで運勢をn回抽選し、候補ごとの回数を集計
+
+    :param n: 抽選回数
+    :param weights: 候補ごとの重み Noneであれば一様
+    :param rng: 乱数生成器 再現性が必要なときに指定
+    :return: 運勢の文字列と抽選された回数の辞書
+    """
+    fortunes = tell_fortunes(n, weights, rng).tobytes()
+
+    return {
+        candidate: fortunes.count(index)
+        for index, candidate in enumerate(FORTUNE_CANDIDATE)
+    }
@@ -0,0 +1,39 @@
+import gzip
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from fortune_telling import tailwind
+
+
+class Command(BaseCommand):
+    """ テンプレートで使われているユーティリティクラスのみのスタイルシートを生成 CDNのスクリプトを置き換える """
+
+    help = 'Scan the templates for Tailwind utility classes and write a minimal, content-hashed stylesheet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if the committed stylesheet is out of date instead of writing it.')
+
+    def handle(self, *args, **options):
+        template_dir = Path(settings.TEMPLATES[0]['DIRS'][0])
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+
+        classes = tailwind.scan_classes()
+        try:
+            stylesheet = tailwind.build_stylesheet(classes)
+        except tailwind.UnknownUtilityError as e:
+            raise CommandError(f'{e}. Add them to {tailwind.__name__}.UTILITIES.')
+
+        if options['check']:
+            include = (template_dir / tailwind.INCLUDE_TEMPLATE_NAME).read_text(encoding='utf-8')
+            if tailwind.stylesheet_name(stylesheet) not in include:
+                raise CommandError('The stylesheet is out of date. Run build_tailwind_css.')
+            return
+
+        name = tailwind.write_stylesheet(stylesheet, static_dir, template_dir)
+        body = stylesheet.encode('utf-8')
+        self.stdout.write(
+            f'wrote {name}: {len(classes)} classes, {len(body)} B ({len(gzip.compress(body, 9))} B gzip)'
+        )
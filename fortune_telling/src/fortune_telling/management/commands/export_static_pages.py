@@ -0,0 +1,66 @@
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from fortune_telling import static_export
+
+
+class Command(BaseCommand):
+    """ リクエストに依存しないページを書き出し、Djangoを経由せずに配信できるURLパターンを報告 """
+
+    help = 'Render pages marked with @static_page through the URLconf and write them with .gz siblings and a manifest.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(settings.STATIC_EXPORT_ROOT),
+                            help='Directory to write the pages to.')
+        parser.add_argument('--host', default='localhost', help='Host header used to render the pages.')
+        parser.add_argument('--report-only', action='store_true', help='Only report eligible URL patterns.')
+        parser.add_argument('--access-log', help='Access log used to estimate the traffic that skips Django.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        candidates = static_export.find_candidates()
+        if options['report_only']:
+            self._report(candidates)
+            return
+
+        output_dir = Path(options['output'])
+        exported, skipped = static_export.export_pages(output_dir, candidates, host=options['host'])
+        # 描画した結果、訪問者に依存すると分かったものは理由を差し替える
+        skipped_by_url = {candidate.url: candidate for candidate in skipped}
+        self._report([skipped_by_url.get(candidate.url, candidate) for candidate in candidates])
+
+        for page in exported:
+            gzip_size = f'{page.gzip_size} B' if page.gzip_size is not None else 'not smaller'
+            self.stdout.write(f'exported {page.url} -> {page.file} ({page.size} B, gzip {gzip_size})')
+        self.stdout.write(f'wrote {len(exported)} pages to {output_dir}')
+
+        if options['access_log']:
+            with open(options['access_log'], encoding='utf-8', errors='replace') as log:
+                total, servable = static_export.count_servable_requests(log, (page.url for page in exported))
+            ratio = servable / total if total else 0.0
+            self.stdout.write(f'{servable} of {total} requests ({ratio:.1%}) could be served without Django')
+
+    def _report(self, candidates: list[static_export.Candidate]):
+        """
+        URLパターンごとの判定結果を出力 URLパターンのみから書き出せないと分かるものは、詳細表示のときのみ1件ずつ出力
+
+        :param candidates: 判定結果
+        """
+        reasons = Counter()
+        for candidate in candidates:
+            if candidate.eligible:
+                self.stdout.write(f'eligible {candidate.url} ({candidate.name})')
+                continue
+            reasons[candidate.reason] += 1
+            # 目印を付与したにも関わらず書き出せなかったものは、常に出力
+            rendered = candidate.reason not in (static_export.REASON_HAS_PARAMETERS, static_export.REASON_NOT_MARKED)
+            if rendered or self.verbosity >= 2:
+                self.stdout.write(f'skipped  {candidate.url} ({candidate.name}): {candidate.reason}')
+
+        eligible = len(candidates) - sum(reasons.values())
+        self.stdout.write(f'{eligible} of {len(candidates)} URL patterns are eligible for static export')
+        for reason, count in reasons.most_common():
+            self.stdout.write(f'  {count} skipped: {reason}')
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from fortune_telling import rollup
+
+
+class Command(BaseCommand):
+    """ 抽選回数の区間を粗い粒度へ集約し、保持期間を過ぎた細かい粒度の区間を破棄 定期実行を想定 """
+
+    help = 'Roll up fortune draw buckets (minute -> hour -> day -> month) and apply the retention policy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-retention', action='store_true', help='Only roll up, do not delete buckets.')
+
+    def handle(self, *args, **options):
+        rolled_up = rollup.rollup()
+        for resolution, count in rolled_up.items():
+            self.stdout.write(f'rolled up {count} {resolution} buckets')
+
+        if options['skip_retention']:
+            return
+
+        deleted = rollup.apply_retention(settings.FORTUNE_ROLLUP_RETENTION)
+        for resolution, count in deleted.items():
+            self.stdout.write(f'deleted {count} {resolution} buckets')
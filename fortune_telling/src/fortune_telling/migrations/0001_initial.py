@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FortuneDrawCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fortune', models.CharField(max_length=32, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
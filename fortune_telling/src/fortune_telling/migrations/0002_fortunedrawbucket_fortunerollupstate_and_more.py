@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fortune_telling', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FortuneDrawBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], max_length=8)),
+                ('started_at', models.DateTimeField()),
+                ('fortune', models.CharField(max_length=32)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FortuneRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], max_length=8, unique=True)),
+                ('rolled_up_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='fortunedrawbucket',
+            constraint=models.UniqueConstraint(fields=('resolution', 'started_at', 'fortune'), name='unique_draw_bucket'),
+        ),
+    ]
@@ -1,3 +1,35 @@
 from django.db import models
 
-# Create your models here.
+
+class FortuneDrawCount(models.Model):
+    """ 運勢ごとの抽選回数の累計を表現することを責務に持つ """
+    fortune = models.CharField(max_length=32, unique=True)
+    count = models.BigIntegerField(default=0)
+
+
+class Resolution(models.TextChoices):
+    """ 抽選回数を集計する時間の粒度を表現することを責務に持つ 細かい順に並べる """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    MONTH = 'month'
+
+
+class FortuneDrawBucket(models.Model):
+    """ 時間の区間ごと・運勢ごとの抽選回数を表現することを責務に持つ """
+    resolution = models.CharField(max_length=8, choices=Resolution.choices)
+    # 区間の開始時刻
+    started_at = models.DateTimeField()
+    fortune = models.CharField(max_length=32)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resolution', 'started_at', 'fortune'], name='unique_draw_bucket'),
+        ]
+
+
+class FortuneRollupState(models.Model):
+    """ 粒度ごとに、どの時刻まで細かい粒度から集約済みかを表現することを責務に持つ """
+    resolution = models.CharField(max_length=8, choices=Resolution.choices, unique=True)
+    rolled_up_until = models.DateTimeField()
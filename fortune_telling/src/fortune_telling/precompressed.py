@@ -0,0 +1,213 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Sequence, Union
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+TypeRender = Callable[[], Union[str, bytes]]
+
+COMPRESS_LEVEL = 9
+# Accept-Encodingで同じ重みが指定されたときの優先順
+ENCODINGS = ('gzip', 'deflate')
+IDENTITY = 'identity'
+
+
+def choose_encoding(accept_encoding: str, encodings: Sequence[str] = ENCODINGS) -> str:
+    """
+    Accept-Encodingヘッダからレスポンスの圧縮形式を選択
+
+    :param accept_encoding: Accept-Encodingヘッダの値
+    :param encodings: 応答できる圧縮形式 同じ重みが指定されたときは先頭を優先する
+    :return: encodingsのいずれか、またはidentity
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities['gzip' if coding == 'x-gzip' else coding] = quality
+
+    chosen, chosen_quality = IDENTITY, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    return chosen
+
+
+class PrecompressedPage:
+    """
+    描画済みのページ本文と、最大圧縮レベルで一度だけ圧縮したgzip・deflate形式の本文を保持することを責務に持つ
+    """
+
+    def __init__(self, body: Union[str, bytes], level: int = COMPRESS_LEVEL):
+        """
+        :param body: 描画済みのページ本文
+        :param level: 圧縮レベル
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.identity_length = len(body)
+        # 更新時刻を含めないことで、同じ本文からは同じ圧縮結果が得られるようにする
+        compressed = {
+            'gzip': gzip.compress(body, compresslevel=level, mtime=0),
+            'deflate': zlib.compress(body, level),
+        }
+
+        # 圧縮しても小さくならない形式は選択肢から外す
+        self.encodings = tuple(encoding for encoding in ENCODINGS if len(compressed[encoding]) < len(body))
+        self._encoded = {IDENTITY: body, **{encoding: compressed[encoding] for encoding in self.encodings}}
+
+    @property
+    def nbytes(self) -> int:
+        """ 保持している本文の合計サイズ """
+        return sum(len(body) for body in self._encoded.values())
+
+    def encode(self, encoding: str) -> bytes:
+        """
+        指定の形式の本文を取得
+
+        :param encoding: gzip・deflate・identityのいずれか
+        :return: 本文のバイト列
+        """
+        return self._encoded[encoding]
+
+
+class CacheStats(NamedTuple):
+    """ 圧縮済みレスポンスキャッシュの利用状況 """
+    hits: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+    entries: int
+    size: int
+    evictions: int
+
+
+class PrecompressedCache:
+    """
+    圧縮済みのページをキーごとに保持し、Accept-Encodingに応じたレスポンスを組み立てることを責務に持つ
+    保持する合計サイズが上限を超えると、最も長く使われていないページから破棄する
+    """
+
+    def __init__(self, max_bytes: int, level: int = COMPRESS_LEVEL):
+        """
+        :param max_bytes: 保持するページの合計サイズの上限
+        :param level: 圧縮レベル
+        """
+        self.max_bytes = max_bytes
+        self.level = level
+        self._pages: OrderedDict[Hashable, PrecompressedPage] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def get_page(self, key: Hashable, render: TypeRender) -> PrecompressedPage:
+        """
+        キーに対応する圧縮済みのページを取得 保持していなければ描画・圧縮して保持
+
+        :param key: ページを識別するキー
+        :param render: ページ本文を描画する関数
+        :return: 圧縮済みのページ
+        """
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        # 描画・圧縮はロックの外で行う 同時に描画されても、後から保持したものが残るだけ
+        page = PrecompressedPage(render(), self.level)
+        with self._lock:
+            self._discard(key)
+            if page.nbytes <= self.max_bytes:
+                self._pages[key] = page
+                self._size += page.nbytes
+                while self._size > self.max_bytes:
+                    self._discard(next(iter(self._pages)))
+                    self.evictions += 1
+        return page
+
+    def respond(self, request: HttpRequest, key: Hashable, render: TypeRender) -> HttpResponse:
+        """
+        圧縮済みのページからAccept-Encodingに応じたHTTPレスポンスを組み立てる
+
+        :param request: HTTPリクエスト
+        :param key: ページを識別するキー
+        :param render: ページ本文を描画する関数
+        :return: HTTPレスポンス
+        """
+        page = self.get_page(key, render)
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding not in page.encodings:
+            encoding = IDENTITY
+        body = page.encode(encoding)
+
+        response = HttpResponse(body, content_type='text/html; charset=utf-8')
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+            with self._lock:
+                self.bytes_saved += page.identity_length - len(body)
+        # 圧縮の有無に関わらず、共有キャッシュが形式を取り違えないよう指定
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def stats(self) -> CacheStats:
+        """
+        利用状況を取得
+
+        :return: ヒット率・圧縮により削減した転送量などの利用状況
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                hit_ratio=self.hits / lookups if lookups else 0.0,
+                bytes_saved=self.bytes_saved,
+                entries=len(self._pages),
+                size=self._size,
+                evictions=self.evictions,
+            )
+
+    def clear(self):
+        """ 保持しているページと利用状況を破棄 """
+        with self._lock:
+            self._pages.clear()
+            self._size = 0
+            self.hits = self.misses = self.bytes_saved = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _discard(self, key: Hashable):
+        """
+        ページを破棄 ロックを獲得した状態で呼び出す
+
+        :param key: ページを識別するキー
+        """
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self._size -= page.nbytes
+
+
+PAGE_CACHE = PrecompressedCache(settings.PRECOMPRESSED_PAGE_CACHE_BYTES)
+
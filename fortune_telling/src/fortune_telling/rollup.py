@@ -0,0 +1,262 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.utils import timezone
+
+from .models import FortuneDrawBucket, FortuneRollupState, Resolution
+
+# 細かい順に並べた粒度
+RESOLUTIONS = (Resolution.MINUTE, Resolution.HOUR, Resolution.DAY, Resolution.MONTH)
+# 粒度ごとの、区間の開始時刻へ切り捨てるDB関数
+TRUNC_FUNCTIONS = {
+    Resolution.HOUR: TruncHour,
+    Resolution.DAY: TruncDay,
+    Resolution.MONTH: TruncMonth,
+}
+
+
+def floor_time(moment: datetime, resolution: str) -> datetime:
+    """
+    時刻を、粒度の区間の開始時刻へ切り捨てる 日・月の境界は設定TIME_ZONEに従う
+
+    :param moment: aware datetime
+    :param resolution: 粒度
+    :return: 区間の開始時刻
+    """
+    local = timezone.localtime(moment).replace(second=0, microsecond=0)
+    if resolution == Resolution.MINUTE:
+        return local
+    if resolution == Resolution.HOUR:
+        return local.replace(minute=0)
+
+    day = local.date() if resolution == Resolution.DAY else local.date().replace(day=1)
+    return datetime.combine(day, time.min, tzinfo=local.tzinfo)
+
+
+def next_time(started_at: datetime, resolution: str) -> datetime:
+    """
+    区間の開始時刻から、次の区間の開始時刻を求める
+
+    :param started_at: 区間の開始時刻
+    :param resolution: 粒度
+    :return: 次の区間の開始時刻
+    """
+    if resolution in (Resolution.MINUTE, Resolution.HOUR):
+        # 夏時間の切り替えで壁時計の時刻がずれないよう、UTCで加算する
+        step = timedelta(minutes=1) if resolution == Resolution.MINUTE else timedelta(hours=1)
+        return timezone.localtime(started_at.astimezone(dt_timezone.utc) + step)
+
+    local = timezone.localtime(started_at)
+    if resolution == Resolution.DAY:
+        day = local.date() + timedelta(days=1)
+    else:
+        day = (local.date().replace(day=28) + timedelta(days=4)).replace(day=1)
+    return datetime.combine(day, time.min, tzinfo=local.tzinfo)
+
+
+def ceil_time(moment: datetime, resolution: str) -> datetime:
+    """
+    時刻を、粒度の区間の開始時刻へ切り上げる
+
+    :param moment: aware datetime
+    :param resolution: 粒度
+    :return: 区間の開始時刻
+    """
+    floored = floor_time(moment, resolution)
+    return floored if floored == moment else next_time(floored, resolution)
+
+
+def record(deltas: dict[str, int], moment: datetime):
+    """
+    抽選回数を、時刻を含む分単位の区間へ加算 呼び出し側のトランザクションの中で実行する
+    遅れて書き込まれ、時刻を含む粗い粒度の区間が集約済みであれば、集約済みの区間へも加算する
+
+    :param deltas: 運勢と加算する抽選回数の辞書
+    :param moment: 抽選された時刻
+    """
+    started_at = floor_time(moment, Resolution.MINUTE)
+    add_counts(Resolution.MINUTE, started_at, deltas)
+
+    # 分単位の区間へ書き込んでから集約済みの時刻を読み取ることで、並行する集約との間で加算が漏れないようにする
+    states = watermarks()
+    for coarser in RESOLUTIONS[1:]:
+        # 粗い粒度ほど集約済みの時刻は古いので、集約されていない粒度があれば以降も集約されていない
+        if coarser not in states or started_at >= states[coarser]:
+            break
+        add_counts(coarser, floor_time(started_at, coarser), deltas)
+
+
+def add_counts(resolution: str, started_at: datetime, deltas: dict[str, int]):
+    """
+    区間の抽選回数へ加算 区間が無ければ作成する
+
+    :param resolution: 粒度
+    :param started_at: 区間の開始時刻
+    :param deltas: 運勢と加算する抽選回数の辞書
+    """
+    for fortune, count in deltas.items():
+        updated = FortuneDrawBucket.objects.filter(
+            resolution=resolution, started_at=started_at, fortune=fortune
+        ).update(count=F('count') + count)
+        if not updated:
+            FortuneDrawBucket.objects.create(
+                resolution=resolution, started_at=started_at, fortune=fortune, count=count
+            )
+
+
+def watermarks() -> dict[str, datetime]:
+    """
+    粒度ごとの集約済みの時刻
+
+    :return: 粒度と、その時刻までは区間が出揃っていることを表す時刻の辞書
+    """
+    return dict(FortuneRollupState.objects.values_list('resolution', 'rolled_up_until'))
+
+
+def rollup(now: Optional[datetime] = None) -> dict[str, int]:
+    """
+    細かい粒度の区間を、完了した粗い粒度の区間へ集約 分→時→日→月の順に集約する
+    集約は区間の合計で上書きするので、何度実行しても結果は変わらない
+
+    :param now: 基準となる現在時刻
+    :return: 粒度と、集約した区間の数の辞書
+    """
+    now = now or timezone.now()
+    rolled_up = {}
+
+    with transaction.atomic():
+        states = watermarks()
+        for finer, coarser in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+            # 細かい粒度の区間が出揃っている時刻までの、完了した区間のみを集約
+            complete_until = now if finer == Resolution.MINUTE else states.get(finer)
+            if complete_until is None:
+                break
+            until = floor_time(min(now, complete_until), coarser)
+
+            finer_buckets = FortuneDrawBucket.objects.filter(resolution=finer, started_at__lt=until)
+            since = states.get(coarser)
+            if since is not None:
+                finer_buckets = finer_buckets.filter(started_at__gte=since)
+
+            aggregated = finer_buckets.annotate(
+                bucket=TRUNC_FUNCTIONS[coarser]('started_at', tzinfo=timezone.get_current_timezone())
+            ).values('bucket', 'fortune').annotate(total=Sum('count'))
+
+            rolled_up[coarser] = 0
+            for row in aggregated:
+                FortuneDrawBucket.objects.update_or_create(
+                    resolution=coarser, started_at=row['bucket'], fortune=row['fortune'],
+                    defaults={'count': row['total']}
+                )
+                rolled_up[coarser] += 1
+
+            if since is None or until > since:
+                FortuneRollupState.objects.update_or_create(resolution=coarser, defaults={'rolled_up_until': until})
+                states[coarser] = until
+
+    return rolled_up
+
+
+def apply_retention(retention: dict[str, timedelta], now: Optional[datetime] = None) -> dict[str, int]:
+    """
+    保持期間を過ぎた細かい粒度の区間を破棄 粗い粒度へ集約されていない区間は破棄しない
+
+    :param retention: 粒度と保持期間の辞書 含まれない粒度は無期限に保持する
+    :param now: 基準となる現在時刻
+    :return: 粒度と、破棄した区間の数の辞書
+    """
+    now = now or timezone.now()
+    states = watermarks()
+    deleted = {}
+
+    for finer, coarser in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+        if finer not in retention or coarser not in states:
+            continue
+        cutoff = min(floor_time(now - retention[finer], coarser), states[coarser])
+        deleted[finer], _ = FortuneDrawBucket.objects.filter(resolution=finer, started_at__lt=cutoff).delete()
+
+    return deleted
+
+
+class Segment(NamedTuple):
+    """ 範囲集計で、ひとつの粒度から読み取る区間を表現することを責務に持つ """
+    resolution: str
+    start: datetime
+    end: datetime
+
+
+def plan_segments(start: datetime, end: datetime, states: dict[str, datetime]) -> list[Segment]:
+    """
+    範囲を、できるだけ粗い粒度の区間で覆うように分割
+    粗い粒度で覆えない端の部分のみ、細かい粒度で読み取る
+
+    :param start: 範囲の開始時刻
+    :param end: 範囲の終了時刻(含まない)
+    :param states: 粒度ごとの集約済みの時刻
+    :return: 粒度ごとの区間
+    """
+
+    def cover(cover_start: datetime, cover_end: datetime, levels: tuple[str, ...]) -> list[Segment]:
+        if cover_start >= cover_end:
+            return []
+
+        level = levels[-1]
+        if level == Resolution.MINUTE:
+            return [Segment(level, cover_start, cover_end)]
+
+        aligned_start = ceil_time(cover_start, level)
+        aligned_end = floor_time(cover_end, level)
+        if level in states:
+            aligned_end = min(aligned_end, states[level])
+        else:
+            aligned_end = aligned_start
+
+        if aligned_start >= aligned_end:
+            return cover(cover_start, cover_end, levels[:-1])
+        return (
+            cover(cover_start, aligned_start, levels[:-1])
+            + [Segment(level, aligned_start, aligned_end)]
+            + cover(aligned_end, cover_end, levels[:-1])
+        )
+
+    return cover(start, end, RESOLUTIONS)
+
+
+def histogram(start: datetime, end: datetime) -> dict[str, int]:
+    """
+    範囲内の運勢ごとの抽選回数を、できるだけ粗い粒度の区間から集計
+    保持期間を過ぎて破棄された細かい粒度の区間は、集計に含まれない
+
+    :param start: 範囲の開始時刻
+    :param end: 範囲の終了時刻(含まない)
+    :return: 運勢と抽選回数の辞書
+    """
+    counts: dict[str, int] = {}
+    for segment in plan_segments(start, end, watermarks()):
+        rows = FortuneDrawBucket.objects.filter(
+            resolution=segment.resolution, started_at__gte=segment.start, started_at__lt=segment.end
+        ).values('fortune').annotate(total=Sum('count')).values_list('fortune', 'total')
+        for fortune, total in rows:
+            counts[fortune] = counts.get(fortune, 0) + total
+    return counts
+
+
+def series(start: datetime, end: datetime, resolution: str) -> list[tuple[datetime, dict[str, int]]]:
+    """
+    範囲内の区間ごとの運勢ごとの抽選回数
+
+    :param start: 範囲の開始時刻
+    :param end: 範囲の終了時刻(含まない)
+    :param resolution: 区間の粒度
+    :return: 区間の開始時刻と、運勢と抽選回数の辞書の組のリスト 開始時刻の昇順
+    """
+    buckets: dict[datetime, dict[str, int]] = {}
+    rows = FortuneDrawBucket.objects.filter(
+        resolution=resolution, started_at__gte=start, started_at__lt=end
+    ).order_by('started_at').values_list('started_at', 'fortune', 'count')
+    for started_at, fortune, count in rows:
+        buckets.setdefault(started_at, {})[fortune] = count
+    return list(buckets.items())
@@ -0,0 +1,306 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from django.test import Client
+from django.urls import URLResolver, get_resolver
+from django.utils.cache import has_vary_header
+
+from .precompressed import choose_encoding
+
+# 書き出したページの一覧 URLをキーとする
+MANIFEST_NAME = 'manifest.json'
+# 書き出したページを配信するとき、そのまま再現しないヘッダ
+EXCLUDED_HEADERS = frozenset(('content-length', 'content-encoding', 'date', 'etag', 'set-cookie'))
+# mimetypesの推測結果が環境により異なる種類は、拡張子を固定しておく
+EXTENSIONS = {'text/html': '.html', 'application/json': '.json'}
+# URLパターンのみから判定できる、書き出せない理由
+REASON_HAS_PARAMETERS = 'has URL parameters'
+REASON_NOT_MARKED = 'not marked with @static_page'
+
+
+def static_page(view: Callable) -> Callable:
+    """
+    リクエストに依存せず、静的なファイルとして書き出せるviewであることを示すデコレータ
+
+    :param view: view関数
+    :return: 目印を付与したview関数
+    """
+    view.static_export = True
+    return view
+
+
+class UrlPatternInfo(NamedTuple):
+    """ URLconfの末端のパターン """
+    url: str
+    name: Optional[str]
+    callback: Callable
+    has_parameters: bool
+
+
+class Candidate(NamedTuple):
+    """ 静的なファイルとして書き出せるか判定したURLパターン """
+    url: str
+    name: Optional[str]
+    eligible: bool
+    reason: str = ''
+
+
+class ExportedPage(NamedTuple):
+    """ 書き出したページ """
+    url: str
+    file: str
+    content_type: str
+    sha256: str
+    size: int
+    gzip_file: Optional[str]
+    gzip_size: Optional[int]
+    headers: dict[str, str]
+
+
+def iter_url_patterns(patterns: Optional[Sequence] = None, prefix: str = '', namespace: Optional[str] = None,
+                      parent_has_parameters: bool = False) -> Iterator[UrlPatternInfo]:
+    """
+    URLconfを再帰的にたどり、末端のパターンを列挙
+
+    :param patterns: URLパターンのリスト 省略時はROOT_URLCONF
+    :param prefix: 親のパターンまでのURL
+    :param namespace: 親のパターンまでの名前空間
+    :param parent_has_parameters: 親のパターンがURLパラメータを持つか
+    :return: 末端のパターン
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        has_parameters = parent_has_parameters or bool(pattern.pattern.regex.groups)
+        if isinstance(pattern, URLResolver):
+            child_namespace = ':'.join(filter(None, (namespace, pattern.namespace))) or None
+            yield from iter_url_patterns(pattern.url_patterns, route, child_namespace, has_parameters)
+            continue
+
+        name = pattern.name
+        if name and namespace:
+            name = f'{namespace}:{name}'
+        yield UrlPatternInfo('/' + route, name, pattern.callback, has_parameters)
+
+
+def find_candidates(patterns: Optional[Sequence] = None) -> list[Candidate]:
+    """
+    URLパターンごとに、静的なファイルとして書き出せるか判定
+
+    :param patterns: URLパターンのリスト 省略時はROOT_URLCONF
+    :return: 判定結果
+    """
+    candidates = []
+    for info in iter_url_patterns(patterns):
+        if info.has_parameters:
+            candidates.append(Candidate(info.url, info.name, False, REASON_HAS_PARAMETERS))
+        elif not getattr(info.callback, 'static_export', False):
+            candidates.append(Candidate(info.url, info.name, False, REASON_NOT_MARKED))
+        else:
+            candidates.append(Candidate(info.url, info.name, True))
+    return candidates
+
+
+def output_path(url: str, content_type: str) -> str:
+    """
+    URLに対応する書き出し先のパス ディレクトリ形式とし、Content-Typeに応じた拡張子を付与
+
+    :param url: ページのURL
+    :param content_type: Content-Typeヘッダの値
+    :return: 書き出し先ディレクトリからの相対パス
+    """
+    mime_type = content_type.split(';')[0].strip().lower()
+    extension = EXTENSIONS.get(mime_type) or mimetypes.guess_extension(mime_type) or ''
+    path = url.lstrip('/')
+    if path and not path.endswith('/'):
+        path += '/'
+    return f'{path}index{extension}'
+
+
+def _skip_reason(response) -> str:
+    """
+    レスポンスが訪問者に依存するなど、書き出せない理由
+
+    :param response: HTTPレスポンス
+    :return: 理由 書き出せるときは空文字
+    """
+    if response.status_code != 200:
+        return f'responded with status {response.status_code}'
+    if response.streaming:
+        return 'streaming response'
+    if response.cookies:
+        return f'sets cookies ({", ".join(sorted(response.cookies))})'
+    if has_vary_header(response, 'Cookie'):
+        return 'varies on Cookie'
+    return ''
+
+
+def export_pages(output_dir: Path, candidates: Iterable[Candidate],
+                 host: str = 'localhost') -> tuple[list[ExportedPage], list[Candidate]]:
+    """
+    書き出せるURLパターンを、ミドルウェアを含めた通常の経路でGETし、本文とgzip形式をファイルへ書き出す
+
+    :param output_dir: 書き出し先ディレクトリ
+    :param candidates: 判定済みのURLパターン
+    :param host: リクエストのHostヘッダ ALLOWED_HOSTSに含まれている必要がある
+    :return: 書き出したページ・描画した結果書き出せなかったURLパターン
+    """
+    client = Client(HTTP_HOST=host)
+    exported = []
+    skipped = []
+    for candidate in candidates:
+        if not candidate.eligible:
+            continue
+        response = client.get(candidate.url)
+        reason = _skip_reason(response)
+        if reason:
+            skipped.append(candidate._replace(eligible=False, reason=reason))
+            continue
+
+        body = response.content
+        content_type = response['Content-Type']
+        file = output_path(candidate.url, content_type)
+        destination = output_dir / file
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_bytes(body)
+
+        # 内容が同じであれば同じバイト列となるよう、更新時刻を含めない
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        gzip_file = None
+        if len(compressed) < len(body):
+            gzip_file = file + '.gz'
+            (output_dir / gzip_file).write_bytes(compressed)
+
+        headers = {
+            key: value for key, value in response.items()
+            if key.lower() not in EXCLUDED_HEADERS
+        }
+        exported.append(ExportedPage(
+            url=candidate.url,
+            file=file,
+            content_type=content_type,
+            sha256=hashlib.sha256(body).hexdigest(),
+            size=len(body),
+            gzip_file=gzip_file,
+            gzip_size=len(compressed) if gzip_file else None,
+            headers=headers,
+        ))
+
+    write_manifest(output_dir, exported)
+    return exported, skipped
+
+
+def write_manifest(output_dir: Path, pages: Iterable[ExportedPage]):
+    """
+    書き出したページの一覧を書き出す
+
+    :param output_dir: 書き出し先ディレクトリ
+    :param pages: 書き出したページ
+    """
+    manifest = {page.url: page._asdict() for page in pages}
+    for entry in manifest.values():
+        del entry['url']
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8'
+    )
+
+
+def read_manifest(output_dir: Path) -> list[ExportedPage]:
+    """
+    書き出したページの一覧を読み込む
+
+    :param output_dir: 書き出し先ディレクトリ
+    :return: 書き出したページ
+    """
+    manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    return [ExportedPage(url=url, **entry) for url, entry in manifest.items()]
+
+
+# Common/Combined Log Formatのリクエスト行
+REQUEST_LINE_RE = re.compile(r'"([A-Z]+) (\S+) HTTP/[\d.]+"')
+
+
+def count_servable_requests(lines: Iterable[str], urls: Iterable[str]) -> tuple[int, int]:
+    """
+    アクセスログのうち、書き出したページだけで応答できたリクエストを数える
+
+    :param lines: Common/Combined Log Format形式のアクセスログ
+    :param urls: 書き出したページのURL
+    :return: リクエスト数・書き出したページで応答できるリクエスト数
+    """
+    urls = frozenset(urls)
+    total = servable = 0
+    for line in lines:
+        match = REQUEST_LINE_RE.search(line)
+        if match is None:
+            continue
+        total += 1
+        method, target = match.groups()
+        if method in ('GET', 'HEAD') and target in urls:
+            servable += 1
+    return total, servable
+
+
+class _LoadedPage(NamedTuple):
+    """ メモリへ読み込んだ書き出し済みのページ """
+    body: bytes
+    gzip_body: Optional[bytes]
+    headers: list[tuple[str, str]]
+    etag: str
+
+
+class ExportedPagesApplication:
+    """
+    書き出したページをDjangoへ渡さずに返却し、それ以外のリクエストをWSGIアプリケーションへ委ねることを責務に持つ
+    """
+
+    def __init__(self, application: Callable, output_dir: Path):
+        """
+        :param application: 書き出したページ以外を処理するWSGIアプリケーション
+        :param output_dir: 書き出し先ディレクトリ
+        """
+        self.application = application
+        self.pages: dict[str, _LoadedPage] = {}
+        for page in read_manifest(output_dir):
+            headers = list(page.headers.items())
+            vary = ','.join(value for key, value in headers if key.lower() == 'vary').lower()
+            if page.gzip_file is not None and 'accept-encoding' not in vary:
+                headers.append(('Vary', 'Accept-Encoding'))
+            self.pages[page.url] = _LoadedPage(
+                body=(output_dir / page.file).read_bytes(),
+                gzip_body=(output_dir / page.gzip_file).read_bytes() if page.gzip_file else None,
+                headers=headers,
+                etag=f'"{page.sha256[:32]}"',
+            )
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        method = environ.get('REQUEST_METHOD')
+        page = None
+        # クエリ文字列を伴うリクエストは、念のためDjangoへ委ねる
+        if method in ('GET', 'HEAD') and not environ.get('QUERY_STRING'):
+            page = self.pages.get(environ.get('PATH_INFO', ''))
+        if page is None:
+            return self.application(environ, start_response)
+
+        accept_encoding = environ.get('HTTP_ACCEPT_ENCODING', '')
+        use_gzip = page.gzip_body is not None and choose_encoding(accept_encoding, ('gzip',)) == 'gzip'
+        # 圧縮形式ごとに本文が異なるので、ETagも区別する
+        etag = page.etag[:-1] + '-gzip"' if use_gzip else page.etag
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', [('ETag', etag)])
+            return []
+
+        body = page.gzip_body if use_gzip else page.body
+        headers = page.headers + [('Content-Length', str(len(body))), ('ETag', etag)]
+        if use_gzip:
+            headers.append(('Content-Encoding', 'gzip'))
+        start_response('200 OK', headers)
+        return [] if method == 'HEAD' else [body]
@@ -0,0 +1,248 @@
+import atexit
+from datetime import datetime
+import logging
+import threading
+import weakref
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollup
+from .fortune import FORTUNE_CANDIDATE
+from .models import FortuneDrawCount
+
+logger = logging.getLogger(__name__)
+
+
+class _ShardHolder:
+    """ スレッド専用のカウンタをthreading.localへ保持し、スレッドの終了を検知することを責務に持つ """
+
+    def __init__(self, shard: list[int]):
+        """
+        :param shard: スレッド専用のカウンタ
+        """
+        self.shard = shard
+
+
+class DrawCounter:
+    """
+    運勢ごとの抽選回数をプロセス内で数えることを責務に持つ
+    スレッドごとに専用のカウンタを持たせることで、数えるときにはロックを獲得しない
+    終了したスレッドのカウンタは、未永続化の回数を持ち越し分へ移してから破棄する
+    """
+
+    def __init__(self, candidates: Iterable[str] = FORTUNE_CANDIDATE):
+        """
+        :param candidates: 数える対象の運勢
+        """
+        self.candidates = tuple(candidates)
+        self._index = {candidate: index for index, candidate in enumerate(self.candidates)}
+        self._local = threading.local()
+        # 生きているスレッドごとのカウンタ カウンタへ書き込むのは持ち主のスレッドのみ
+        self._shards: dict[int, list[int]] = {}
+        # カウンタごとの、永続化済みの回数
+        self._flushed: dict[int, list[int]] = {}
+        # 終了したスレッドの未永続化の回数・永続化に失敗した回数 次に取り出すときへ持ち越す
+        self._carried = [0] * len(self.candidates)
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def increment(self, fortune: str):
+        """
+        抽選回数を1つ数える
+
+        :param fortune: 抽選された運勢
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._register_shard()
+        holder.shard[self._index[fortune]] += 1
+
+    def pending(self) -> dict[str, int]:
+        """
+        まだ永続化されていない抽選回数
+
+        :return: 運勢と抽選回数の辞書
+        """
+        with self._lock:
+            return self._collect(mark_flushed=False)
+
+    def take_pending(self) -> dict[str, int]:
+        """
+        まだ永続化されていない抽選回数を取り出し、永続化済みとして扱う
+
+        :return: 運勢と抽選回数の辞書
+        """
+        with self._lock:
+            return self._collect(mark_flushed=True)
+
+    def restore(self, deltas: dict[str, int]):
+        """
+        永続化に失敗した抽選回数を、未永続化の状態へ戻す
+
+        :param deltas: take_pendingで取り出した抽選回数
+        """
+        with self._lock:
+            for fortune, count in deltas.items():
+                self._carried[self._index[fortune]] += count
+
+    def _register_shard(self) -> _ShardHolder:
+        """
+        呼び出したスレッド専用のカウンタを用意
+        スレッドが終了するとthreading.localが保持するholderが破棄されるので、そのときにカウンタを畳み込む
+
+        :return: スレッド専用のカウンタを保持するholder
+        """
+        holder = _ShardHolder([0] * len(self.candidates))
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._shards[key] = holder.shard
+            self._flushed[key] = [0] * len(self.candidates)
+        # カウンタ自体の破棄を妨げないよう、弱参照を渡す
+        weakref.finalize(holder, DrawCounter._retire_shard, weakref.ref(self), key)
+        self._local.holder = holder
+        return holder
+
+    @staticmethod
+    def _retire_shard(counter_ref: 'weakref.ref[DrawCounter]', key: int):
+        """
+        終了したスレッドのカウンタの未永続化の回数を持ち越し分へ移し、カウンタを破棄
+
+        :param counter_ref: 抽選回数のカウンタへの弱参照
+        :param key: 破棄するカウンタのキー
+        """
+        counter = counter_ref()
+        if counter is None:
+            return
+        with counter._lock:
+            shard = counter._shards.pop(key)
+            flushed = counter._flushed.pop(key)
+            for index, (count, flushed_count) in enumerate(zip(shard, flushed)):
+                counter._carried[index] += count - flushed_count
+
+    def _collect(self, mark_flushed: bool) -> dict[str, int]:
+        """
+        スレッドごとのカウンタから未永続化の抽選回数を集計 ロックを獲得した状態で呼び出す
+
+        :param mark_flushed: Trueであれば、集計した回数を永続化済みとして扱う
+        :return: 運勢と抽選回数の辞書
+        """
+        totals = list(self._carried)
+        if mark_flushed:
+            self._carried = [0] * len(self.candidates)
+        for key, shard in self._shards.items():
+            # カウンタは持ち主のスレッドが書き換え続けるので、読み取った時点の値のみを扱う
+            current = list(shard)
+            flushed = self._flushed[key]
+            for index, (count, flushed_count) in enumerate(zip(current, flushed)):
+                totals[index] += count - flushed_count
+            if mark_flushed:
+                flushed[:] = current
+
+        return {candidate: total for candidate, total in zip(self.candidates, totals) if total}
+
+
+def persist_counts(deltas: dict[str, int], moment: Optional[datetime] = None):
+    """
+    抽選回数をDBの累計・分単位の区間へ1トランザクションでまとめて加算
+
+    :param deltas: 運勢と加算する抽選回数の辞書
+    :param moment: 抽選された時刻 書き込み間隔の分だけ誤差を含む
+    """
+    with transaction.atomic():
+        # bulk_create(update_conflicts=True)は既存の行を挿入しようとした値で上書きするのみで、
+        # 累計への加算は表せない 候補は数件なので、加算するUPDATEと、行が無いときのINSERTとする
+        for fortune, count in deltas.items():
+            updated = FortuneDrawCount.objects.filter(fortune=fortune).update(count=F('count') + count)
+            if not updated:
+                FortuneDrawCount.objects.create(fortune=fortune, count=count)
+        rollup.record(deltas, moment or timezone.now())
+
+
+def flush(counter: DrawCounter):
+    """
+    未永続化の抽選回数をDBへ書き込む 失敗したときは、次回の書き込みへ持ち越す
+
+    :param counter: 抽選回数のカウンタ
+    """
+    deltas = counter.take_pending()
+    if not deltas:
+        return
+
+    try:
+        persist_counts(deltas)
+    except Exception:
+        counter.restore(deltas)
+        logger.exception('Failed to flush fortune draw counts %s', deltas)
+
+
+def read_counts(counter: DrawCounter) -> dict[str, int]:
+    """
+    DBの累計と未永続化の抽選回数を合算
+
+    :param counter: 抽選回数のカウンタ
+    :return: 運勢と抽選回数の辞書
+    """
+    counts = {candidate: 0 for candidate in counter.candidates}
+    for fortune, count in FortuneDrawCount.objects.values_list('fortune', 'count'):
+        counts[fortune] = counts.get(fortune, 0) + count
+    for fortune, count in counter.pending().items():
+        counts[fortune] += count
+    return counts
+
+
+class StatsFlusher:
+    """ 抽選回数を一定間隔・プロセス終了時にDBへ書き込むバックグラウンドスレッドを責務に持つ """
+
+    def __init__(self, counter: DrawCounter, interval: float):
+        """
+        :param counter: 抽選回数のカウンタ
+        :param interval: 書き込み間隔(秒)
+        """
+        self.counter = counter
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """ バックグラウンドスレッドを開始し、プロセス終了時の書き込みを予約 """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='fortune-stats-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """ バックグラウンドスレッドを止め、残りの抽選回数を書き込む """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        flush(self.counter)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            flush(self.counter)
+            # 長時間生き続けるスレッドなので、DB接続を使い回さずに閉じておく
+            connection.close()
+
+
+# プロセス全体で共有するカウンタ
+DRAW_COUNTER = DrawCounter()
+FLUSHER: Optional[StatsFlusher] = None
+
+
+def start_flusher(interval: float):
+    """
+    プロセスで1つのバックグラウンド書き込みスレッドを開始
+
+    :param interval: 書き込み間隔(秒) 0以下であれば開始しない
+    """
+    global FLUSHER
+    if interval <= 0 or FLUSHER is not None:
+        return
+    FLUSHER = StatsFlusher(DRAW_COUNTER, interval)
+    FLUSHER.start()
@@ -1,9 +1,18 @@
 from django.urls import path
 
-from .views import index, fortune_telling
+from .views import (
+    index, fortune_telling, fortune_shell, fortune_draw, bulk_fortune_telling, fortune_stats, fortune_histogram,
+    fortune_stream
+)
 
 app_name = 'おみくじ'
 urlpatterns = [
     path('', index, name='トップ'),
-    path('fortune_telling/', fortune_telling, name='結果')
+    path('fortune_telling/', fortune_telling, name='結果'),
+    path('fortune_telling/shell/<slug:digest>/', fortune_shell, name='結果外枠'),
+    path('fortune_telling/draw/', fortune_draw, name='抽選'),
+    path('fortune_telling/bulk/', bulk_fortune_telling, name='一括抽選'),
+    path('fortune_telling/stats/', fortune_stats, name='抽選回数'),
+    path('fortune_telling/stats/histogram/', fortune_histogram, name='期間別抽選回数'),
+    path('fortune_telling/stats/stream/', fortune_stream, name='抽選回数配信'),
 ]
@@ -0,0 +1,144 @@
+import hashlib
+import os
+from typing import Callable, Hashable, Iterable, Optional
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+TypeBuildContext = Callable[[Hashable], dict]
+
+
+def _empty_context(key: Hashable) -> dict:
+    """
+    動的なデータを持たないテンプレート向けのコンテキスト
+
+    :param key: バリエーションのキー
+    :return: 空のコンテキスト
+    """
+    return {}
+
+
+class TemplateVariantCache:
+    """
+    テンプレートの描画結果をコンテキストのバリエーションごとにUTF-8のバイト列として保持することを責務に持つ
+    取り得るコンテキストが限られた画面では、リクエストごとにテンプレートエンジンを呼び出さずに済む
+    """
+
+    def __init__(self, template_name: str, keys: Iterable[Hashable] = (None,),
+                 build_context: TypeBuildContext = _empty_context):
+        """
+        :param template_name: テンプレートファイル名
+        :param keys: 事前に描画して保持するバリエーションのキー 他のキーは要求されるたびに描画する
+        :param build_context: キーからテンプレートのコンテキストを組み立てる関数
+        """
+        self.template_name = template_name
+        self.keys = tuple(keys)
+        self.build_context = build_context
+        self._variants: dict[Hashable, bytes] = {}
+        self._digests: dict[Hashable, tuple[bytes, str]] = {}
+        # テンプレートファイルの更新を検知するための、include・extendsで読み込むファイルを含めた最終更新時刻
+        self._template_mtimes: dict[str, Optional[float]] = {}
+
+    def render_all(self):
+        """ すべてのバリエーションを描画し直す """
+        template = get_template(self.template_name)
+        self._template_mtimes = {path: self._mtime(path) for path in self._template_paths(template)}
+
+        self._variants = {
+            key: template.render(self.build_context(key)).encode('utf-8')
+            for key in self.keys
+        }
+
+    def get(self, key: Hashable = None) -> bytes:
+        """
+        描画済みのバリエーションを取得
+
+        :param key: バリエーションのキー
+        :return: 描画結果のバイト列
+        """
+        if not self._variants or (settings.DEBUG and self._is_stale()):
+            self.render_all()
+
+        body = self._variants.get(key)
+        if body is None:
+            # 事前に列挙されていないキーは、リクエストから任意に増やせるので保持せずに都度描画する
+            body = get_template(self.template_name).render(self.build_context(key)).encode('utf-8')
+        return body
+
+    def digest(self, key: Hashable = None) -> str:
+        """
+        描画結果の内容から求めたハッシュ値 内容が変わるとURLが変わるよう、URLへ含めることを想定
+
+        :param key: バリエーションのキー
+        :return: 描画結果のSHA-256ハッシュ値の先頭12文字
+        """
+        body = self.get(key)
+        if key not in self._variants:
+            return hashlib.sha256(body).hexdigest()[:12]
+        # 描画し直されたときのみ計算し直す
+        cached = self._digests.get(key)
+        if cached is None or cached[0] is not body:
+            cached = (body, hashlib.sha256(body).hexdigest()[:12])
+            self._digests[key] = cached
+        return cached[1]
+
+    def response(self, key: Hashable = None) -> HttpResponse:
+        """
+        描画済みのバリエーションをボディとするHTTPレスポンスを組み立てる
+
+        :param key: バリエーションのキー
+        :return: HTTPレスポンス
+        """
+        return HttpResponse(self.get(key))
+
+    @classmethod
+    def _template_paths(cls, template, seen: Optional[set[str]] = None) -> set[str]:
+        """
+        テンプレートと、include・extendsで名前を固定して読み込むテンプレートのファイルパス
+        変数で名前を指定したinclude・extendsは、描画するまで読み込むファイルが決まらないので含めない
+
+        :param template: get_template()で読み込んだテンプレート
+        :param seen: 走査済みのファイルパス 相互に読み込むテンプレートで止まるよう、再帰呼び出しで引き継ぐ
+        :return: ファイルパス ファイルシステム以外から読み込まれたテンプレートは含めない
+        """
+        seen = set() if seen is None else seen
+        path = getattr(template.origin, 'name', None)
+        if path is None or path in seen:
+            return seen
+        seen.add(path)
+
+        nodelist = template.template.nodelist
+        names = [node.template.var for node in nodelist.get_nodes_by_type(IncludeNode)]
+        names += [node.parent_name.var for node in nodelist.get_nodes_by_type(ExtendsNode)]
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            try:
+                cls._template_paths(get_template(name), seen)
+            except TemplateDoesNotExist:
+                continue
+        return seen
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        """
+        ファイルの最終更新時刻
+
+        :param path: ファイルパス
+        :return: 最終更新時刻 ファイルが無ければNone
+        """
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _is_stale(self) -> bool:
+        """
+        描画後に、テンプレート・読み込むテンプレートのいずれかのファイルが更新されたか判定 開発時のみ呼び出す
+
+        :return: 更新されていればTrue
+        """
+        return any(self._mtime(path) != mtime for path, mtime in self._template_mtimes.items())
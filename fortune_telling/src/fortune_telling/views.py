@@ -1,9 +1,69 @@
-from django.http import HttpRequest, HttpResponse
-from django.template.loader import render_to_string
+from datetime import datetime
+import time
+from typing import Optional
 
-from . import fortune as fortune_module
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
 
+from . import fortune as fortune_module, rollup
+from .broadcast import DistributionBroadcaster
+from .daily import DailyFortune, DailyFortuneCache, new_visitor_key
+from .models import Resolution
+from .precompressed import PAGE_CACHE
+from .static_export import static_page
+from .stats import DRAW_COUNTER, read_counts
+from .variant_cache import TemplateVariantCache
 
+# 一括抽選で1リクエストあたりに受け付ける抽選回数の上限 認証なしのGETで受け付けるので、CPU時間を0.2秒程度に抑える
+BULK_DRAW_LIMIT = 1_000_000
+
+# 結果画面の外枠を、ブラウザへキャッシュさせる期間(秒) 内容が変わるとURLが変わるので、無期限とみなせる
+SHELL_MAX_AGE = 60 * 60 * 24 * 365
+
+# 画面が取り得るバリエーションは限られるので、描画結果を使い回す
+FORTUNE_PAGE = TemplateVariantCache(
+    'fortune.html',
+    keys=fortune_module.FORTUNE_CANDIDATE,
+    build_context=lambda fortune: {'fortune': fortune}
+)
+FORTUNE_SHELL_PAGE = TemplateVariantCache('fortune_shell.html')
+
+
+def shell_url() -> str:
+    """
+    結果画面の外枠のURL 内容のハッシュ値を含む
+
+    :return: 結果画面の外枠のURL
+    """
+    return reverse('おみくじ:結果外枠', args=[FORTUNE_SHELL_PAGE.digest()])
+
+
+# トップ画面は、結果画面の外枠へ遷移するか否かのみで変わる
+INDEX_PAGE = TemplateVariantCache(
+    'index.html',
+    keys=(False, True),
+    build_context=lambda use_shell: {'fortune_url': shell_url() if use_shell else None}
+)
+DAILY_FORTUNES = DailyFortuneCache(FORTUNE_PAGE.get, maxsize=settings.FORTUNE_DAILY_CACHE_SIZE)
+
+# 運勢の分布の配信 DBの読み取りは購読者の数に関わらず1間隔に1回とする
+DISTRIBUTION_BROADCASTER = DistributionBroadcaster(
+    lambda: sync_to_async(read_counts)(DRAW_COUNTER),
+    interval=settings.FORTUNE_STREAM_INTERVAL
+)
+
+# 訪問者を識別する文字列を保持するCookie
+VISITOR_COOKIE_NAME = 'fortune_visitor'
+VISITOR_COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+@static_page
 def index(request: HttpRequest) -> HttpResponse:
     """
     トップ画面表示
@@ -11,7 +71,10 @@ def index(request: HttpRequest) -> HttpResponse:
     :param request: HTTPリクエスト
     :return: トップ画面をボディに持つHTTPレスポンス
     """
-    return HttpResponse(render_to_string('index.html'))
+    use_shell = settings.FORTUNE_SHELL
+    # 描画結果のハッシュ値をキーとするので、テンプレートが変わると別のページとして圧縮し直す
+    return PAGE_CACHE.respond(request, ('index.html', INDEX_PAGE.digest(use_shell)),
+                              lambda: INDEX_PAGE.get(use_shell))
 
 
 def fortune_telling(request: HttpRequest) -> HttpResponse:
@@ -21,9 +84,197 @@ def fortune_telling(request: HttpRequest) -> HttpResponse:
     :param request: HTTPリクエスト
     :return: おみくじ結果画面をボディに持つHTTPレスポンス
     """
+    if settings.FORTUNE_SHELL:
+        return redirect(shell_url())
+    if settings.FORTUNE_DAILY:
+        return daily_fortune_telling(request)
+
+    fortune = fortune_module.tell_fortune()
+    DRAW_COUNTER.increment(fortune)
+
+    return FORTUNE_PAGE.response(fortune)
+
+
+def daily_fortune_telling(request: HttpRequest) -> HttpResponse:
+    """
+    訪問者ごとに、その日のあいだ変わらないおみくじ結果画面を表示
+    運勢が切り替わる0時まではブラウザへキャッシュさせる
+
+    :param request: HTTPリクエスト
+    :return: おみくじ結果画面をボディに持つHTTPレスポンス
+    """
+    daily_fortune, new_key = _draw_daily_fortune(request)
+
+    return _cache_until_tomorrow(HttpResponse(daily_fortune.body), daily_fortune, new_key)
+
+
+def fortune_shell(request: HttpRequest, digest: str) -> HttpResponse:
+    """
+    運勢を含まない結果画面の外枠を表示 運勢はfortune_drawから取得する
+    URLに内容のハッシュ値を含むので、ブラウザ・CDNへ無期限にキャッシュさせる
+
+    :param request: HTTPリクエスト
+    :param digest: 結果画面の外枠のハッシュ値
+    :return: 結果画面の外枠をボディに持つHTTPレスポンス
+    """
+    if digest != FORTUNE_SHELL_PAGE.digest():
+        # 古いハッシュ値のURLは、最新の外枠へ誘導する
+        return redirect(shell_url())
+
+    response = FORTUNE_SHELL_PAGE.response()
+    patch_cache_control(response, public=True, max_age=SHELL_MAX_AGE, immutable=True)
+    return response
+
+
+def fortune_draw(request: HttpRequest) -> JsonResponse:
+    """
+    運勢のみをJSONとして返却
+
+    :param request: HTTPリクエスト
+    :return: 運勢をボディに持つHTTPレスポンス
+    """
+    if settings.FORTUNE_DAILY:
+        daily_fortune, new_key = _draw_daily_fortune(request)
+        response = JsonResponse({'fortune': daily_fortune.fortune}, json_dumps_params={'ensure_ascii': False})
+        return _cache_until_tomorrow(response, daily_fortune, new_key)
+
     fortune = fortune_module.tell_fortune()
-    context = {
-        'fortune': fortune
+    DRAW_COUNTER.increment(fortune)
+
+    response = JsonResponse({'fortune': fortune}, json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def _draw_daily_fortune(request: HttpRequest) -> tuple[DailyFortune, Optional[str]]:
+    """
+    訪問者のその日の運勢を取得 初めての訪問者には識別子を発行する
+
+    :param request: HTTPリクエスト
+    :return: 訪問者のその日の運勢・新たに発行した訪問者の識別子
+    """
+    visitor_key = request.COOKIES.get(VISITOR_COOKIE_NAME)
+    new_key = None
+    if not visitor_key:
+        visitor_key = new_key = new_visitor_key()
+
+    daily_fortune = DAILY_FORTUNES.get(visitor_key)
+    DRAW_COUNTER.increment(daily_fortune.fortune)
+    return daily_fortune, new_key
+
+
+def _cache_until_tomorrow(response: HttpResponse, daily_fortune: DailyFortune,
+                          new_key: Optional[str]) -> HttpResponse:
+    """
+    運勢が切り替わる0時まで、レスポンスをブラウザへキャッシュさせる
+
+    :param response: HTTPレスポンス
+    :param daily_fortune: 訪問者のその日の運勢
+    :param new_key: 新たに発行した訪問者の識別子
+    :return: HTTPレスポンス
+    """
+    patch_cache_control(response, private=True, max_age=max(0, int(daily_fortune.expires_at - time.time())))
+    if new_key is not None:
+        response.set_cookie(VISITOR_COOKIE_NAME, new_key, max_age=VISITOR_COOKIE_MAX_AGE, httponly=True,
+                            samesite='Lax')
+    return response
+
+
+def bulk_fortune_telling(request: HttpRequest) -> JsonResponse:
+    """
+    運勢を一括で抽選し、候補ごとの回数をJSONとして返却
+    クエリパラメータnで抽選回数を、weightsでカンマ区切りの候補ごとの重みを指定
+
+    :param request: HTTPリクエスト
+    :return: 抽選回数・候補ごとの回数をボディに持つHTTPレスポンス
+    """
+    try:
+        n = int(request.GET.get('n', '1'))
+        weights_param = request.GET.get('weights')
+        weights = [float(weight) for weight in weights_param.split(',')] if weights_param else None
+
+        if not 0 <= n <= BULK_DRAW_LIMIT:
+            raise ValueError(f'n must be between 0 and {BULK_DRAW_LIMIT}.')
+        counts = fortune_module.count_fortunes(n, weights)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'n': n,
+        'counts': counts,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def fortune_stats(request: HttpRequest) -> JsonResponse:
+    """
+    運勢ごとの抽選回数をJSONとして返却 DBの累計へ、プロセス内でまだ書き込まれていない回数を合算する
+
+    :param request: HTTPリクエスト
+    :return: 運勢ごとの抽選回数をボディに持つHTTPレスポンス
+    """
+    counts = read_counts(DRAW_COUNTER)
+
+    return JsonResponse({
+        'total': sum(counts.values()),
+        'counts': counts,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+async def fortune_stream(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    運勢ごとの抽選回数の変化をServer-Sent Eventsとして配信 ASGIで動かすことを前提とする
+
+    :param request: HTTPリクエスト
+    :return: 抽選回数のイベントを送り続けるHTTPレスポンス
+    """
+    stream = DISTRIBUTION_BROADCASTER.stream(settings.FORTUNE_STREAM_MAX_AGE, settings.FORTUNE_STREAM_RETRY_MS)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # リバースプロキシでバッファリングさせない
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def fortune_histogram(request: HttpRequest) -> JsonResponse:
+    """
+    期間内の運勢ごとの抽選回数をJSONとして返却
+    クエリパラメータstart・endでISO 8601形式の期間を、resolutionを指定すると区間ごとの抽選回数を返す
+
+    :param request: HTTPリクエスト
+    :return: 期間内の抽選回数をボディに持つHTTPレスポンス
+    """
+    try:
+        start = _parse_moment(request.GET.get('start'))
+        end = _parse_moment(request.GET.get('end')) if request.GET.get('end') else timezone.now()
+        resolution = request.GET.get('resolution')
+        if resolution is not None and resolution not in Resolution.values:
+            raise ValueError(f'resolution must be one of {Resolution.values}.')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    body = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
     }
+    if resolution is None:
+        body['counts'] = rollup.histogram(start, end)
+    else:
+        body['resolution'] = resolution
+        body['buckets'] = [
+            {'started_at': started_at.isoformat(), 'counts': counts}
+            for started_at, counts in rollup.series(start, end, resolution)
+        ]
+    return JsonResponse(body, json_dumps_params={'ensure_ascii': False})
+
 
-    return HttpResponse(render_to_string('fortune.html', context=context))
+def _parse_moment(value: str) -> datetime:
+    """
+    ISO 8601形式の文字列をaware datetimeへ変換 タイムゾーンを持たなければ設定TIME_ZONEとみなす
+
+    :param value: 日時を表す文字列
+    :return: aware datetime
+    """
+    moment = parse_datetime(value or '')
+    if moment is None:
+        raise ValueError(f'invalid datetime: {value}')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
@@ -0,0 +1,183 @@
+import asyncio
+import tracemalloc
+
+from fortune_telling.broadcast import (
+    DistributionBroadcaster, Subscription, KEEPALIVE_FRAME, encode_event, encode_retry
+)
+
+
+class Snapshots:
+    """ 呼び出されるたびに、用意した分布を順に返す """
+
+    def __init__(self, *snapshots: dict):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        return self.snapshots[min(self.calls, len(self.snapshots)) - 1]
+
+
+async def open_stream(broadcaster: DistributionBroadcaster, max_age: float = 60.0):
+    """ 配信を購読し、先頭の再接続までの待ち時間を読み飛ばしたストリームを返す """
+    stream = broadcaster.stream(max_age, 1000)
+    assert await stream.__anext__() == encode_retry(1000)
+    return stream
+
+
+class TestSubscription:
+    """ 購読者ごとに最新のフレームのみを保持できるか """
+
+    # 送信が追いつかないときは、古いフレームを捨てて最新のみを送るか
+    def test_drop_intermediate_frames(self):
+        async def run():
+            # GIVEN
+            sut = Subscription()
+            # WHEN
+            for frame in (b'1', b'2', b'3'):
+                sut.offer(frame)
+            return await sut.next_frame(), sut.dropped
+
+        # WHEN
+        actual, dropped = asyncio.run(run())
+        # THEN
+        assert actual == b'3'
+        assert dropped == 2
+
+
+class TestDistributionBroadcaster:
+    """ 運勢の分布をまとめて配信できるか """
+
+    # 分布の読み取りは購読者の数に関わらず1間隔に1回か
+    def test_single_snapshot_for_all_subscribers(self):
+        async def run():
+            # GIVEN
+            snapshot = Snapshots({'大吉': 1})
+            sut = DistributionBroadcaster(snapshot, interval=10)
+            subscriptions = [sut.subscribe() for _ in range(100)]
+            # WHEN
+            frames = await asyncio.gather(*(subscription.next_frame() for subscription in subscriptions))
+            return snapshot.calls, frames
+
+        # WHEN
+        calls, frames = asyncio.run(run())
+        # THEN
+        assert calls == 1
+        assert set(frames) == {encode_event('distribution', {'大吉': 1})}
+
+    # 分布が変わらなければ配信せず、接続を保つためのコメント行のみを送るか
+    def test_coalesce_unchanged_distribution(self):
+        async def run():
+            # GIVEN
+            snapshot = Snapshots({'大吉': 1})
+            sut = DistributionBroadcaster(snapshot, interval=0, keepalive=0)
+            subscription = sut.subscribe()
+            # WHEN
+            first = await subscription.next_frame()
+            second = await subscription.next_frame()
+            sut.unsubscribe(subscription)
+            return first, second
+
+        # WHEN
+        first, second = asyncio.run(run())
+        # THEN
+        assert first == encode_event('distribution', {'大吉': 1})
+        assert second == KEEPALIVE_FRAME
+
+    # 分布の読み取りに失敗しても配信を止めず、次の間隔で読み取り直すか
+    def test_recover_from_snapshot_failure(self):
+        snapshot = Snapshots({'大吉': 1})
+
+        async def flaky() -> dict:
+            if snapshot.calls == 0:
+                snapshot.calls += 1
+                raise RuntimeError('database is down')
+            return await snapshot()
+
+        async def run():
+            # GIVEN
+            sut = DistributionBroadcaster(flaky, interval=0, clock=lambda: 0.0)
+            stream = await open_stream(sut)
+            # WHEN
+            frame = await asyncio.wait_for(stream.__anext__(), timeout=5)
+            await stream.aclose()
+            return frame
+
+        # WHEN
+        frame = asyncio.run(run())
+        # THEN
+        assert frame == encode_event('distribution', {'大吉': 1})
+
+    # 購読者がいなくなると配信を止めるか
+    def test_stop_without_subscribers(self):
+        async def run():
+            # GIVEN
+            sut = DistributionBroadcaster(Snapshots({'大吉': 1}), interval=0)
+            stream = await open_stream(sut)
+            await stream.__anext__()
+            # WHEN
+            await stream.aclose()
+            await asyncio.sleep(0.01)
+            return sut
+
+        # WHEN
+        sut = asyncio.run(run())
+        # THEN
+        assert not sut.subscribers
+        assert sut._task.done()
+
+    # クライアントが切断しても読み取りが続く場合に、接続の寿命が過ぎると購読を終了するか
+    def test_unsubscribe_after_max_age(self):
+        async def run():
+            # GIVEN
+            sut = DistributionBroadcaster(Snapshots({'大吉': 1}), interval=0.001)
+            stream = await open_stream(sut, max_age=0.05)
+            frames = []
+            # WHEN
+            # Djangoは切断を検知しないので、ストリームが終わるまで読み取りを続ける
+            async for frame in stream:
+                frames.append(frame)
+            await asyncio.sleep(0.01)
+            return sut, frames
+
+        # WHEN
+        sut, frames = asyncio.run(asyncio.wait_for(run(), timeout=5))
+        # THEN
+        assert frames[0] == encode_event('distribution', {'大吉': 1})
+        assert not sut.subscribers
+        assert sut._task.done()
+
+    # 何千もの購読者がいても、読み取らない購読者の分だけメモリが増え続けないか
+    def test_soak_memory_per_subscriber(self):
+        subscribers = 5000
+        frames = 20
+        last_frame = encode_event('distribution', {'大吉': frames})
+
+        async def read_until_last(stream):
+            while await stream.__anext__() != last_frame:
+                pass
+
+        async def run():
+            # GIVEN
+            snapshots = Snapshots(*({'大吉': count} for count in range(1, frames + 1)))
+            sut = DistributionBroadcaster(snapshots, interval=0.001)
+            tracemalloc.start()
+            before, _ = tracemalloc.get_traced_memory()
+            # WHEN
+            streams = await asyncio.gather(*(open_stream(sut) for _ in range(subscribers)))
+            # 半数の購読者は最初のフレームのみを受け取り、以降は読み取らない遅いクライアントとする
+            await asyncio.gather(*(stream.__anext__() for stream in streams))
+            await asyncio.gather(*(read_until_last(stream) for stream in streams[:subscribers // 2]))
+            after, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            dropped = sum(subscription.dropped for subscription in sut.subscribers)
+            for stream in streams:
+                await stream.aclose()
+            return (after - before) / subscribers, dropped
+
+        # WHEN
+        memory_per_subscriber, dropped = asyncio.run(run())
+        # THEN
+        assert memory_per_subscriber < 4096
+        assert dropped > 0
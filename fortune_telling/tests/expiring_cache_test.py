@@ -0,0 +1,56 @@
+from fortune_telling.expiring_cache import ExpiringLRUCache
+
+
+class FakeClock:
+    """ テストから現在時刻を進められる時計 """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestExpiringLRUCache:
+    """ 要素数の上限・有効期限を持つLRUキャッシュとして振る舞うか """
+
+    # 保持した要素を取得できるか
+    def test_get(self):
+        # GIVEN
+        sut = ExpiringLRUCache(maxsize=2)
+        sut.set('key', 'value')
+        # WHEN
+        actual = sut.get('key')
+        # THEN
+        assert actual == 'value'
+        assert sut.hits == 1
+
+    # 上限を超えると、最も長く参照されていない要素が破棄されるか
+    def test_evict_least_recently_used(self):
+        # GIVEN
+        sut = ExpiringLRUCache(maxsize=2)
+        sut.set('a', 1)
+        sut.set('b', 2)
+        sut.get('a')
+        # WHEN
+        sut.set('c', 3)
+        # THEN
+        assert sut.get('a') == 1
+        assert sut.get('b') is None
+        assert sut.get('c') == 3
+
+    # 有効期限を過ぎた要素は取得できず、まとめて破棄されるか
+    def test_expire(self):
+        # GIVEN
+        clock = FakeClock()
+        sut = ExpiringLRUCache(maxsize=10, clock=clock)
+        sut.set('a', 1, expires_at=100)
+        sut.set('b', 2, expires_at=100)
+        sut.set('c', 3, expires_at=200)
+        # WHEN
+        clock.now = 100
+        actual = sut.get('a')
+        # THEN
+        assert actual is None
+        assert len(sut) == 1
+        assert sut.get('c') == 3
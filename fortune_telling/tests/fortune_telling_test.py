@@ -1,4 +1,11 @@
-from fortune_telling.fortune import tell_fortune, FORTUNE_CANDIDATE
+from datetime import date
+import random
+
+import pytest
+
+from fortune_telling.fortune import (
+    tell_fortune, tell_fortunes, tell_daily_fortune, count_fortunes, build_draw_table, FORTUNE_CANDIDATE, DRAW_TABLE_SIZE
+)
 
 
 # 運勢は候補の中から選ばれるか
@@ -9,3 +16,134 @@ def test_fortune_in_candidate():
     actual = sut()
     # THEN
     assert actual in FORTUNE_CANDIDATE
+
+
+class TestBuildDrawTable:
+    """ 重みに比例した抽選表を組み立てられるか """
+
+    # 表の大きさは16bitの乱数の取り得る値と一致するか
+    def test_table_size(self):
+        # GIVEN
+        weights = (1.0, 1.0, 1.0)
+        # WHEN
+        actual = build_draw_table(weights)
+        # THEN
+        assert len(actual) == DRAW_TABLE_SIZE
+
+    # 候補ごとの枠数は重みに比例するか
+    def test_slots_proportional(self):
+        # GIVEN
+        weights = (1.0, 0.0, 3.0)
+        # WHEN
+        actual = build_draw_table(weights)
+        # THEN
+        assert actual.count(0) == DRAW_TABLE_SIZE // 4
+        assert actual.count(1) == 0
+        assert actual.count(2) == DRAW_TABLE_SIZE // 4 * 3
+
+
+class TestTellFortunes:
+    """ 運勢を一括で抽選できるか """
+
+    # 抽選回数分の候補の添字が得られるか
+    def test_length(self):
+        # GIVEN
+        sut = tell_fortunes
+        # WHEN
+        actual = sut(1000)
+        # THEN
+        assert len(actual) == 1000
+        assert set(actual) <= set(range(len(FORTUNE_CANDIDATE)))
+
+    # 同じ乱数の種からは同じ結果が得られるか
+    def test_reproducible(self):
+        # GIVEN
+        sut = tell_fortunes
+        # WHEN
+        first = sut(1000, rng=random.Random(1))
+        second = sut(1000, rng=random.Random(1))
+        # THEN
+        assert first == second
+
+    # 重みが一様であれば、各候補はおおよそ同じ回数だけ抽選されるか
+    def test_uniform_distribution(self):
+        # GIVEN
+        n = 300_000
+        # WHEN
+        actual = count_fortunes(n, rng=random.Random(0))
+        # THEN
+        assert sum(actual.values()) == n
+        assert chi_square(actual, (1, 1, 1)) < CHI_SQUARE_CRITICAL
+
+    # 重み付きの抽選では、各候補は重みに比例した回数だけ抽選されるか
+    def test_weighted_distribution(self):
+        # GIVEN
+        n = 300_000
+        weights = (1, 2, 7)
+        # WHEN
+        actual = count_fortunes(n, weights, rng=random.Random(0))
+        # THEN
+        assert chi_square(actual, weights) < CHI_SQUARE_CRITICAL
+
+    # 重みが0の候補は抽選されないか
+    def test_zero_weight(self):
+        # GIVEN
+        weights = (0, 0, 1)
+        # WHEN
+        actual = count_fortunes(10_000, weights)
+        # THEN
+        assert actual == {'小吉': 0, '中吉': 0, '大吉': 10_000}
+
+    # 不正な重みは例外となるか
+    @pytest.mark.parametrize('weights', [
+        (1, 2), (1, -1, 1), (0, 0, 0), (1e308, 1e308, 1), (float('inf'), 1, 1), (float('nan'), 1, 1),
+    ])
+    def test_invalid_weights(self, weights):
+        with pytest.raises(ValueError):
+            tell_fortunes(1, weights)
+
+
+# 自由度2・有意水準0.1%のカイ二乗分布の臨界値
+CHI_SQUARE_CRITICAL = 13.82
+
+
+def chi_square(counts: dict[str, int], weights) -> float:
+    """
+    抽選結果が重みに従うかを表すカイ二乗統計量
+
+    :param counts: 候補ごとの抽選回数
+    :param weights: 候補ごとの重み
+    :return: カイ二乗統計量
+    """
+    n = sum(counts.values())
+    total = sum(weights)
+    return sum(
+        (counts[candidate] - n * weight / total) ** 2 / (n * weight / total)
+        for candidate, weight in zip(FORTUNE_CANDIDATE, weights)
+    )
+
+
+class TestTellDailyFortune:
+    """ 訪問者・日付から運勢を決定的に生成できるか """
+
+    # 同じ訪問者・日付からは同じ運勢が得られるか
+    def test_deterministic(self):
+        # GIVEN
+        sut = tell_daily_fortune
+        day = date(2022, 1, 1)
+        # WHEN
+        first = sut('visitor', day)
+        second = sut('visitor', day)
+        # THEN
+        assert first == second
+        assert first in FORTUNE_CANDIDATE
+
+    # 訪問者が異なれば、運勢は候補全体へ偏りなく散らばるか
+    def test_distribution_over_visitors(self):
+        # GIVEN
+        day = date(2022, 1, 1)
+        # WHEN
+        fortunes = [tell_daily_fortune(f'visitor-{i}', day) for i in range(30_000)]
+        actual = {candidate: fortunes.count(candidate) for candidate in FORTUNE_CANDIDATE}
+        # THEN
+        assert chi_square(actual, (1, 1, 1)) < CHI_SQUARE_CRITICAL
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+
+from fortune_telling import rollup
+from fortune_telling.models import FortuneDrawBucket, Resolution
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TestTimeBoundary:
+    """ 時刻を粒度の区間の境界へ丸められるか """
+
+    # 粒度ごとに区間の開始時刻へ切り捨てられるか
+    @pytest.mark.parametrize('resolution, expected', [
+        (Resolution.MINUTE, utc(2022, 3, 15, 10, 20)),
+        (Resolution.HOUR, utc(2022, 3, 15, 10)),
+        (Resolution.DAY, utc(2022, 3, 15)),
+        (Resolution.MONTH, utc(2022, 3, 1)),
+    ])
+    def test_floor(self, resolution, expected):
+        # GIVEN
+        moment = utc(2022, 3, 15, 10, 20, 30)
+        # WHEN
+        actual = rollup.floor_time(moment, resolution)
+        # THEN
+        assert actual == expected
+
+    # 月の区間は、月末日に関わらず翌月の初日へ進むか
+    def test_next_month(self):
+        # GIVEN
+        started_at = utc(2022, 1, 1)
+        # WHEN
+        actual = rollup.next_time(started_at, Resolution.MONTH)
+        # THEN
+        assert actual == utc(2022, 2, 1)
+
+
+class TestPlanSegments:
+    """ 範囲をできるだけ粗い粒度の区間で覆えるか """
+
+    # 集約済みの粒度では粗い区間を、端の部分では細かい区間を読み取るか
+    def test_mixed_levels(self):
+        # GIVEN
+        states = {
+            Resolution.HOUR: utc(2022, 6, 1),
+            Resolution.DAY: utc(2022, 6, 1),
+            Resolution.MONTH: utc(2022, 6, 1),
+        }
+        start = utc(2021, 12, 31, 23, 30)
+        end = utc(2022, 6, 1, 0, 10)
+        # WHEN
+        actual = rollup.plan_segments(start, end, states)
+        # THEN
+        assert actual == [
+            rollup.Segment(Resolution.MINUTE, start, utc(2022, 1, 1)),
+            rollup.Segment(Resolution.MONTH, utc(2022, 1, 1), utc(2022, 6, 1)),
+            rollup.Segment(Resolution.MINUTE, utc(2022, 6, 1), end),
+        ]
+
+    # 集約されていなければ、分単位の区間のみを読み取るか
+    def test_without_rollup(self):
+        # GIVEN
+        start = utc(2022, 1, 1)
+        end = utc(2022, 2, 1)
+        # WHEN
+        actual = rollup.plan_segments(start, end, {})
+        # THEN
+        assert actual == [rollup.Segment(Resolution.MINUTE, start, end)]
+
+    # 1年分の範囲でも、読み取る区間の数は限られるか
+    def test_year_range(self):
+        # GIVEN
+        states = {resolution: utc(2023, 1, 1) for resolution in rollup.RESOLUTIONS[1:]}
+        start = utc(2022, 1, 1, 0, 1)
+        end = utc(2022, 12, 31, 23, 59)
+        # WHEN
+        segments = rollup.plan_segments(start, end, states)
+        # THEN
+        assert {segment.resolution for segment in segments} == set(rollup.RESOLUTIONS)
+        assert len(segments) == 7
+
+
+@pytest.mark.django_db
+class TestRollup:
+    """ 分単位の区間を粗い粒度へ集約し、範囲を集計できるか """
+
+    # 完了した区間のみが粗い粒度へ集約されるか
+    def test_rollup(self):
+        # GIVEN
+        rollup.record({'大吉': 2}, utc(2022, 1, 1, 10, 0))
+        rollup.record({'大吉': 3, '小吉': 1}, utc(2022, 1, 1, 10, 59))
+        rollup.record({'大吉': 5}, utc(2022, 1, 2, 0, 30))
+        # WHEN
+        rollup.rollup(now=utc(2022, 1, 2, 0, 45))
+        # THEN
+        hours = dict(FortuneDrawBucket.objects.filter(
+            resolution=Resolution.HOUR, fortune='大吉'
+        ).values_list('started_at', 'count'))
+        days = dict(FortuneDrawBucket.objects.filter(
+            resolution=Resolution.DAY, fortune='大吉'
+        ).values_list('started_at', 'count'))
+        assert hours == {utc(2022, 1, 1, 10): 5}
+        assert days == {utc(2022, 1, 1): 5}
+
+    # 何度集約しても結果は変わらないか
+    def test_idempotent(self):
+        # GIVEN
+        rollup.record({'大吉': 2}, utc(2022, 1, 1, 10, 0))
+        now = utc(2022, 1, 3)
+        rollup.rollup(now=now)
+        # WHEN
+        rollup.rollup(now=now)
+        # THEN
+        day = FortuneDrawBucket.objects.get(resolution=Resolution.DAY, fortune='大吉')
+        assert day.count == 2
+
+    # 集約済みの区間へ遅れて書き込まれた回数も、粗い粒度の区間へ反映されるか
+    def test_late_record(self):
+        # GIVEN
+        rollup.record({'大吉': 2}, utc(2022, 1, 1, 10, 0))
+        rollup.rollup(now=utc(2022, 1, 2, 0, 45))
+        # WHEN
+        rollup.record({'大吉': 3, '小吉': 1}, utc(2022, 1, 1, 10, 59))
+        rollup.record({'大吉': 4}, utc(2022, 1, 2, 0, 10))
+        rollup.rollup(now=utc(2022, 1, 3, 0, 45))
+        # THEN
+        hours = dict(FortuneDrawBucket.objects.filter(
+            resolution=Resolution.HOUR, fortune='大吉'
+        ).values_list('started_at', 'count'))
+        days = dict(FortuneDrawBucket.objects.filter(
+            resolution=Resolution.DAY, fortune='大吉'
+        ).values_list('started_at', 'count'))
+        assert hours == {utc(2022, 1, 1, 10): 5, utc(2022, 1, 2, 0): 4}
+        assert days == {utc(2022, 1, 1): 5, utc(2022, 1, 2): 4}
+        assert rollup.histogram(utc(2022, 1, 1), utc(2022, 1, 3)) == {'大吉': 9, '小吉': 1}
+
+    # 集約後も、範囲の抽選回数は分単位で数えたものと一致するか
+    def test_histogram(self):
+        # GIVEN
+        rollup.record({'大吉': 2}, utc(2022, 1, 1, 10, 0))
+        rollup.record({'中吉': 1}, utc(2022, 1, 5, 12, 0))
+        rollup.record({'大吉': 4}, utc(2022, 2, 3, 8, 15))
+        rollup.rollup(now=utc(2022, 2, 3, 8, 30))
+        # WHEN
+        actual = rollup.histogram(utc(2022, 1, 1), utc(2022, 2, 3, 8, 20))
+        # THEN
+        assert actual == {'大吉': 6, '中吉': 1}
+
+    # 保持期間を過ぎた細かい区間が破棄されても、粗い区間から集計できるか
+    def test_retention(self):
+        # GIVEN
+        rollup.record({'大吉': 2}, utc(2022, 1, 1, 10, 0))
+        now = utc(2022, 3, 1)
+        rollup.rollup(now=now)
+        # WHEN
+        deleted = rollup.apply_retention({Resolution.MINUTE: timedelta(days=2)}, now=now)
+        # THEN
+        assert deleted[Resolution.MINUTE] == 1
+        assert not FortuneDrawBucket.objects.filter(resolution=Resolution.MINUTE).exists()
+        assert rollup.histogram(utc(2022, 1, 1), utc(2022, 2, 1)) == {'大吉': 2}
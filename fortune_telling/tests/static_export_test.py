@@ -0,0 +1,150 @@
+import gzip
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from django.core.management import call_command
+from django.template.loader import render_to_string
+
+from fortune_telling import static_export
+
+
+def export(output_dir: Path, *args: str) -> str:
+    """
+    静的なページを書き出すコマンドを実行
+
+    :param output_dir: 書き出し先ディレクトリ
+    :param args: 追加のコマンドライン引数
+    :return: コマンドの出力
+    """
+    stdout = StringIO()
+    call_command('export_static_pages', '--output', str(output_dir), '--host', 'testserver', *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def start_response_recorder() -> tuple[list, Callable]:
+    """
+    WSGIのstart_responseへ渡された値を記録する関数
+
+    :return: 記録先・start_response関数
+    """
+    recorded = []
+
+    def start_response(status, headers):
+        recorded.append((status, dict(headers)))
+
+    return recorded, start_response
+
+
+class TestFindCandidates:
+    """ URLパターンごとに、静的なファイルとして書き出せるか判定できるか検証 """
+
+    # 目印を付与したパラメータの無いパターンのみを書き出せると判定するか
+    def test_eligible(self):
+        # GIVEN
+        expected = ['/fortune/']
+        # WHEN
+        actual = [candidate.url for candidate in static_export.find_candidates() if candidate.eligible]
+        # THEN
+        assert actual == expected
+
+    # 書き出せない理由を判定するか
+    def test_reason(self):
+        # GIVEN
+        expected = {
+            '/fortune/fortune_telling/': static_export.REASON_NOT_MARKED,
+            '/fortune/fortune_telling/shell/<slug:digest>/': static_export.REASON_HAS_PARAMETERS,
+        }
+        # WHEN
+        candidates = {candidate.url: candidate.reason for candidate in static_export.find_candidates()}
+        actual = {url: candidates[url] for url in expected}
+        # THEN
+        assert actual == expected
+
+
+class TestExportStaticPages:
+    """ トップ画面をファイルへ書き出せるか検証 """
+
+    # 本文・gzip形式・一覧を書き出すか
+    def test_export(self, tmp_path: Path):
+        # GIVEN
+        expected = render_to_string('index.html').encode('utf-8')
+        # WHEN
+        export(tmp_path)
+        manifest = json.loads((tmp_path / static_export.MANIFEST_NAME).read_text(encoding='utf-8'))
+        entry = manifest['/fortune/']
+        # THEN
+        assert list(manifest) == ['/fortune/']
+        assert entry['file'] == 'fortune/index.html'
+        assert entry['content_type'] == 'text/html; charset=utf-8'
+        assert (tmp_path / entry['file']).read_bytes() == expected
+        assert gzip.decompress((tmp_path / entry['gzip_file']).read_bytes()) == expected
+        assert 'X-Frame-Options' in entry['headers']
+
+    # 書き出したページで応答できるリクエストの割合を報告するか
+    def test_access_log(self, tmp_path: Path):
+        # GIVEN
+        access_log = tmp_path / 'access.log'
+        access_log.write_text('\n'.join([
+            '127.0.0.1 - - [18/Oct/2026:10:00:00 +0900] "GET /fortune/ HTTP/1.1" 200 1024',
+            '127.0.0.1 - - [18/Oct/2026:10:00:01 +0900] "GET /fortune/fortune_telling/ HTTP/1.1" 200 512',
+            '127.0.0.1 - - [18/Oct/2026:10:00:02 +0900] "HEAD /fortune/ HTTP/1.1" 200 0',
+            '127.0.0.1 - - [18/Oct/2026:10:00:03 +0900] "POST /fortune/ HTTP/1.1" 405 0',
+        ]), encoding='utf-8')
+        expected = '2 of 4 requests (50.0%) could be served without Django'
+        # WHEN
+        actual = export(tmp_path / 'export', '--access-log', str(access_log))
+        # THEN
+        assert expected in actual
+
+
+class TestExportedPagesApplication:
+    """ 書き出したページをDjangoを経由せずに返却できるか検証 """
+
+    # gzip形式を受け付けるリクエストへ、書き出したgzip形式を返却するか
+    def test_gzip(self, tmp_path: Path):
+        # GIVEN
+        export(tmp_path)
+        application = static_export.ExportedPagesApplication(lambda environ, start_response: [b'django'], tmp_path)
+        recorded, start_response = start_response_recorder()
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/fortune/', 'HTTP_ACCEPT_ENCODING': 'gzip'}
+        # WHEN
+        body = b''.join(application(environ, start_response))
+        status, headers = recorded[0]
+        # THEN
+        assert status == '200 OK'
+        assert headers['Content-Encoding'] == 'gzip'
+        assert headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(body) == render_to_string('index.html').encode('utf-8')
+
+    # gzip形式を受け付けないリクエストへ、圧縮していない本文を返却するか
+    @pytest.mark.parametrize('accept_encoding', ['', 'gzip;q=0', 'deflate, *;q=0'])
+    def test_identity(self, tmp_path: Path, accept_encoding: str):
+        # GIVEN
+        export(tmp_path)
+        application = static_export.ExportedPagesApplication(lambda environ, start_response: [b'django'], tmp_path)
+        recorded, start_response = start_response_recorder()
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/fortune/', 'HTTP_ACCEPT_ENCODING': accept_encoding}
+        # WHEN
+        body = b''.join(application(environ, start_response))
+        status, headers = recorded[0]
+        # THEN
+        assert status == '200 OK'
+        assert 'Content-Encoding' not in headers
+        assert body == render_to_string('index.html').encode('utf-8')
+
+    # 書き出していないURLはDjangoへ委ねるか
+    def test_fallback(self, tmp_path: Path):
+        # GIVEN
+        export(tmp_path)
+        application = static_export.ExportedPagesApplication(lambda environ, start_response: [b'django'], tmp_path)
+        recorded, start_response = start_response_recorder()
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/fortune/fortune_telling/'}
+        expected = [b'django']
+        # WHEN
+        actual = application(environ, start_response)
+        # THEN
+        assert actual == expected
+        assert recorded == []
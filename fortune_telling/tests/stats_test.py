@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+from pytest import MonkeyPatch
+
+from fortune_telling import stats
+from fortune_telling.models import FortuneDrawCount
+from fortune_telling.stats import DrawCounter, flush, persist_counts, read_counts
+
+
+class TestDrawCounter:
+    """ 運勢ごとの抽選回数をプロセス内で数えられるか """
+
+    # 数えた回数を未永続化の回数として取得できるか
+    def test_pending(self):
+        # GIVEN
+        sut = DrawCounter()
+        # WHEN
+        sut.increment('大吉')
+        sut.increment('大吉')
+        sut.increment('小吉')
+        # THEN
+        assert sut.pending() == {'大吉': 2, '小吉': 1}
+
+    # 複数のスレッドから数えても、数え漏れが起こらないか
+    def test_multi_thread(self):
+        # GIVEN
+        sut = DrawCounter()
+
+        def draw():
+            for _ in range(10_000):
+                sut.increment('中吉')
+
+        threads = [threading.Thread(target=draw) for _ in range(8)]
+        # WHEN
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # THEN
+        assert sut.pending() == {'中吉': 80_000}
+
+    # 終了したスレッドのカウンタは、未永続化の回数を残したまま破棄されるか
+    def test_retire_finished_thread(self):
+        # GIVEN
+        sut = DrawCounter()
+        sut.increment('大吉')
+        taken = sut.take_pending()
+
+        def draw():
+            sut.increment('大吉')
+            sut.increment('小吉')
+
+        # WHEN
+        for _ in range(5):
+            thread = threading.Thread(target=draw)
+            thread.start()
+            thread.join()
+        # THEN
+        assert taken == {'大吉': 1}
+        assert len(sut._shards) == 1
+        assert sut.take_pending() == {'大吉': 5, '小吉': 5}
+        assert sut.pending() == {}
+
+    # 取り出した回数は、以降は未永続化の回数に含まれないか
+    def test_take_pending(self):
+        # GIVEN
+        sut = DrawCounter()
+        sut.increment('大吉')
+        # WHEN
+        actual = sut.take_pending()
+        sut.increment('大吉')
+        # THEN
+        assert actual == {'大吉': 1}
+        assert sut.pending() == {'大吉': 1}
+
+    # 永続化に失敗した回数を、未永続化の回数へ戻せるか
+    def test_restore(self):
+        # GIVEN
+        sut = DrawCounter()
+        sut.increment('大吉')
+        deltas = sut.take_pending()
+        # WHEN
+        sut.restore(deltas)
+        sut.increment('大吉')
+        # THEN
+        assert sut.take_pending() == {'大吉': 2}
+        assert sut.pending() == {}
+
+
+@pytest.mark.django_db
+class TestFlush:
+    """ 抽選回数をDBの累計へまとめて書き込めるか """
+
+    # 未永続化の回数がDBの累計へ加算されるか
+    def test_flush(self):
+        # GIVEN
+        counter = DrawCounter()
+        persist_counts({'大吉': 10})
+        counter.increment('大吉')
+        counter.increment('小吉')
+        # WHEN
+        flush(counter)
+        # THEN
+        assert dict(FortuneDrawCount.objects.values_list('fortune', 'count')) == {'大吉': 11, '小吉': 1}
+        assert counter.pending() == {}
+
+    # 書き込みに失敗したときは、次回の書き込みへ持ち越すか
+    def test_flush_failure(self, monkeypatch: MonkeyPatch):
+        # GIVEN
+        counter = DrawCounter()
+        counter.increment('大吉')
+
+        def fail(deltas):
+            raise RuntimeError('database is down')
+
+        monkeypatch.setattr(stats, 'persist_counts', fail)
+        # WHEN
+        flush(counter)
+        # THEN
+        assert counter.pending() == {'大吉': 1}
+
+    # DBの累計と未永続化の回数を合算できるか
+    def test_read_counts(self):
+        # GIVEN
+        counter = DrawCounter()
+        persist_counts({'中吉': 3})
+        counter.increment('中吉')
+        # WHEN
+        actual = read_counts(counter)
+        # THEN
+        assert actual == {'小吉': 0, '中吉': 4, '大吉': 0}
@@ -0,0 +1,78 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+from fortune_telling import tailwind
+
+
+class TestBuildStylesheet:
+    """ 使われているクラスのみのスタイルシートを組み立てられるか検証 """
+
+    # 各クラスのルールを組み立てるか
+    def test_rules(self):
+        # GIVEN
+        classes = ['w-3/6', 'mt-24', 'text-6xl', 'text-slate-500', 'rounded-3xl']
+        expected = [
+            '.mt-24{margin-top:6rem}',
+            '.w-3\\/6{width:50%}',
+            '.rounded-3xl{border-radius:1.5rem}',
+            '.text-6xl{font-size:3.75rem;line-height:1}',
+            '.text-slate-500{color:#64748b}',
+        ]
+        # WHEN
+        actual = tailwind.build_stylesheet(classes)[len(tailwind.PREFLIGHT):].splitlines()
+        # THEN
+        assert actual == expected
+
+    # 状態を伴うルールを、伴わないルールより後に並べるか
+    def test_variant_order(self):
+        # GIVEN
+        classes = ['hover:bg-sky-500', 'bg-sky-300']
+        expected = ['.bg-sky-300{background-color:#7dd3fc}', '.hover\\:bg-sky-500:hover{background-color:#0ea5e9}']
+        # WHEN
+        actual = tailwind.build_stylesheet(classes)[len(tailwind.PREFLIGHT):].splitlines()
+        # THEN
+        assert actual == expected
+
+    # スタイルを生成できないクラスがあれば例外を送出するか
+    def test_unknown(self):
+        # GIVEN
+        classes = ['text-center', 'text-rainbow-500', 'print:hidden']
+        expected = ['print:hidden', 'text-rainbow-500']
+        # WHEN
+        with pytest.raises(tailwind.UnknownUtilityError) as e:
+            tailwind.build_stylesheet(classes)
+        # THEN
+        assert e.value.classes == expected
+
+
+class TestScanClasses:
+    """ テンプレートからクラスを集められるか検証 """
+
+    # テンプレートタグを除いてクラスを集めるか
+    def test_scan(self, tmp_path: Path):
+        # GIVEN
+        (tmp_path / 'page.html').write_text(
+            '<div class="grid {% if flag %}h-full{% endif %} {{ extra }}"><p class="text-center">x</p></div>',
+            encoding='utf-8'
+        )
+        expected = {'grid', 'h-full', 'text-center'}
+        # WHEN
+        actual = tailwind.scan_classes([tmp_path])
+        # THEN
+        assert actual == expected
+
+
+class TestBuildTailwindCss:
+    """ 書き出し済みのスタイルシートがテンプレートと一致しているか検証 """
+
+    # テンプレートを変更したあと、スタイルシートを生成し直しているか
+    def test_up_to_date(self):
+        # GIVEN
+        stdout = StringIO()
+        # WHEN
+        call_command('build_tailwind_css', '--check', stdout=stdout)
+        # THEN
+        assert stdout.getvalue() == ''
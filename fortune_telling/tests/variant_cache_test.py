@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from django.template.loader import get_template
+from django.test import override_settings
+
+from fortune_telling.variant_cache import TemplateVariantCache
+
+
+class TestTemplateVariantCache:
+    """ テンプレートの描画結果をバリエーションごとに保持できるか """
+
+    # すべてのバリエーションを事前に描画できるか
+    def test_render_all(self):
+        # GIVEN
+        sut = TemplateVariantCache('fortune.html', keys=('小吉', '大吉'), build_context=lambda key: {'fortune': key})
+        # WHEN
+        sut.render_all()
+        # THEN
+        assert '今日の運勢は、小吉です!!' in sut.get('小吉').decode('utf-8')
+        assert '今日の運勢は、大吉です!!' in sut.get('大吉').decode('utf-8')
+
+    # 描画済みのバリエーションでは、同じバイト列を使い回すか
+    def test_reuse_rendered_bytes(self):
+        # GIVEN
+        sut = TemplateVariantCache('index.html')
+        # WHEN
+        first = sut.get()
+        second = sut.get()
+        # THEN
+        assert first is second
+
+    # 事前に列挙されていないキーも描画でき、描画結果は保持しないか
+    def test_unknown_key(self):
+        # GIVEN
+        sut = TemplateVariantCache('fortune.html', keys=('小吉',), build_context=lambda key: {'fortune': key})
+        # WHEN
+        actual = sut.get('凶')
+        # THEN
+        assert '今日の運勢は、凶です!!' in actual.decode('utf-8')
+        assert list(sut._variants) == ['小吉']
+
+    # 開発時は、テンプレートファイル・includeしたテンプレートファイルが更新されると描画し直すか
+    @pytest.mark.parametrize('template_name', ['index.html', 'tailwind.html'])
+    @override_settings(DEBUG=True)
+    def test_invalidate_on_template_change(self, template_name):
+        # GIVEN
+        sut = TemplateVariantCache('index.html')
+        first = sut.get()
+        path = get_template(template_name).origin.name
+        stat = os.stat(path)
+        # WHEN
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        try:
+            second = sut.get()
+        finally:
+            os.utime(path, (stat.st_atime, stat.st_mtime))
+        # THEN
+        assert first == second
+        assert first is not second
@@ -1,10 +1,18 @@
+import asyncio
+import gzip
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
 from pytest import MonkeyPatch
 
+from django.conf import settings
 from django.http.response import HttpResponse
-from django.test.client import Client
+from django.template.loader import render_to_string
+from django.test.client import AsyncClient, Client
 from django.urls import reverse
 
-from fortune_telling import fortune
+from fortune_telling import fortune, rollup, stats, views
+from fortune_telling.broadcast import DistributionBroadcaster, encode_event, encode_retry
 
 
 class TestIndex:
@@ -20,16 +28,30 @@ class TestIndex:
         # THEN
         assert actual.status_code == 200
 
-    # トップ画面のテンプレートを参照しているか
-    def test_use_index_template(self, assertion_helper):
+    # トップ画面のテンプレートを描画した結果をボディに持つか
+    def test_use_index_template(self):
         # GIVEN
         client = Client()
         named_url = 'おみくじ:トップ'
-        expected = 'index.html'
+        expected = render_to_string('index.html').encode('utf-8')
         # WHEN
         response = client.get(reverse(named_url))
         # THEN
-        assertion_helper.assert_template_used(response, expected)
+        assert response.content == expected
+
+    # Accept-Encodingに応じて圧縮済みのボディを返却するか
+    def test_precompressed(self):
+        # GIVEN
+        client = Client()
+        named_url = 'おみくじ:トップ'
+        expected = render_to_string('index.html').encode('utf-8')
+        # WHEN
+        response = client.get(reverse(named_url), HTTP_ACCEPT_ENCODING='gzip')
+        actual = gzip.decompress(response.content)
+        # THEN
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert actual == expected
 
 
 class TestFortuneTelling:
@@ -45,28 +67,262 @@ class TestFortuneTelling:
         # THEN
         assert actual.status_code == 200
 
-    # 結果画面のテンプレートを参照しているか
-    def test_use_result_template(self, assertion_helper):
+    # 結果画面のテンプレートを描画した結果をボディに持つか
+    def test_use_result_template(self, monkeypatch: MonkeyPatch):
         # GIVEN
         client = Client()
         named_url = 'おみくじ:結果'
-        expected = 'fortune.html'
+        expected = render_to_string('fortune.html', context={'fortune': '中吉'}).encode('utf-8')
+        # GIVEN-MOCK
+        monkeypatch.setattr(fortune, 'tell_fortune', lambda: '中吉')
+
         # WHEN
         response = client.get(reverse(named_url))
         # THEN
-        assertion_helper.assert_template_used(response, expected)
+        assert response.content == expected
 
-    # コンテキストの運勢要素は関数から生成されたか
-    def test_context_fortune(self, monkeypatch: MonkeyPatch, assertion_helper):
+    # 画面の運勢は関数から生成されたか
+    def test_context_fortune(self, monkeypatch: MonkeyPatch):
         # GIVEN
         client = Client()
         named_url = 'おみくじ:結果'
-        context_key_of_fortune = 'fortune'
-        expected = '大吉'
+        expected = '今日の運勢は、大吉です!!'
         # GIVEN-MOCK
-        monkeypatch.setattr(fortune, 'tell_fortune', lambda: expected)
+        monkeypatch.setattr(fortune, 'tell_fortune', lambda: '大吉')
 
         # WHEN
         response = client.get(reverse(named_url))
         # THEN
-        assertion_helper.assert_context_get(response, context_key_of_fortune, expected)
+        assert expected in response.content.decode('utf-8')
+
+
+class TestBulkFortuneTelling:
+    """ 運勢を一括で抽選し、JSONで結果が得られるか """
+
+    named_url = 'おみくじ:一括抽選'
+
+    # 抽選回数と候補ごとの回数が得られるか
+    def test_counts(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url), {'n': 1000})
+        actual = response.json()
+        # THEN
+        assert response.status_code == 200
+        assert actual['n'] == 1000
+        assert set(actual['counts']) == set(fortune.FORTUNE_CANDIDATE)
+        assert sum(actual['counts'].values()) == 1000
+
+    # 重みを指定できるか
+    def test_weights(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url), {'n': 100, 'weights': '0,0,1'})
+        actual = response.json()
+        # THEN
+        assert actual['counts'] == {'小吉': 0, '中吉': 0, '大吉': 100}
+
+    # 不正なパラメータでは400となるか
+    @pytest.mark.parametrize('params', [
+        {'n': 10, 'weights': '1,2'},
+        {'n': 10, 'weights': '1e308,1e308,1'},
+        {'n': 10, 'weights': 'inf,1,1'},
+        {'n': 10, 'weights': 'nan,1,1'},
+        {'n': views.BULK_DRAW_LIMIT + 1},
+    ])
+    def test_bad_request(self, params):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url), params)
+        # THEN
+        assert response.status_code == 400
+
+
+class TestDailyFortuneTelling:
+    """ 訪問者ごとに、その日のあいだ同じおみくじ結果が得られるか """
+
+    named_url = 'おみくじ:結果'
+
+    @pytest.fixture(autouse=True)
+    def daily_mode(self, settings):
+        settings.FORTUNE_DAILY = True
+
+    # 初めての訪問者には、識別子を保持するCookieを発行するか
+    def test_set_visitor_cookie(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url))
+        # THEN
+        assert response.status_code == 200
+        assert response.cookies[views.VISITOR_COOKIE_NAME].value
+
+    # 同じ訪問者が再度訪れると、同じ結果が得られるか
+    def test_same_fortune_on_reload(self):
+        # GIVEN
+        client = Client()
+        first = client.get(reverse(self.named_url))
+        # WHEN
+        second = client.get(reverse(self.named_url))
+        # THEN
+        assert first.content == second.content
+        assert views.VISITOR_COOKIE_NAME not in second.cookies
+
+    # 日付が変わるまでのあいだ、ブラウザへキャッシュさせるか
+    def test_cache_control(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url))
+        # THEN
+        directives = dict(
+            directive.strip().partition('=')[::2] for directive in response['Cache-Control'].split(',')
+        )
+        assert 'private' in directives
+        assert 0 <= int(directives['max-age']) <= 60 * 60 * 24
+
+
+@pytest.mark.django_db
+class TestFortuneStats:
+    """ 運勢ごとの抽選回数をJSONで得られるか """
+
+    # おみくじを引いた回数が、未永続化の回数も含めて得られるか
+    def test_counts_include_pending(self, monkeypatch: MonkeyPatch):
+        # GIVEN
+        client = Client()
+        monkeypatch.setattr(views, 'DRAW_COUNTER', stats.DrawCounter())
+        monkeypatch.setattr(fortune, 'tell_fortune', lambda: '大吉')
+        client.get(reverse('おみくじ:結果'))
+        # WHEN
+        response = client.get(reverse('おみくじ:抽選回数'))
+        actual = response.json()
+        # THEN
+        assert actual == {'total': 1, 'counts': {'小吉': 0, '中吉': 0, '大吉': 1}}
+
+
+@pytest.mark.django_db
+class TestFortuneHistogram:
+    """ 期間内の抽選回数をJSONで得られるか """
+
+    named_url = 'おみくじ:期間別抽選回数'
+
+    # 期間内の運勢ごとの抽選回数が得られるか
+    def test_counts(self):
+        # GIVEN
+        client = Client()
+        rollup.record({'大吉': 3}, datetime(2022, 1, 1, 10, tzinfo=dt_timezone.utc))
+        # WHEN
+        response = client.get(reverse(self.named_url), {'start': '2022-01-01T00:00:00+00:00',
+                                                         'end': '2022-01-02T00:00:00+00:00'})
+        # THEN
+        assert response.json()['counts'] == {'大吉': 3}
+
+    # 粒度を指定すると、区間ごとの抽選回数が得られるか
+    def test_buckets(self):
+        # GIVEN
+        client = Client()
+        rollup.record({'大吉': 3}, datetime(2022, 1, 1, 10, tzinfo=dt_timezone.utc))
+        # WHEN
+        response = client.get(reverse(self.named_url), {'start': '2022-01-01T00:00:00+00:00',
+                                                         'end': '2022-01-02T00:00:00+00:00',
+                                                         'resolution': 'minute'})
+        # THEN
+        assert response.json()['buckets'] == [{'started_at': '2022-01-01T10:00:00+00:00', 'counts': {'大吉': 3}}]
+
+    # 不正な期間では400となるか
+    def test_bad_request(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse(self.named_url), {'start': 'yesterday'})
+        # THEN
+        assert response.status_code == 400
+
+
+class TestFortuneStream:
+    """ 抽選回数の変化をServer-Sent Eventsで受け取れるか """
+
+    # 最初のイベントとして、現在の抽選回数が得られるか
+    def test_first_event(self, monkeypatch: MonkeyPatch):
+        # GIVEN
+        async def snapshot():
+            return {'大吉': 1}
+
+        monkeypatch.setattr(views, 'DISTRIBUTION_BROADCASTER', DistributionBroadcaster(snapshot, interval=10))
+
+        async def run():
+            client = AsyncClient()
+            response = await client.get(reverse('おみくじ:抽選回数配信'))
+            retry = await response.streaming_content.__anext__()
+            first = await response.streaming_content.__anext__()
+            await response.streaming_content.aclose()
+            return response, retry, first
+
+        # WHEN
+        response, retry, actual = asyncio.run(run())
+        # THEN
+        assert response['Content-Type'] == 'text/event-stream'
+        assert retry == encode_retry(settings.FORTUNE_STREAM_RETRY_MS)
+        assert actual == encode_event('distribution', {'大吉': 1})
+
+
+class TestFortuneShell:
+    """ 結果画面を、キャッシュ可能な外枠と運勢のみのJSONとに分けて配信できるか """
+
+    @pytest.fixture(autouse=True)
+    def shell_mode(self, settings):
+        settings.FORTUNE_SHELL = True
+
+    # トップ画面から、ハッシュ値を含む外枠のURLへ遷移するか
+    def test_index_links_to_shell(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse('おみくじ:トップ'))
+        # THEN
+        assert views.shell_url() in response.content.decode('utf-8')
+
+    # 外枠は無期限にキャッシュさせるか
+    def test_shell_immutable(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(views.shell_url())
+        # THEN
+        assert response.status_code == 200
+        assert 'immutable' in response['Cache-Control']
+        assert 'max-age=31536000' in response['Cache-Control']
+
+    # 古いハッシュ値のURLは、最新の外枠へリダイレクトするか
+    def test_shell_outdated_digest(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse('おみくじ:結果外枠', args=['outdated']))
+        # THEN
+        assert response.status_code == 302
+        assert response['Location'] == views.shell_url()
+
+    # 従来の結果画面のURLは、外枠へリダイレクトするか
+    def test_result_redirects_to_shell(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        response = client.get(reverse('おみくじ:結果'))
+        # THEN
+        assert response.status_code == 302
+        assert response['Location'] == views.shell_url()
+
+    # 運勢のみを、キャッシュさせないJSONとして取得できるか
+    def test_draw(self, monkeypatch: MonkeyPatch):
+        # GIVEN
+        client = Client()
+        monkeypatch.setattr(fortune, 'tell_fortune', lambda: '大吉')
+        # WHEN
+        response = client.get(reverse('おみくじ:抽選'))
+        # THEN
+        assert response.json() == {'fortune': '大吉'}
+        assert 'no-store' in response['Cache-Control']
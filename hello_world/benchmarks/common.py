@@ -0,0 +1,52 @@
+import os
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import django
+
+
+def setup_django():
+    """ ベンチマークからDjangoの各種モジュールを参照するための準備 """
+
+    # 各種モジュールをimportできるようsrcディレクトリをimportパスへ追加
+    src_directory = Path(__file__).resolve().parent.parent / 'src'
+    sys.path.append(str(src_directory))
+
+    # 利用する設定ファイル
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def measure(label: str, func: Callable[[], object], number: int = 100_000):
+    """
+    処理1回あたりの所要時間・メモリ確保量を計測して出力
+
+    :param label: 出力に表示する計測対象の名前
+    :param func: 計測対象の処理
+    :param number: 処理の実行回数
+    """
+    # ウォームアップ
+    for _ in range(min(number, 1000)):
+        func()
+
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    elapsed = time.perf_counter() - started
+
+    # 時間計測へ影響しないよう、1回あたりのメモリ確保量は別途少ない回数で計測
+    sample = min(number, 1000)
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(sample):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - current
+    tracemalloc.stop()
+
+    print(f'{label:<40} {elapsed / number * 1_000_000:8.2f} us/call {allocated / sample:10.1f} B/call')
@@ -0,0 +1,34 @@
+"""
+Hello Worldのviewについて、リクエストごとにHttpResponseを組み立てる方式と
+StaticResponseで事前に組み立てたレスポンスを複製する方式とを比較
+
+実行方法: hello_worldディレクトリで `python benchmarks/static_response_bench.py`
+"""
+from common import setup_django, measure
+
+setup_django()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from hello_world.views import hello_world, HELLO_WORLD_RESPONSE  # noqa: E402
+
+
+def main():
+    factory = RequestFactory()
+    request = factory.get('/')
+    conditional_request = factory.get('/', HTTP_IF_NONE_MATCH=HELLO_WORLD_RESPONSE.etag)
+
+    # 従来のview相当 CommonMiddlewareと同様に、Content-Lengthもレスポンスごとに計算
+    def per_request():
+        response = HttpResponse('Hello World')
+        response.headers['Content-Length'] = str(len(response.content))
+        return response
+
+    measure('HttpResponse per request', per_request)
+    measure('StaticResponse (200)', lambda: hello_world(request))
+    measure('StaticResponse (304 If-None-Match)', lambda: hello_world(conditional_request))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+同一プロセス内でconfig.wsgi.application・config.asgi.applicationへリクエストを送り、RPS・レイテンシを比較
+
+実行方法: hello_worldディレクトリで `python benchmarks/wsgi_asgi_bench.py --requests 20000 --concurrency 50`
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import statistics
+import time
+
+from common import setup_django
+
+setup_django()
+
+from config.asgi import application as asgi_application  # noqa: E402
+from config.wsgi import application as wsgi_application  # noqa: E402
+
+
+def wsgi_request(path: str) -> float:
+    """
+    WSGIアプリケーションへリクエストを1件送信
+
+    :param path: リクエスト先のパス
+    :return: レスポンスが得られるまでの秒数
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': BytesIO(b''),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+    }
+    started = time.perf_counter()
+    body = wsgi_application(environ, lambda status, headers: None)
+    b''.join(body)
+    body.close()
+    return time.perf_counter() - started
+
+
+async def asgi_request(path: str) -> float:
+    """
+    ASGIアプリケーションへリクエストを1件送信
+
+    :param path: リクエスト先のパス
+    :return: レスポンスが得られるまでの秒数
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    disconnected = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # レスポンスを返し終えるまで、クライアントは切断しない
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+            disconnected.set()
+
+    started = time.perf_counter()
+    await asgi_application(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def run_wsgi(path: str, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    """
+    スレッドプールからWSGIアプリケーションへ並行にリクエストを送信
+
+    :return: 全体の所要秒数・リクエストごとのレイテンシ
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        latencies = list(executor.map(wsgi_request, [path] * requests))
+        return time.perf_counter() - started, latencies
+
+
+def run_asgi(path: str, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    """
+    イベントループ上のタスクからASGIアプリケーションへ並行にリクエストを送信
+
+    :return: 全体の所要秒数・リクエストごとのレイテンシ
+    """
+
+    async def run() -> tuple[float, list[float]]:
+        latencies = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                latencies.append(await asgi_request(path))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies
+
+    return asyncio.run(run())
+
+
+def report(label: str, elapsed: float, latencies: list[float]):
+    """ RPS・p50・p99を出力 """
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{label:<28} {len(latencies) / elapsed:10.0f} req/s '
+        f'p50 {percentiles[49] * 1000:8.3f} ms p99 {percentiles[98] * 1000:8.3f} ms'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    # ウォームアップ
+    run_wsgi('/', 100, 1)
+    run_asgi('/async', 100, 1)
+
+    print(f'requests={args.requests} concurrency={args.concurrency}')
+    report('WSGI sync view /', *run_wsgi('/', args.requests, args.concurrency))
+    report('ASGI sync view /', *run_asgi('/', args.requests, args.concurrency))
+    report('ASGI async view /async', *run_asgi('/async', args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
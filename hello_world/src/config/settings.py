@@ -40,14 +40,15 @@ INSTALLED_APPS = [
     'hello_world.apps.HelloWorldConfig',
 ]
 
+# ASGIでもスレッドプールを経由しないよう、標準のミドルウェアを非同期対応させたものを利用
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hello_world.middleware.SecurityMiddleware',
+    'hello_world.middleware.SessionMiddleware',
+    'hello_world.middleware.CommonMiddleware',
+    'hello_world.middleware.CsrfViewMiddleware',
+    'hello_world.middleware.AuthenticationMiddleware',
+    'hello_world.middleware.MessageMiddleware',
+    'hello_world.middleware.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -122,3 +123,8 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# export_static_pagesコマンドがページを書き出すディレクトリ
+STATIC_EXPORT_ROOT = BASE_DIR.parent / 'export'
+# Trueであれば、書き出したページをDjangoを経由せずにWSGIの層で返却する
+STATIC_EXPORT_SERVE = False
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# 書き出したページは、Djangoへ渡さずにWSGIの層で返却
+from django.conf import settings  # noqa: E402
+
+if settings.STATIC_EXPORT_SERVE:
+    from hello_world.static_export import ExportedPagesApplication  # noqa: E402
+
+    application = ExportedPagesApplication(application, settings.STATIC_EXPORT_ROOT)
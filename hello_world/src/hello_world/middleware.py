@@ -0,0 +1,110 @@
+"""
+Django標準のミドルウェアを、ASGIでもスレッドプールを経由せずに呼び出せるようにしたもの
+
+標準のミドルウェアはMiddlewareMixinにより非同期モードでも動作するが、フック関数は常にsync_to_asyncで
+スレッドプールへ渡される。フック関数の多くはヘッダの読み書きのみでI/Oを伴わないので、イベントループ上でそのまま実行する。
+"""
+import asyncio
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.http import HttpRequest, HttpResponse
+from django.middleware import clickjacking, common, csrf, security
+
+# ハンドラがsync_to_asyncで包んでしまうので、非同期モードではコルーチン関数へ差し替えるフック関数
+ADAPTED_HOOKS = ('process_view', 'process_template_response')
+
+
+def as_coroutine_function(hook: Callable) -> Callable:
+    """
+    同期関数を、イベントループ上でそのまま実行するコルーチン関数へ変換
+
+    :param hook: ミドルウェアのフック関数
+    :return: フック関数を呼び出すコルーチン関数
+    """
+
+    async def inline_hook(*args, **kwargs):
+        return hook(*args, **kwargs)
+
+    return inline_hook
+
+
+class InlineAsyncMiddlewareMixin:
+    """ MiddlewareMixinをもとにしたミドルウェアを、非同期モードでもスレッドを経由せずに呼び出すことを責務に持つ """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+
+        if asyncio.iscoroutinefunction(self.get_response):
+            for hook_name in ADAPTED_HOOKS:
+                hook = getattr(self, hook_name, None)
+                if hook is not None:
+                    setattr(self, hook_name, as_coroutine_function(hook))
+
+    def response_needs_thread(self, request: HttpRequest, response: HttpResponse) -> bool:
+        """
+        process_responseがDBアクセスなどのブロッキングI/Oを伴うか判定
+        I/Oを伴うミドルウェアはオーバーライドし、必要なときのみスレッドプールで実行させる
+
+        :param request: HTTPリクエスト
+        :param response: HTTPレスポンス
+        :return: スレッドプールで実行すべきであればTrue
+        """
+        return False
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """
+        MiddlewareMixin.__acall__と同様の処理を、フック関数をそのまま呼び出すことで実現
+
+        :param request: HTTPリクエスト
+        :return: HTTPレスポンス
+        """
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+
+        if hasattr(self, 'process_response'):
+            if self.response_needs_thread(request, response):
+                response = await sync_to_async(self.process_response, thread_sensitive=True)(request, response)
+            else:
+                response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineAsyncMiddlewareMixin, security.SecurityMiddleware):
+    pass
+
+
+class SessionMiddleware(InlineAsyncMiddlewareMixin, sessions_middleware.SessionMiddleware):
+
+    def response_needs_thread(self, request: HttpRequest, response: HttpResponse) -> bool:
+        # セッションへ触れたときのみ、セッションストアへの保存が起こり得る
+        return request.session.accessed
+
+
+class CommonMiddleware(InlineAsyncMiddlewareMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineAsyncMiddlewareMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(InlineAsyncMiddlewareMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(InlineAsyncMiddlewareMixin, messages_middleware.MessageMiddleware):
+
+    def response_needs_thread(self, request: HttpRequest, response: HttpResponse) -> bool:
+        # メッセージを扱ったときのみ、セッションなどのストレージへの書き込みが起こり得る
+        storage = getattr(request, '_messages', None)
+        return storage is not None and (storage.used or storage.added_new)
+
+
+class XFrameOptionsMiddleware(InlineAsyncMiddlewareMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+# 条件付きリクエストで304を返却してよいHTTPメソッド
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+class StaticResponse:
+    """
+    内容の変わらないHTTPレスポンスを使い回すことを責務に持つ
+    ボディのエンコード・ETag・Content-Lengthの計算は生成時の1回のみとし、リクエストごとには複製のみを組み立てる
+    """
+
+    def __init__(self, content: str, content_type: str = 'text/html; charset=utf-8', charset: str = 'utf-8'):
+        """
+        :param content: レスポンスボディとなる文字列
+        :param content_type: Content-Typeヘッダの値
+        :param charset: ボディをエンコードするときの文字コード
+        """
+        self.body = content.encode(charset)
+        self.content_type = content_type
+        # ボディのハッシュ値から強いETagを組み立てる
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.content_length = str(len(self.body))
+
+    def is_not_modified(self, request: HttpRequest) -> bool:
+        """
+        リクエストのIf-None-Matchヘッダが、保持しているボディのETagと一致するか判定
+
+        :param request: HTTPリクエスト
+        :return: クライアントのキャッシュが最新であればTrue
+        """
+        if request.method not in CONDITIONAL_METHODS:
+            return False
+
+        if_none_match = request.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        # ほとんどのクライアントは受け取ったETagをそのまま送り返すので、パースせずに比較できる
+        if if_none_match == self.etag:
+            return True
+
+        # If-None-Matchは弱い比較で判定するので、W/プレフィックスは無視する
+        etags = [etag[2:] if etag.startswith('W/') else etag for etag in parse_etags(if_none_match)]
+        return '*' in etags or self.etag in etags
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """
+        リクエストに応じたHTTPレスポンスを組み立てる
+
+        :param request: HTTPリクエスト
+        :return: クライアントのキャッシュが最新であれば304、そうでなければボディを持つ200のHTTPレスポンス
+        """
+        if self.is_not_modified(request):
+            response = HttpResponseNotModified()
+            response.headers['ETag'] = self.etag
+            return response
+
+        response = HttpResponse(self.body, content_type=self.content_type)
+        response.headers['ETag'] = self.etag
+        response.headers['Content-Length'] = self.content_length
+        return response
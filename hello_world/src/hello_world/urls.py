@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import hello_world
+from .views import hello_world, hello_world_async
 
 urlpatterns = [
-    path('', hello_world)
+    path('', hello_world),
+    path('async', hello_world_async),
 ]
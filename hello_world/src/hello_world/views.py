@@ -1,6 +1,13 @@
 from django.http import HttpRequest, HttpResponse
 
+from .static_export import static_page
+from .static_response import StaticResponse
 
+# ボディは変わらないので、エンコード・ETagの計算は起動時に済ませておく
+HELLO_WORLD_RESPONSE = StaticResponse('Hello World')
+
+
+@static_page
 def hello_world(request: HttpRequest) -> HttpResponse:
     """
     Hello World文字列をレスポンスとして生成
@@ -8,4 +15,15 @@ def hello_world(request: HttpRequest) -> HttpResponse:
     :param request: HTTPリクエスト
     :return: Hello World文字列をボディとするHTTPレスポンス
     """
-    return HttpResponse('Hello World')
+    return HELLO_WORLD_RESPONSE(request)
+
+
+@static_page
+async def hello_world_async(request: HttpRequest) -> HttpResponse:
+    """
+    Hello World文字列をレスポンスとして生成 ASGIでスレッドプールを経由せずに呼び出されるよう、コルーチン関数として定義
+
+    :param request: HTTPリクエスト
+    :return: Hello World文字列をボディとするHTTPレスポンス
+    """
+    return HELLO_WORLD_RESPONSE(request)
@@ -0,0 +1,30 @@
+import asyncio
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test.client import AsyncClient
+
+
+class TestInlineAsyncMiddleware:
+    """ 非同期モードのミドルウェアがスレッドプールを経由せずに呼び出されるか """
+
+    # process_viewはsync_to_asyncで包まれず、コルーチン関数のまま登録されるか
+    def test_view_middleware_not_adapted(self):
+        # GIVEN
+        handler = ASGIHandler()
+        # WHEN
+        handler.load_middleware(is_async=True)
+        # THEN
+        assert handler._view_middleware
+        for hook in handler._view_middleware:
+            assert asyncio.iscoroutinefunction(hook)
+            assert hook.__class__.__name__ != 'SyncToAsync'
+
+    # 同期版と同様に、ミドルウェアがヘッダを付与しているか
+    def test_response_headers(self):
+        # GIVEN
+        client = AsyncClient()
+        # WHEN
+        actual = asyncio.run(client.get('/async'))
+        # THEN
+        assert actual['X-Frame-Options'] == 'DENY'
+        assert actual['X-Content-Type-Options'] == 'nosniff'
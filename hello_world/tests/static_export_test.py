@@ -0,0 +1,36 @@
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from hello_world import static_export
+
+
+class TestExportStaticPages:
+    """ Hello World画面をファイルへ書き出し、Djangoを経由せずに返却できるか検証 """
+
+    # 同期・非同期のviewをいずれも書き出すか
+    def test_export(self, tmp_path: Path):
+        # GIVEN
+        expected = {'/': b'Hello World', '/async': b'Hello World'}
+        # WHEN
+        call_command('export_static_pages', '--output', str(tmp_path), '--host', 'testserver', stdout=StringIO())
+        actual = {page.url: (tmp_path / page.file).read_bytes() for page in static_export.read_manifest(tmp_path)}
+        # THEN
+        assert actual == expected
+
+    # 取得済みのETagを送ると、書き出したページから304を返却するか
+    def test_not_modified(self, tmp_path: Path):
+        # GIVEN
+        call_command('export_static_pages', '--output', str(tmp_path), '--host', 'testserver', stdout=StringIO())
+        application = static_export.ExportedPagesApplication(lambda environ, start_response: [], tmp_path)
+        statuses = []
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}
+        application(environ, lambda status, headers: statuses.append((status, dict(headers))))
+        etag = statuses[0][1]['ETag']
+        expected = '304 Not Modified'
+        # WHEN
+        actual = application({**environ, 'HTTP_IF_NONE_MATCH': etag}, lambda status, headers: statuses.append(status))
+        # THEN
+        assert list(actual) == []
+        assert statuses[-1] == expected
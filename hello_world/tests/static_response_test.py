@@ -0,0 +1,76 @@
+from django.test.client import RequestFactory
+
+from hello_world.static_response import StaticResponse
+
+
+class TestStaticResponse:
+    """ 事前に組み立てたレスポンスを複製できるか """
+
+    # ボディ・ヘッダは事前に組み立てたものと一致するか
+    def test_body_and_headers(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().get('/')
+        # WHEN
+        actual = sut(request)
+        # THEN
+        assert actual.status_code == 200
+        assert actual.content == b'Hello World'
+        assert actual['Content-Length'] == '11'
+        assert actual['ETag'] == sut.etag
+
+    # リクエストごとに別のレスポンスオブジェクトが得られるか
+    def test_clone_per_request(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().get('/')
+        # WHEN
+        first = sut(request)
+        first['X-Modified'] = 'yes'
+        second = sut(request)
+        # THEN
+        assert first is not second
+        assert not second.has_header('X-Modified')
+
+    # ETagが一致すれば、ボディを持たない304が得られるか
+    def test_not_modified(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=sut.etag)
+        # WHEN
+        actual = sut(request)
+        # THEN
+        assert actual.status_code == 304
+        assert actual.content == b''
+        assert actual['ETag'] == sut.etag
+
+    # 複数のETag・弱いETagが指定されても一致を判定できるか
+    def test_not_modified_weak_etag_list(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=f'"other", W/{sut.etag}')
+        # WHEN
+        actual = sut(request)
+        # THEN
+        assert actual.status_code == 304
+
+    # ETagが一致しなければ、ボディを持つ200が得られるか
+    def test_modified(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH='"other"')
+        # WHEN
+        actual = sut(request)
+        # THEN
+        assert actual.status_code == 200
+        assert actual.content == b'Hello World'
+
+    # GET・HEAD以外のリクエストでは304としないか
+    def test_post_is_not_conditional(self):
+        # GIVEN
+        sut = StaticResponse('Hello World')
+        request = RequestFactory().post('/', HTTP_IF_NONE_MATCH=sut.etag)
+        # WHEN
+        actual = sut(request)
+        # THEN
+        assert actual.status_code == 200
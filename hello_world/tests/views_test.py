@@ -1,4 +1,6 @@
-from django.test.client import Client
+import asyncio
+
+from django.test.client import AsyncClient, Client
 
 
 class TestHelloWorldView:
@@ -12,3 +14,36 @@ class TestHelloWorldView:
         actual = client.get('/')
         # THEN
         assert actual.status_code == 200
+
+    # ボディはHello World文字列か
+    def test_body(self):
+        # GIVEN
+        client = Client()
+        # WHEN
+        actual = client.get('/')
+        # THEN
+        assert actual.content == b'Hello World'
+
+    # 取得済みのETagを送ると、304が得られるか
+    def test_status_304(self):
+        # GIVEN
+        client = Client()
+        etag = client.get('/')['ETag']
+        # WHEN
+        actual = client.get('/', HTTP_IF_NONE_MATCH=etag)
+        # THEN
+        assert actual.status_code == 304
+
+
+class TestHelloWorldAsyncView:
+    """ Hello Worldの非同期viewが呼び出せるか """
+
+    # ASGIからステータスコード200が得られるか
+    def test_status_200(self):
+        # GIVEN
+        client = AsyncClient()
+        # WHEN
+        actual = asyncio.run(client.get('/async'))
+        # THEN
+        assert actual.status_code == 200
+        assert actual.content == b'Hello World'
@@ -122,3 +122,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 圧縮済みのページを保持する合計サイズの上限(バイト)
+PRECOMPRESSED_PAGE_CACHE_BYTES = 4 * 1024 * 1024
@@ -0,0 +1,330 @@
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional, Union
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+
+TypeRender = Callable[[], Union[str, bytes]]
+
+# テンプレートの{% csrf_token %}が出力される位置の目印 リクエストごとのトークンへ差し替える
+CSRF_PLACEHOLDER = 'precompressed-csrf-token-placeholder'
+COMPRESS_LEVEL = 9
+# Accept-Encodingで同じ重みが指定されたときの優先順
+ENCODINGS = ('gzip', 'deflate')
+IDENTITY = 'identity'
+
+# gzipヘッダ 更新時刻は持たず、XFL=2(最大圧縮)・OS=255(不明)とする
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+# zlibヘッダ 32KBのウィンドウ・最大圧縮を表す
+ZLIB_HEADER = b'\x78\xda'
+
+
+def _deflate(data: bytes, last: bool, level: int = COMPRESS_LEVEL) -> bytes:
+    """
+    データを単独で生のDeflateブロックへ圧縮
+    前のブロックを参照しないので、圧縮結果を連結しても1つのDeflateストリームとして展開できる
+
+    :param data: 圧縮対象
+    :param last: ストリームの末尾となるか 末尾でなければバイト境界で区切って終える
+    :param level: 圧縮レベル
+    :return: 生のDeflateブロック
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _stored_block(data: bytes) -> bytes:
+    """
+    データを無圧縮のDeflateブロックとする 直前のブロックがバイト境界で終わっていることを前提とする
+
+    :param data: 65535バイト以下のデータ
+    :return: 生のDeflateブロック
+    """
+    return b'\x00' + struct.pack('<HH', len(data), len(data) ^ 0xffff) + data
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Accept-Encodingヘッダからレスポンスの圧縮形式を選択
+
+    :param accept_encoding: Accept-Encodingヘッダの値
+    :return: gzip・deflate・identityのいずれか
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities['gzip' if coding == 'x-gzip' else coding] = quality
+
+    chosen, chosen_quality = IDENTITY, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    return chosen
+
+
+class PrecompressedPage:
+    """
+    描画済みのページ本文と、最大圧縮レベルで一度だけ圧縮したgzip・deflate形式の本文を保持することを責務に持つ
+    CSRFトークンの目印を含む場合、目印の前後を個別に圧縮しておき、リクエストごとにトークンを無圧縮のまま挟んで連結する
+    """
+
+    def __init__(self, body: Union[str, bytes], level: int = COMPRESS_LEVEL):
+        """
+        :param body: 描画済みのページ本文
+        :param level: 圧縮レベル
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.parts = tuple(body.split(CSRF_PLACEHOLDER.encode('ascii')))
+        self.identity_length = len(body) - len(CSRF_PLACEHOLDER) * (len(self.parts) - 1)
+        self._deflated = tuple(
+            _deflate(part, last=index == len(self.parts) - 1, level=level)
+            for index, part in enumerate(self.parts)
+        )
+        deflated_length = sum(len(block) for block in self._deflated)
+
+        # 圧縮しても小さくならない形式は選択肢から外す
+        self.encodings = tuple(
+            encoding for encoding, overhead in (('gzip', len(GZIP_HEADER) + 8), ('deflate', len(ZLIB_HEADER) + 4))
+            if deflated_length + overhead < self.identity_length
+        )
+
+        self._encoded: dict[str, bytes] = {}
+        if not self.needs_token:
+            self._encoded = {encoding: self._assemble(encoding, b'') for encoding in (IDENTITY,) + self.encodings}
+
+    @property
+    def needs_token(self) -> bool:
+        """ 本文にCSRFトークンを埋め込む必要があるか """
+        return len(self.parts) > 1
+
+    @property
+    def nbytes(self) -> int:
+        """ 保持している本文の合計サイズ """
+        return sum(len(part) for part in self.parts) + sum(len(block) for block in self._deflated) + \
+            sum(len(body) for body in self._encoded.values())
+
+    def encode(self, encoding: str, token: bytes = b'') -> bytes:
+        """
+        指定の形式の本文を取得
+
+        :param encoding: gzip・deflate・identityのいずれか
+        :param token: 目印へ埋め込むCSRFトークン
+        :return: 本文のバイト列
+        """
+        encoded = self._encoded.get(encoding)
+        if encoded is not None:
+            return encoded
+        return self._assemble(encoding, token)
+
+    def _assemble(self, encoding: str, token: bytes) -> bytes:
+        """
+        目印をトークンへ差し替えながら本文を組み立てる
+
+        :param encoding: gzip・deflate・identityのいずれか
+        :param token: 目印へ埋め込むCSRFトークン
+        :return: 本文のバイト列
+        """
+        pieces = [self.parts[0]]
+        for part in self.parts[1:]:
+            pieces.append(token)
+            pieces.append(part)
+        if encoding == IDENTITY:
+            return b''.join(pieces)
+
+        blocks = [self._deflated[0]]
+        if self.needs_token:
+            # トークンは毎回異なり、圧縮も効かないので、無圧縮ブロックとして埋め込む
+            stored_token = _stored_block(token)
+            for block in self._deflated[1:]:
+                blocks.append(stored_token)
+                blocks.append(block)
+        deflated = b''.join(blocks)
+
+        # チェックサムは展開後の本文全体から求める必要がある 圧縮と比べれば安価な線形走査で済む
+        if encoding == 'gzip':
+            crc = 0
+            for piece in pieces:
+                crc = zlib.crc32(piece, crc)
+            size = sum(len(piece) for piece in pieces)
+            return GZIP_HEADER + deflated + struct.pack('<II', crc, size & 0xffffffff)
+
+        adler = 1
+        for piece in pieces:
+            adler = zlib.adler32(piece, adler)
+        return ZLIB_HEADER + deflated + struct.pack('>I', adler)
+
+
+class CacheStats(NamedTuple):
+    """ 圧縮済みレスポンスキャッシュの利用状況 """
+    hits: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+    entries: int
+    size: int
+    evictions: int
+
+
+class PrecompressedCache:
+    """
+    圧縮済みのページをキーごとに保持し、Accept-Encodingに応じたレスポンスを組み立てることを責務に持つ
+    保持する合計サイズが上限を超えると、最も長く使われていないページから破棄する
+    """
+
+    def __init__(self, max_bytes: int, level: int = COMPRESS_LEVEL):
+        """
+        :param max_bytes: 保持するページの合計サイズの上限
+        :param level: 圧縮レベル
+        """
+        self.max_bytes = max_bytes
+        self.level = level
+        self._pages: OrderedDict[Hashable, PrecompressedPage] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def get_page(self, key: Hashable, render: TypeRender, refresh: bool = False) -> PrecompressedPage:
+        """
+        キーに対応する圧縮済みのページを取得 保持していなければ描画・圧縮して保持
+
+        :param key: ページを識別するキー
+        :param render: ページ本文を描画する関数
+        :param refresh: 保持しているページを破棄して描画し直すか
+        :return: 圧縮済みのページ
+        """
+        with self._lock:
+            page = None if refresh else self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        # 描画・圧縮はロックの外で行う 同時に描画されても、後から保持したものが残るだけ
+        page = PrecompressedPage(render(), self.level)
+        with self._lock:
+            self._discard(key)
+            if page.nbytes <= self.max_bytes:
+                self._pages[key] = page
+                self._size += page.nbytes
+                while self._size > self.max_bytes:
+                    self._discard(next(iter(self._pages)))
+                    self.evictions += 1
+        return page
+
+    def respond(self, request: HttpRequest, key: Hashable, render: TypeRender,
+                content_type: str = 'text/html; charset=utf-8', refresh: bool = False) -> HttpResponse:
+        """
+        圧縮済みのページからAccept-Encodingに応じたHTTPレスポンスを組み立てる
+
+        :param request: HTTPリクエスト
+        :param key: ページを識別するキー
+        :param render: ページ本文を描画する関数
+        :param content_type: Content-Typeヘッダの値
+        :param refresh: 保持しているページを破棄して描画し直すか
+        :return: HTTPレスポンス
+        """
+        page = self.get_page(key, render, refresh)
+        token = get_token(request).encode('ascii') if page.needs_token else b''
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding not in page.encodings:
+            encoding = IDENTITY
+        body = page.encode(encoding, token)
+
+        response = HttpResponse(body, content_type=content_type)
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+            with self._lock:
+                self.bytes_saved += page.identity_length + len(token) * (len(page.parts) - 1) - len(body)
+        # 圧縮の有無に関わらず、共有キャッシュが形式を取り違えないよう指定
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def stats(self) -> CacheStats:
+        """
+        利用状況を取得
+
+        :return: ヒット率・圧縮により削減した転送量などの利用状況
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                hit_ratio=self.hits / lookups if lookups else 0.0,
+                bytes_saved=self.bytes_saved,
+                entries=len(self._pages),
+                size=self._size,
+                evictions=self.evictions,
+            )
+
+    def clear(self):
+        """ 保持しているページと利用状況を破棄 """
+        with self._lock:
+            self._pages.clear()
+            self._size = 0
+            self.hits = self.misses = self.bytes_saved = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _discard(self, key: Hashable):
+        """
+        ページを破棄 ロックを獲得した状態で呼び出す
+
+        :param key: ページを識別するキー
+        """
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self._size -= page.nbytes
+
+
+PAGE_CACHE = PrecompressedCache(settings.PRECOMPRESSED_PAGE_CACHE_BYTES)
+
+
+def render_page(template_name: str, context: Optional[dict] = None) -> str:
+    """
+    訪問者に依存しないページを描画 CSRFトークンは目印として出力する
+
+    :param template_name: テンプレートファイル名
+    :param context: テンプレートのコンテキスト
+    :return: 描画結果
+    """
+    return render_to_string(template_name, {**(context or {}), 'csrf_token': CSRF_PLACEHOLDER})
+
+
+def render_precompressed(request: HttpRequest, template_name: str, context: Optional[dict] = None) -> HttpResponse:
+    """
+    django.shortcuts.renderの代わりに、圧縮済みのページからHTTPレスポンスを組み立てる
+    ページはテンプレートファイル名ごとに保持するので、コンテキストは常に同じ内容である必要がある
+
+    :param request: HTTPリクエスト
+    :param template_name: テンプレートファイル名
+    :param context: テンプレートのコンテキスト
+    :return: HTTPレスポンス
+    """
+    # 開発時はテンプレートの変更を反映できるよう、毎回描画し直す
+    return PAGE_CACHE.respond(request, template_name, lambda: render_page(template_name, context),
+                              refresh=settings.DEBUG)
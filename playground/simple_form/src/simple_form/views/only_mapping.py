@@ -3,6 +3,7 @@ from django.urls import reverse
 from django.shortcuts import render, redirect
 
 from ..forms.only_mapping_form import OnlyMappingForm
+from ..precompressed import render_precompressed
 
 
 def get(request: HttpRequest) -> HttpResponse:
@@ -12,7 +13,7 @@ def get(request: HttpRequest) -> HttpResponse:
     :param request: HTTPリクエスト
     :return: form画面を表現するHTTPレスポンス
     """
-    return render(request, 'only_mapping_form.html')
+    return render_precompressed(request, 'only_mapping_form.html')
 
 
 def post(request: HttpRequest) -> HttpResponse:
@@ -3,6 +3,8 @@ from django.http import HttpRequest, HttpResponse, QueryDict
 from django.urls import reverse
 from django.shortcuts import render, redirect
 
+from ..precompressed import render_precompressed
+
 
 def get(request: HttpRequest) -> HttpResponse:
     """
@@ -11,7 +13,7 @@ def get(request: HttpRequest) -> HttpResponse:
     :param request: HttpRequest
     :return: 生のフォームによる画面を表現するHTTPレスポンス
     """
-    return render(request, 'raw_form.html')
+    return render_precompressed(request, 'raw_form.html')
 
 
 def post(request: HttpRequest) -> HttpResponse:
@@ -3,6 +3,7 @@ from django.urls import reverse
 from django.shortcuts import render, redirect
 
 from ..forms.validation_form import ValidationForm
+from ..precompressed import render_precompressed
 
 
 def get(request: HttpRequest) -> HttpResponse:
@@ -15,7 +16,7 @@ def get(request: HttpRequest) -> HttpResponse:
     context = {
         'form': ValidationForm()
     }
-    return render(request, 'validation_form.html', context=context)
+    return render_precompressed(request, 'validation_form.html', context=context)
 
 
 def post(request: HttpRequest) -> HttpResponse:
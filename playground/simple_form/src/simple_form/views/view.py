@@ -3,6 +3,7 @@ from django.urls import reverse
 from django.shortcuts import render, redirect
 
 from ..forms.view_form import ViewForm
+from ..precompressed import render_precompressed
 
 
 def get(request: HttpRequest) -> HttpResponse:
@@ -17,7 +18,7 @@ def get(request: HttpRequest) -> HttpResponse:
         'form': form
     }
 
-    return render(request, 'view_form.html', context=context)
+    return render_precompressed(request, 'view_form.html', context=context)
 
 
 def post(request: HttpRequest) -> HttpResponse:
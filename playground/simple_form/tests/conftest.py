@@ -1,4 +1,5 @@
 import django
+import pytest
 import os
 from pathlib import Path
 import sys
@@ -15,3 +16,13 @@ def pytest_sessionstart(session):
     os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings'
     # Djangoの各種モジュールを参照するための準備を整える
     django.setup()
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """ テストごとにテンプレートが描画されるよう、圧縮済みのページを破棄 """
+    from simple_form.precompressed import PAGE_CACHE
+
+    PAGE_CACHE.clear()
+    yield
+    PAGE_CACHE.clear()
@@ -0,0 +1,185 @@
+import gzip
+import os
+import re
+import zlib
+
+from django.test.client import Client
+from django.urls import reverse
+
+from simple_form.precompressed import (CSRF_PLACEHOLDER, PrecompressedCache, PrecompressedPage,
+                                       choose_encoding)
+
+# 繰り返しを含み、圧縮が効く本文
+BODY = '<html><body>' + '<p>hello world</p>' * 100 + '</body></html>'
+BODY_WITH_TOKEN = BODY.replace('<body>', f'<body><input value="{CSRF_PLACEHOLDER}">')
+
+
+class TestChooseEncoding:
+    """ Accept-Encodingから圧縮形式を選択できるか検証 """
+
+    # 同じ重みであればgzipを優先するか
+    def test_prefer_gzip(self):
+        # GIVEN
+        accept_encoding = 'deflate, gzip, br'
+        expected = 'gzip'
+        # WHEN
+        actual = choose_encoding(accept_encoding)
+        # THEN
+        assert actual == expected
+
+    # 重みの大きい形式を選択するか
+    def test_quality(self):
+        # GIVEN
+        accept_encoding = 'gzip;q=0.5, deflate;q=0.8'
+        expected = 'deflate'
+        # WHEN
+        actual = choose_encoding(accept_encoding)
+        # THEN
+        assert actual == expected
+
+    # 重み0の形式は選択しないか
+    def test_refused(self):
+        # GIVEN
+        accept_encoding = '*, gzip;q=0'
+        expected = 'deflate'
+        # WHEN
+        actual = choose_encoding(accept_encoding)
+        # THEN
+        assert actual == expected
+
+    # 対応する形式が無ければ圧縮しないか
+    def test_identity(self):
+        # GIVEN
+        accept_encodings = ['', 'br', 'gzip;q=0, deflate;q=0']
+        expected = ['identity', 'identity', 'identity']
+        # WHEN
+        actual = [choose_encoding(accept_encoding) for accept_encoding in accept_encodings]
+        # THEN
+        assert actual == expected
+
+
+class TestPrecompressedPage:
+    """ 圧縮済みの本文を展開すると元の本文が得られるか検証 """
+
+    # gzip・deflate形式の本文を展開できるか
+    def test_decompress(self):
+        # GIVEN
+        page = PrecompressedPage(BODY)
+        expected = BODY.encode('utf-8')
+        # WHEN
+        actual_gzip = gzip.decompress(page.encode('gzip'))
+        actual_deflate = zlib.decompress(page.encode('deflate'))
+        # THEN
+        assert actual_gzip == expected
+        assert actual_deflate == expected
+        assert len(page.encode('gzip')) < len(expected)
+
+    # 目印をトークンへ差し替えた本文を、いずれの形式でも展開できるか
+    def test_token(self):
+        # GIVEN
+        page = PrecompressedPage(BODY_WITH_TOKEN)
+        token = b'token' * 10
+        expected = BODY_WITH_TOKEN.replace(CSRF_PLACEHOLDER, token.decode('ascii')).encode('utf-8')
+        # WHEN
+        actual_identity = page.encode('identity', token)
+        actual_gzip = gzip.decompress(page.encode('gzip', token))
+        actual_deflate = zlib.decompress(page.encode('deflate', token))
+        # THEN
+        assert page.needs_token
+        assert actual_identity == expected
+        assert actual_gzip == expected
+        assert actual_deflate == expected
+
+    # 圧縮しても小さくならない本文は、圧縮形式の選択肢から外すか
+    def test_incompressible(self):
+        # GIVEN
+        body = os.urandom(256)
+        expected = ()
+        # WHEN
+        actual = PrecompressedPage(body).encodings
+        # THEN
+        assert actual == expected
+
+
+class TestPrecompressedCache:
+    """ 圧縮済みのページを上限の範囲で保持できるか検証 """
+
+    # 2回目以降は描画せず、ヒット率へ反映されるか
+    def test_hit(self):
+        # GIVEN
+        cache = PrecompressedCache(max_bytes=1024 * 1024)
+        rendered = []
+
+        def render():
+            rendered.append(1)
+            return BODY
+
+        # WHEN
+        for _ in range(4):
+            cache.get_page('page', render)
+        actual = cache.stats()
+        # THEN
+        assert len(rendered) == 1
+        assert (actual.hits, actual.misses, actual.hit_ratio) == (3, 1, 0.75)
+
+    # 合計サイズが上限を超えると、最も長く使われていないページから破棄するか
+    def test_evict(self):
+        # GIVEN
+        page_size = PrecompressedPage(BODY).nbytes
+        cache = PrecompressedCache(max_bytes=page_size * 2)
+        cache.get_page('first', lambda: BODY)
+        cache.get_page('second', lambda: BODY)
+        cache.get_page('first', lambda: BODY)
+        # WHEN
+        cache.get_page('third', lambda: BODY)
+        cache.get_page('first', lambda: BODY)
+        cache.get_page('second', lambda: BODY)
+        actual = cache.stats()
+        # THEN
+        assert actual.size <= page_size * 2
+        assert actual.entries == 2
+        assert actual.evictions == 2
+        assert actual.misses == 4
+
+    # 上限より大きなページは保持しないか
+    def test_too_large(self):
+        # GIVEN
+        cache = PrecompressedCache(max_bytes=16)
+        # WHEN
+        page = cache.get_page('page', lambda: BODY)
+        # THEN
+        assert page.identity_length == len(BODY)
+        assert len(cache) == 0
+
+
+class TestPrecompressedView:
+    """ 入力画面を圧縮済みのページから返却できるか検証 """
+
+    named_url = 'form:raw_get'
+
+    # Accept-Encodingに応じて圧縮し、Varyヘッダを設定するか
+    def test_gzip(self):
+        # GIVEN
+        client = Client()
+        expected = client.get(reverse(self.named_url)).content
+        # WHEN
+        response = client.get(reverse(self.named_url), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        actual = gzip.decompress(response.content)
+        # THEN
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert len(actual) == len(expected)
+
+    # 圧縮済みのページへ埋め込まれたCSRFトークンでPOSTできるか
+    def test_csrf_token(self):
+        # GIVEN
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse(self.named_url), HTTP_ACCEPT_ENCODING='deflate')
+        body = zlib.decompress(response.content).decode('utf-8')
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', body).group(1)
+        expected = 200
+        # WHEN
+        actual = client.post(reverse('form:raw_post'), {'csrfmiddlewaretoken': token, 'text': 'hello'})
+        # THEN
+        assert CSRF_PLACEHOLDER not in body
+        assert actual.status_code == expected
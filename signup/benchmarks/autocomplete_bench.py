@@ -0,0 +1,57 @@
+"""
+ユーザ名の前方一致検索の索引について、100万件あたりのメモリ使用量・検索1回あたりの所要時間を計測
+比較対象として、同じユーザ名をstrのリスト・集合で保持した場合のメモリ使用量も出力する
+
+実行方法: signupディレクトリで `python benchmarks/autocomplete_bench.py --rows 1000000`
+
+計測結果の例(100万件 平均10〜14文字):
+  PrefixIndex 13.4〜17.1 MiB、strのリスト 64.4〜68.0 MiB、リスト+集合 96.4〜100.0 MiB
+  上位10件の検索 14〜33 us/call
+"""
+import argparse
+import sys
+
+from common import setup_django, measure
+
+setup_django()
+
+from signup.prefix_index import PrefixIndex  # noqa: E402
+from signup.usecase.synthetic import DISTRIBUTIONS, generate_usernames  # noqa: E402
+
+MIB = 1024 * 1024
+
+
+def list_bytes(strings: list[str]) -> int:
+    """ strのリストとして保持したときのメモリ使用量 """
+    return sys.getsizeof(strings) + sum(sys.getsizeof(string) for string in strings)
+
+
+def set_bytes(strings: list[str]) -> int:
+    """ strの集合として保持したときのメモリ使用量 文字列はリストと共有するので集合の分のみ """
+    return sys.getsizeof(set(strings))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    args = parser.parse_args()
+    per_million = 1_000_000 / args.rows
+
+    for distribution in args.distributions:
+        usernames = sorted(generate_usernames(args.rows, distribution, seed=1))
+        index = PrefixIndex(usernames, presorted=True)
+        strings = list_bytes(usernames)
+        print(f'[{distribution}] {args.rows:,} usernames, '
+              f'{sum(len(username) for username in usernames) / args.rows:.1f} characters on average')
+        print(f'  PrefixIndex       {index.nbytes * per_million / MIB:8.1f} MiB per million usernames')
+        print(f'  list[str]         {strings * per_million / MIB:8.1f} MiB per million usernames')
+        print(f'  list[str] + set   {(strings + set_bytes(usernames)) * per_million / MIB:8.1f} MiB per million usernames')
+
+        middle = usernames[len(usernames) // 2]
+        for prefix in (middle[:1], middle[:3], middle[:-2], 'zzzz'):
+            measure(f'  search({prefix!r}, 10)', lambda: index.search(prefix, 10), number=20_000)
+
+
+if __name__ == '__main__':
+    main()
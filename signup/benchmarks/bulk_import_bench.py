@@ -0,0 +1,81 @@
+"""
+CSVからのユーザ情報の一括登録について、バッチの大きさごとの登録速度(行/秒)を計測
+計測用のSQLiteファイルを一時ディレクトリへ作成するので、開発用のDBへは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/bulk_import_bench.py --rows 1000000`
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from common import setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from signup.models import User  # noqa: E402
+from signup.usecase.bulk_import import BulkImportAction, open_text, parse_rows  # noqa: E402
+
+
+def use_temporary_database(directory: Path):
+    """
+    計測用のSQLiteファイルへ接続先を切り替え、テーブルを作成
+
+    :param directory: SQLiteファイルを作成するディレクトリ
+    """
+    connection.close()
+    connection.settings_dict['NAME'] = str(directory / 'bench.sqlite3')
+    call_command('migrate', verbosity=0)
+
+
+def write_csv(path: Path, rows: int):
+    """
+    ユーザ名のみのCSVを作成
+
+    :param path: 作成するファイル
+    :param rows: 行数
+    """
+    with path.open('w', encoding='utf-8') as file:
+        file.write('username\n')
+        for number in range(rows):
+            file.write(f'user{number:08d}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        use_temporary_database(directory)
+        csv_path = directory / 'users.csv'
+        write_csv(csv_path, args.rows)
+
+        # 比較対象として、SaveActionと同様に1件ずつ自動コミットで登録する場合
+        sample = min(args.rows, 10_000)
+        started = time.perf_counter()
+        for number in range(sample):
+            User(username=f'single{number:08d}').save()
+        elapsed = time.perf_counter() - started
+        print(f'{"save() per row (autocommit)":<32} {sample / elapsed:12,.0f} rows/s ({sample:,} rows)')
+
+        for batch_size in args.batch_sizes:
+            User.objects.all().delete()
+            action = BulkImportAction(batch_size=batch_size, batches_per_transaction=10)
+            started = time.perf_counter()
+            with csv_path.open('rb') as stream:
+                for result in action(parse_rows(open_text(stream), 'csv')):
+                    pass
+            elapsed = time.perf_counter() - started
+            print(f'{f"bulk import (batch {batch_size})":<32} {result.total_inserted / elapsed:12,.0f} rows/s '
+                  f'({result.total_inserted:,} rows in {elapsed:.1f}s)')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
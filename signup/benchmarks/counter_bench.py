@@ -0,0 +1,52 @@
+"""
+ユーザ数を読む時間を、シャード化したカウンタの合計とCOUNT(*)とで比較
+計測用のSQLiteファイルを一時ディレクトリへ作成するので、開発用のDBへは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/counter_bench.py --rows 10000000`
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from signup.models import User  # noqa: E402
+from signup.usecase.counter import user_count  # noqa: E402
+from signup.usecase.synthetic import generate_usernames, generate_users  # noqa: E402
+
+
+def use_temporary_database(directory: Path):
+    """
+    計測用のSQLiteファイルへ接続先を切り替え、テーブルを作成
+
+    :param directory: SQLiteファイルを作成するディレクトリ
+    """
+    connection.close()
+    connection.settings_dict['NAME'] = str(directory / 'bench.sqlite3')
+    call_command('migrate', verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_temporary_database(Path(directory))
+        result = generate_users(generate_usernames(args.rows))
+        print(f'inserted {result.rows:,} users in {result.elapsed:.1f}s')
+        assert user_count() == User.objects.count() == args.rows
+
+        measure('user_count() over counter shards', user_count, number=args.number * 100)
+        measure(f'COUNT(*) over {args.rows:,} rows', User.objects.count, number=args.number)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
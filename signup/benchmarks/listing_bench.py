@@ -0,0 +1,76 @@
+"""
+ユーザ一覧の1ページを読む時間を、キーセット方式とOFFSET方式とでページの深さごとに比較
+計測用のSQLiteファイルを一時ディレクトリへ作成するので、開発用のDBへは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/listing_bench.py --rows 5000100`
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+from signup.models import User  # noqa: E402
+from signup.usecase.listing import DIRECTION_NEXT, UserListAction, encode_cursor  # noqa: E402
+
+PAGE_SIZE = 50
+INSERT_CHUNK_SIZE = 100_000
+
+
+def use_temporary_database(directory: Path):
+    """
+    計測用のSQLiteファイルへ接続先を切り替え、テーブルを作成
+
+    :param directory: SQLiteファイルを作成するディレクトリ
+    """
+    connection.close()
+    connection.settings_dict['NAME'] = str(directory / 'bench.sqlite3')
+    call_command('migrate', verbosity=0)
+
+
+def insert_users(rows: int):
+    """
+    主キーが1から連番となるようユーザを登録
+
+    :param rows: 件数
+    """
+    table = User._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(1, rows + 1, INSERT_CHUNK_SIZE):
+            stop = min(start + INSERT_CHUNK_SIZE, rows + 1)
+            cursor.executemany(f'INSERT INTO {table} (id, username) VALUES (%s, %s)',
+                               [(number, f'user{number:09d}') for number in range(start, stop)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_100)
+    parser.add_argument('--offsets', type=int, nargs='+', default=[10, 5_000_000])
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_temporary_database(Path(directory))
+        started = time.perf_counter()
+        insert_users(args.rows)
+        print(f'inserted {args.rows:,} users in {time.perf_counter() - started:.1f}s')
+
+        action = UserListAction(PAGE_SIZE)
+        rows = User.objects.order_by('id').values_list('id', 'username')
+        for offset in args.offsets:
+            # 主キーは連番なので、offset件目の直後から読むカーソルは主キーoffsetを境界とする
+            cursor = encode_cursor(DIRECTION_NEXT, offset)
+            measure(f'keyset page after {offset:,} rows', lambda: action(cursor), number=args.number)
+            measure(f'OFFSET {offset:,} LIMIT {PAGE_SIZE}', lambda: list(rows[offset:offset + PAGE_SIZE]),
+                    number=max(1, args.number // 20))
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
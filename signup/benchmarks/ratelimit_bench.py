@@ -0,0 +1,50 @@
+"""
+ユーザ登録の流量制限が1リクエストあたりに加える時間を計測
+共有メモリのバケツから取り出す処理単体と、デコレータを経由したビューの呼び出しを、制限の無いビューと比較する
+計測用の共有メモリは計測後に破棄するので、稼働中のワーカの流量制限へは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/ratelimit_bench.py`
+"""
+import argparse
+import uuid
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from signup.ratelimit import SharedTokenBuckets, client_ip, rate_limited  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=10_000)
+    parser.add_argument('--number', type=int, default=200_000)
+    args = parser.parse_args()
+
+    # 制限にかからず、毎回バケツを読み書きするよう十分に大きなバケツとする
+    buckets = SharedTokenBuckets(f'signup_bench_{uuid.uuid4().hex[:12]}', rate=1e9, burst=10 ** 9)
+    try:
+        keys = [f'10.0.{number // 256}.{number % 256}' for number in range(args.clients)]
+        key_iterator = iter(range(10 ** 12))
+
+        def consume():
+            buckets.consume(keys[next(key_iterator) % args.clients])
+
+        measure('SharedTokenBuckets.consume()', consume, number=args.number)
+
+        def view(request):
+            return HttpResponse()
+
+        limited = rate_limited(buckets, client_ip)(view)
+        request = RequestFactory().post('/save', {'username': 'Django'})
+        measure('view without rate limit', lambda: view(request), number=args.number)
+        measure('view with rate_limited', lambda: limited(request), number=args.number)
+    finally:
+        buckets.unlink()
+
+
+if __name__ == '__main__':
+    main()
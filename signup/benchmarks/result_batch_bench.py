@@ -0,0 +1,82 @@
+"""
+500人分のユーザ情報を取得する時間を、1人ずつの取得と1回のまとめた取得とで比較
+ユースケース単体と、ビューを経由したHTTPリクエスト単位の両方を計測する
+1人ずつのビューは、2回目以降は登録結果画面のキャッシュから返却する
+計測用のSQLiteファイルを一時ディレクトリへ作成するので、開発用のDBへは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/result_batch_bench.py`
+"""
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from common import setup_django, measure
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from signup.models import User  # noqa: E402
+from signup.usecase.actions import BatchResultViewAction, ResultViewAction  # noqa: E402
+from signup.usecase.synthetic import generate_usernames, load_usernames  # noqa: E402
+from signup.views import result, result_batch  # noqa: E402
+
+
+def use_temporary_database(directory: Path):
+    """
+    計測用のSQLiteファイルへ接続先を切り替え、テーブルを作成
+
+    :param directory: SQLiteファイルを作成するディレクトリ
+    """
+    connection.close()
+    connection.settings_dict['NAME'] = str(directory / 'bench.sqlite3')
+    call_command('migrate', verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--ids', type=int, default=500)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_temporary_database(Path(directory))
+        for _ in load_usernames(generate_usernames(args.rows)):
+            pass
+        # 1割は存在しないユーザとする
+        user_ids = random.Random(0).sample(range(1, args.rows + args.rows // 10), args.ids)
+
+        single, batch = ResultViewAction(), BatchResultViewAction()
+
+        def single_calls():
+            for user_id in user_ids:
+                try:
+                    single(user_id)
+                except User.DoesNotExist:
+                    pass
+
+        measure(f'ResultViewAction x {args.ids}', single_calls, number=args.number)
+        measure(f'BatchResultViewAction({args.ids} ids)', lambda: batch(user_ids), number=args.number)
+
+        factory = RequestFactory()
+        single_requests = [(factory.get(f'/result/{user_id}'), user_id) for user_id in user_ids]
+        batch_request = factory.get('/api/results', {'ids': ','.join(map(str, user_ids))})
+
+        def single_views():
+            for request, user_id in single_requests:
+                try:
+                    result(request, user_id)
+                except User.DoesNotExist:
+                    pass
+
+        measure(f'result view x {args.ids} (cached)', single_views, number=args.number)
+        measure(f'result_batch view ({args.ids} ids)', lambda: result_batch(batch_request), number=args.number)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
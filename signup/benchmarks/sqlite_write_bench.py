@@ -0,0 +1,127 @@
+"""
+複数のプロセスから同時にユーザを登録したときの登録数/秒・ロックによる失敗の割合を、
+SQLiteの既定のプラグマとSIGNUP_SQLITE_PRAGMASとで比較 ロックを待つ秒数はどちらも--timeoutとする
+計測用のSQLiteファイルを一時ディレクトリへ作成するので、開発用のDBへは影響しない
+
+実行方法: signupディレクトリで `python benchmarks/sqlite_write_bench.py --processes 8 --inserts 500`
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from common import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connection  # noqa: E402
+
+from signup.sqlite_tuning import sqlite_pragmas  # noqa: E402
+from signup.usecase.actions import ResultViewAction, SaveAction  # noqa: E402
+
+TUNED_PRAGMAS = dict(settings.SIGNUP_SQLITE_PRAGMAS)
+
+
+def use_database(path: Path, pragmas: dict):
+    """
+    計測用のSQLiteファイルへ接続先を切り替え、接続時に設定するプラグマを差し替える
+
+    :param path: SQLiteファイル
+    :param pragmas: 接続時に設定するプラグマ 空であれば既定のまま
+    """
+    connection.close()
+    connection.settings_dict['NAME'] = str(path)
+    settings.SIGNUP_SQLITE_PRAGMAS = pragmas
+
+
+def insert_users(path: Path, pragmas: dict, worker: int, inserts: int, start: multiprocessing.Event, results):
+    """
+    1つのプロセスで、SaveActionによりユーザを1件ずつ登録し、リダイレクト先と同じく登録したユーザを読み込む
+
+    :param path: SQLiteファイル
+    :param pragmas: 接続時に設定するプラグマ
+    :param worker: プロセスの番号 ユーザ名へ含める
+    :param inserts: 登録を試みる件数
+    :param start: すべてのプロセスが揃ってから登録を始めるための合図
+    :param results: 登録できた件数・ロックにより失敗した件数を返却するキュー
+    """
+    use_database(path, pragmas)
+    connection.ensure_connection()
+    save, view = SaveAction(), ResultViewAction()
+    inserted = locked = 0
+    start.wait()
+    for number in range(inserts):
+        try:
+            user = save(f'worker{worker}-{number}')
+            view(user.id)
+            inserted += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    connection.close()
+    results.put((inserted, locked))
+
+
+def run(label: str, directory: Path, pragmas: dict, processes: int, inserts: int):
+    """
+    同時に登録するプロセスを起動し、登録数/秒・失敗の割合を出力
+
+    :param label: 出力に表示する名前
+    :param directory: SQLiteファイルを作成するディレクトリ
+    :param pragmas: 接続時に設定するプラグマ
+    :param processes: 同時に登録するプロセスの数
+    :param inserts: 1プロセスが登録を試みる件数
+    """
+    path = directory / f'{label}.sqlite3'
+    use_database(path, pragmas)
+    call_command('migrate', verbosity=0)
+    journal_mode = sqlite_pragmas(connection).get('journal_mode', '?') if pragmas else 'delete'
+    connection.close()
+
+    context = multiprocessing.get_context('fork')
+    start = context.Event()
+    results = context.Queue()
+    workers = [
+        context.Process(target=insert_users, args=(path, pragmas, worker, inserts, start, results))
+        for worker in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    # 接続し終えるのを待ってから一斉に始める
+    time.sleep(0.5)
+    started = time.perf_counter()
+    start.set()
+    counts = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    inserted = sum(count[0] for count in counts)
+    locked = sum(count[1] for count in counts)
+    attempts = processes * inserts
+    print(f'{label:<8} journal_mode={journal_mode:<7} {inserted / elapsed:10,.0f} inserts/s '
+          f'{locked:6,} locked ({locked / attempts:6.2%} of {attempts:,} attempts) in {elapsed:.2f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--inserts', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Python sqlite3 busy timeout in seconds for both runs (Python default is 5).')
+    args = parser.parse_args()
+
+    # 違いがプラグマのみとなるよう、ロックを待つ秒数はどちらも同じとする
+    connection.settings_dict['OPTIONS'] = {'timeout': args.timeout}
+    with tempfile.TemporaryDirectory() as directory:
+        # 既定ではジャーナルはDELETE・synchronous=FULL
+        run('default', Path(directory), {}, args.processes, args.inserts)
+        run('tuned', Path(directory), TUNED_PRAGMAS, args.processes, args.inserts)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,3 +14,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# ユーザ名の確認に使うBloomフィルタ・前方一致検索の索引は、最初のリクエストを待たずにUserテーブルから組み立てる
+from signup.usecase.autocomplete import USERNAME_INDEX  # noqa: E402
+from signup.usecase.availability import USERNAME_FILTER  # noqa: E402
+
+USERNAME_FILTER.build()
+USERNAME_INDEX.build()
+
+# ユーザ登録後の処理があれば、前回までに退避したイベントも実行するようワーカを起動
+from signup.hooks import POST_SIGNUP_HOOKS, POST_SIGNUP_POOL  # noqa: E402
+
+if len(POST_SIGNUP_HOOKS):
+    POST_SIGNUP_POOL.start()
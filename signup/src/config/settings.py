@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'signup.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -82,6 +83,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# 複数のプロセスで共有するときは、memcached・Redisなどのバックエンドへ置き換える
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'signup',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -117,8 +133,112 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
 STATIC_URL = 'static/'
+# build_tailwind_cssコマンドが書き出すスタイルシートなど
+STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 圧縮済みのページを保持する合計サイズの上限(バイト)
+PRECOMPRESSED_PAGE_CACHE_BYTES = 4 * 1024 * 1024
+
+# export_static_pagesコマンドがページを書き出すディレクトリ
+STATIC_EXPORT_ROOT = BASE_DIR.parent / 'export'
+# Trueであれば、書き出したページをDjangoを経由せずにWSGIの層で返却する
+STATIC_EXPORT_SERVE = False
+
+# 一括登録で1回のbulk_createにより登録する件数
+SIGNUP_IMPORT_BATCH_SIZE = 1000
+# 一括登録で1トランザクションにより登録するバッチ数
+SIGNUP_IMPORT_BATCHES_PER_TRANSACTION = 10
+
+# ユーザ一覧の1ページの件数
+SIGNUP_LIST_PAGE_SIZE = 50
+# ユーザ一覧でsizeとして指定できる1ページの最大件数
+SIGNUP_LIST_MAX_PAGE_SIZE = 500
+
+# ユーザ名のBloomフィルタの偽陽性率 フィルタのビット数・ハッシュ関数の数はこの値から決める
+SIGNUP_USERNAME_FILTER_FALSE_POSITIVE_RATE = 0.01
+# ユーザ名のBloomフィルタへ確保する最小の容量(件数)
+SIGNUP_USERNAME_FILTER_MIN_CAPACITY = 100_000
+# 他のプロセスが登録したユーザ名をBloomフィルタへ読み込む間隔(秒) Noneであれば読み込まない
+SIGNUP_USERNAME_FILTER_REFRESH_SECONDS = 1.0
+
+# ユーザ登録結果画面のキャッシュに使うCACHESの別名
+SIGNUP_RESULT_CACHE_ALIAS = 'default'
+# ユーザ登録結果画面をキャッシュする秒数 ユーザ情報が変わったときは、この秒数を待たずに破棄する
+# LocMemCacheはプロセスごとのキャッシュなので、破棄は更新したプロセスにしか届かない
+# 他のプロセスが古い画面を返し続ける期間を抑えるよう、プロセス間で共有しないバックエンドでは短くする
+SIGNUP_RESULT_CACHE_TIMEOUT = (
+    60 if CACHES[SIGNUP_RESULT_CACHE_ALIAS]['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'
+    else 24 * 60 * 60
+)
+# キャッシュされていない画面を1つのリクエストのみが描画するよう、描画中に保持するロックの秒数
+SIGNUP_RESULT_CACHE_LOCK_SECONDS = 5
+
+# 他のプロセスが登録したユーザ名を前方一致検索の索引へ読み込む間隔(秒) Noneであれば読み込まない
+SIGNUP_AUTOCOMPLETE_REFRESH_SECONDS = 1.0
+# 前方一致検索でlimitとして指定できる最大件数
+SIGNUP_AUTOCOMPLETE_MAX_RESULTS = 50
+
+# ユーザ数を分けて数える行数 同時に登録・削除するプロセスが多いほど、待ち合わせが減る
+SIGNUP_USER_COUNTER_SHARDS = 16
+
+# 全ユーザの書き出しで、DBから一度に読み込む件数
+SIGNUP_EXPORT_CHUNK_SIZE = 2000
+# 全ユーザをgzip形式で書き出すときの圧縮レベル
+SIGNUP_EXPORT_COMPRESS_LEVEL = 6
+
+# 複数のユーザ情報の取得で、1回のリクエストに指定できるユーザIDの最大数
+SIGNUP_RESULT_BATCH_MAX_IDS = 500
+
+# ユーザ登録後の処理 `package.module.function`形式で指定し、登録内容(SignupEvent)を受け取る
+SIGNUP_POST_SIGNUP_HOOKS = []
+# ユーザ登録後の処理を実行するワーカスレッドの数
+SIGNUP_HOOK_WORKERS = 2
+# ユーザ登録後の処理の実行を待つイベントの上限
+SIGNUP_HOOK_QUEUE_SIZE = 1000
+# 実行を待つイベントが上限を超えたときの扱い block(空くまで待つ)・drop(捨てる)・spill(ファイルへ退避する)
+SIGNUP_HOOK_OVERFLOW = 'spill'
+# blockで、空くまで待つ秒数 空かなければ捨てる
+SIGNUP_HOOK_BLOCK_SECONDS = 1.0
+# あふれた・終了までに実行できなかったイベントを退避するSQLiteファイル
+SIGNUP_HOOK_SPILL_PATH = BASE_DIR / 'hook_spill.sqlite3'
+# 退避したイベントは実行し終えてから削除する 実行中にプロセスが終了したときは、この秒数が過ぎると再び実行する
+# 同じイベントが2回以上実行されることがあるので、処理は重複しても問題ないようにし、最も長い処理より長くしておく
+SIGNUP_HOOK_SPILL_LEASE_SECONDS = 300.0
+# ワーカの終了時に、実行を待つイベントを処理し終えるまで待つ秒数
+SIGNUP_HOOK_DRAIN_SECONDS = 10.0
+
+# ユーザ登録の流量制限を有効にするか
+SIGNUP_RATE_LIMIT_ENABLED = True
+# 流量制限のキー ip(送信元IP)・username(ユーザ名)のいずれか
+SIGNUP_RATE_LIMIT_KEY = 'ip'
+# 送信元IPをX-Forwarded-Forから読み取る、信頼するリバースプロキシのIPアドレス・CIDR表記のネットワーク
+# nginxなどのリバースプロキシを経由するときは、REMOTE_ADDRがプロキシのアドレスとなり、全ての訪問者が
+# 1つのバケツを共有してしまうので、プロキシのアドレスを指定し、プロキシでX-Forwarded-Forを付け足すこと
+# 例: nginxでは proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+SIGNUP_RATE_LIMIT_TRUSTED_PROXIES = ()
+# 流量制限で1秒あたりに補充するトークン数 1回の登録で1つ使う
+SIGNUP_RATE_LIMIT_RATE = 1.0
+# 流量制限で連続して受け付ける最大の登録数
+SIGNUP_RATE_LIMIT_BURST = 10
+# 流量制限のバケツを保持する共有メモリの名前 同じホストのワーカはこの名前で同じバケツを共有する
+SIGNUP_RATE_LIMIT_NAME = 'signup_save_rate_limit'
+# 流量制限のバケツの数 超えるキーは同じバケツを共有する
+SIGNUP_RATE_LIMIT_SLOTS = 65536
+# 流量制限のバケツのロックを分ける区画の数
+SIGNUP_RATE_LIMIT_STRIPES = 64
+
+# SQLiteへ接続するたびに設定するプラグマ 空であれば既定のまま
+# WALにより読み込みと書き込みが互いを待たず、synchronous=NORMALによりWALではコミットごとの同期を省く
+# mmap_size(バイト)までファイルをメモリへ対応付け、cache_sizeは負の値でKiB単位とする
+# 書き込みのロックを待つ秒数は、PythonのsqliteモジュールのtimeoutとしてDATABASESのOPTIONSで指定する(既定は5秒)
+SIGNUP_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
@@ -14,3 +14,24 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# ユーザ名の確認に使うBloomフィルタ・前方一致検索の索引は、最初のリクエストを待たずにUserテーブルから組み立てる
+from signup.usecase.autocomplete import USERNAME_INDEX  # noqa: E402
+from signup.usecase.availability import USERNAME_FILTER  # noqa: E402
+
+USERNAME_FILTER.build()
+USERNAME_INDEX.build()
+
+# ユーザ登録後の処理があれば、前回までに退避したイベントも実行するようワーカを起動
+from signup.hooks import POST_SIGNUP_HOOKS, POST_SIGNUP_POOL  # noqa: E402
+
+if len(POST_SIGNUP_HOOKS):
+    POST_SIGNUP_POOL.start()
+
+# 書き出したページは、Djangoへ渡さずにWSGIの層で返却
+from django.conf import settings  # noqa: E402
+
+if settings.STATIC_EXPORT_SERVE:
+    from signup.static_export import ExportedPagesApplication  # noqa: E402
+
+    application = ExportedPagesApplication(application, settings.STATIC_EXPORT_ROOT)
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class SignupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'signup'
+
+    def ready(self):
+        # ユーザ情報の更新・削除に合わせて結果画面のキャッシュ・IdentityMap・前方一致索引・ユーザ数を更新するシグナルを登録
+        from . import result_cache  # noqa: F401
+        from .usecase import autocomplete, counter, identity_map  # noqa: F401
+        # SQLiteへ接続するたびにプラグマを設定するシグナルを登録
+        from . import sqlite_tuning  # noqa: F401
+
+        # 設定したユーザ登録後の処理を登録
+        from django.conf import settings
+        from .hooks import POST_SIGNUP_HOOKS
+        POST_SIGNUP_HOOKS.load(settings.SIGNUP_POST_SIGNUP_HOOKS)
@@ -0,0 +1,74 @@
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+
+class BloomFilter:
+    """
+    文字列の集合を、偽陽性を許す代わりに少ないメモリで表現することを責務に持つ
+    含まれないと判定したものは確実に含まれないので、存在確認の前段に置いて問い合わせを減らせる
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        """
+        :param capacity: 想定する要素数 超えると偽陽性率が上がる
+        :param false_positive_rate: 想定する要素数のときの偽陽性率
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        if not 0 < false_positive_rate < 1:
+            raise ValueError('false_positive_rate must be between 0 and 1')
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        # 最適なビット数・ハッシュ関数の数
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        """ ビット列のメモリ使用量 """
+        return len(self._bits)
+
+    def _positions(self, item: str) -> list[int]:
+        """
+        要素に対応するビットの位置 2つのハッシュ値の線形結合でハッシュ関数の数だけ求める
+
+        :param item: 要素
+        :return: ビットの位置
+        """
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, item: str):
+        """
+        要素を追加
+
+        :param item: 要素
+        """
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def update(self, items: Iterable[str]):
+        """
+        複数の要素を追加
+
+        :param items: 要素
+        """
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
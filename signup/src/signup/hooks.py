@@ -0,0 +1,470 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP = 'drop'
+OVERFLOW_SPILL = 'spill'
+OVERFLOWS = (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL)
+# ワーカがキューの空きを待つ間隔(秒) 空いているときは、この間隔で退避したイベントを確認する
+POLL_INTERVAL = 0.5
+# 退避したイベントを取り出してから、処理し終えないまま他のワーカへ渡すまでの秒数
+SPILL_LEASE_SECONDS = 300.0
+
+
+class SignupEvent(NamedTuple):
+    """ ユーザ登録後の処理へ渡す登録内容 退避先へ書き出せるよう、Modelではなく値のみを持つ """
+    user_id: int
+    username: str
+
+
+class ClaimedEvent(NamedTuple):
+    """ 退避先から取り出し、処理し終えるまで他のワーカへ渡さないよう確保したイベント """
+    id: int
+    event: SignupEvent
+
+
+TypeHook = Callable[[SignupEvent], object]
+
+
+class HookRegistry:
+    """ ユーザ登録後に実行する処理を、名前ごとに保持することを責務に持つ """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hooks: dict[str, TypeHook] = {}
+
+    def register(self, hook: Optional[TypeHook] = None, *, name: Optional[str] = None):
+        """
+        処理を登録 `@registry.register`・`@registry.register(name=...)`のようにデコレータとしても使える
+
+        :param hook: ユーザ登録後に実行する処理
+        :param name: 統計情報へ表示する名前 省略時はモジュール・関数名 同じ名前で登録すると置き換える
+        :return: 登録した処理 デコレータとして使うときは、処理を受け取る関数
+        """
+        def decorator(func: TypeHook) -> TypeHook:
+            with self._lock:
+                self._hooks[name or f'{func.__module__}.{func.__qualname__}'] = func
+            return func
+
+        return decorator(hook) if hook is not None else decorator
+
+    def unregister(self, name: str):
+        """
+        登録した処理を取り除く
+
+        :param name: 登録した名前
+        """
+        with self._lock:
+            self._hooks.pop(name, None)
+
+    def load(self, paths: Iterable[str]):
+        """
+        ドット区切りのパスが指す処理を登録
+
+        :param paths: `package.module.function`形式のパス
+        """
+        for path in paths:
+            self.register(import_string(path), name=path)
+
+    def items(self) -> list[tuple[str, TypeHook]]:
+        """ 登録した順の名前・処理 """
+        with self._lock:
+            return list(self._hooks.items())
+
+    def clear(self):
+        with self._lock:
+            self._hooks.clear()
+
+    def __len__(self) -> int:
+        return len(self._hooks)
+
+
+class SpillQueue:
+    """
+    キューからあふれたイベントを、SQLiteのファイルへ退避することを責務に持つ
+    プロセスを再起動しても失われず、同じファイルを複数のプロセスで共有できる
+
+    取り出したイベントは削除せずに確保した時刻を記録し、処理し終えてから削除する
+    処理中にプロセスが終了したイベントは、確保してからリースの秒数が過ぎると再び取り出される
+    そのため同じイベントが2回以上実行されることがあり、処理は重複して実行されても問題ないようにしておく
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        :param path: 退避先のSQLiteファイル
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """ ロックを獲得した状態で接続 fork後は親プロセスの接続を使わず、接続し直す """
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS spilled_events '
+                '(id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, claimed_at REAL)'
+            )
+            # 確保した時刻を持たない、以前の形式のファイルへ列を追加
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(spilled_events)')}
+            if 'claimed_at' not in columns:
+                connection.execute('ALTER TABLE spilled_events ADD COLUMN claimed_at REAL')
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _exists(self) -> bool:
+        """ 一度も退避していなければ、読むだけでファイルを作らないよう確かめる """
+        return self._connection is not None or os.path.exists(self.path)
+
+    def put(self, event: SignupEvent):
+        """
+        イベントを退避
+
+        :param event: 登録内容
+        """
+        payload = json.dumps(event._asdict(), ensure_ascii=False)
+        with self._lock:
+            self._connect().execute('INSERT INTO spilled_events (payload) VALUES (?)', (payload,))
+
+    def claim(self, lease: float = SPILL_LEASE_SECONDS) -> Optional[ClaimedEvent]:
+        """
+        最も古い、確保されていない・リースの切れたイベントを確保して取り出す
+        処理し終えたらcomplete()で削除する
+
+        :param lease: 確保してから、処理し終えていなくても再び取り出せるようになるまでの秒数
+        :return: 確保したイベント 取り出せるイベントが無ければNone
+        """
+        with self._lock:
+            if not self._exists():
+                return None
+            connection = self._connect()
+            # 退避したイベントが無いときは、書き込みのロックを獲得せずに済ませる
+            if connection.execute('SELECT 1 FROM spilled_events LIMIT 1').fetchone() is None:
+                return None
+            # 複数のプロセスで共有するので、経過時間ではなく時刻で比べる
+            now = time.time()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute(
+                    'SELECT id, payload FROM spilled_events WHERE claimed_at IS NULL OR claimed_at <= ? '
+                    'ORDER BY id LIMIT 1', (now - lease,)
+                ).fetchone()
+                if row is not None:
+                    connection.execute('UPDATE spilled_events SET claimed_at = ? WHERE id = ?', (now, row[0]))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return ClaimedEvent(row[0], SignupEvent(**json.loads(row[1]))) if row is not None else None
+
+    def complete(self, claimed: ClaimedEvent):
+        """
+        処理し終えたイベントを削除
+
+        :param claimed: claim()で確保したイベント
+        """
+        with self._lock:
+            self._connect().execute('DELETE FROM spilled_events WHERE id = ?', (claimed.id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            if not self._exists():
+                return 0
+            return self._connect().execute('SELECT COUNT(*) FROM spilled_events').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+class HookStats(NamedTuple):
+    """ ユーザ登録後の処理の待ち件数・件数・処理ごとの所要時間 """
+    workers: int
+    queue_depth: int
+    spilled_depth: int
+    submitted: int
+    completed: int
+    dropped: int
+    spilled: int
+    failures: int
+    # 処理の名前ごとの呼び出し回数・失敗回数・平均/最大の所要時間(ミリ秒)
+    latency: dict[str, dict]
+
+
+class HookWorkerPool:
+    """
+    ユーザ登録後の処理を、リクエストを処理するスレッドとは別のワーカスレッドで実行することを責務に持つ
+
+    キューの大きさには上限を持ち、あふれたときは次のいずれかとする
+    block: 空くまでblock_timeout秒待ち、空かなければ捨てる
+    drop: 待たずに捨てる
+    spill: SQLiteのファイルへ退避し、ワーカの手が空いたときに取り出して実行する
+    """
+
+    def __init__(self, registry: HookRegistry, workers: int = 2, queue_size: int = 1000,
+                 overflow: str = OVERFLOW_SPILL, block_timeout: float = 1.0,
+                 spill_path: Optional[Union[str, Path]] = None, drain_timeout: float = 10.0,
+                 poll_interval: float = POLL_INTERVAL, spill_lease: float = SPILL_LEASE_SECONDS):
+        """
+        :param registry: 実行する処理
+        :param workers: ワーカスレッドの数
+        :param queue_size: 実行を待つイベントの上限
+        :param overflow: キューがあふれたときの扱い block・drop・spillのいずれか
+        :param block_timeout: blockで、キューが空くまで待つ秒数
+        :param spill_path: 退避先のSQLiteファイル spillでは必須 他の扱いでも、終了時に処理し切れなかったイベントを退避する
+        :param drain_timeout: 終了時に、キューに残ったイベントを処理し終えるまで待つ秒数
+        :param poll_interval: ワーカがキューの空きを待つ間隔(秒)
+        :param spill_lease: 退避したイベントを取り出してから、処理し終えないまま再び取り出せるようになるまでの秒数
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError('workers and queue_size must be positive')
+        if overflow not in OVERFLOWS:
+            raise ValueError(f'overflow must be one of {", ".join(OVERFLOWS)}')
+        if overflow == OVERFLOW_SPILL and spill_path is None:
+            raise ValueError('spill_path is required to spill')
+        self.registry = registry
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.drain_timeout = drain_timeout
+        self.poll_interval = poll_interval
+        self.spill_lease = spill_lease
+        self._spill = SpillQueue(spill_path) if spill_path is not None else None
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._stopping = threading.Event()
+        self._exit_registered = False
+        # 件数・所要時間は複数のワーカから更新する
+        self._stats_lock = threading.Lock()
+        self._latency: dict[str, list] = {}
+        self.submitted = self.completed = self.dropped = self.spilled = self.failures = 0
+
+    def start(self):
+        """ ワーカスレッドを起動 終了した後に呼び出すと、再び受け付ける """
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork後は親プロセスのスレッドが存在しないので、キューごと作り直す
+                self._queue = queue.Queue(self.queue_size)
+                self._threads = []
+                self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for number in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._work, name=f'signup-hook-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if not self._exit_registered:
+                atexit.register(self.shutdown)
+                self._exit_registered = True
+
+    def submit(self, event: SignupEvent) -> bool:
+        """
+        イベントをキューへ積む キューがあふれたときは、overflowに従う
+
+        :param event: 登録内容
+        :return: キューへ積む・退避できればTrue 捨てたときはFalse
+        """
+        with self._stats_lock:
+            self.submitted += 1
+        if self._stopping.is_set():
+            return self._overflow(event, spill=True)
+        if self._pid != os.getpid() or not self._threads:
+            self.start()
+
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            return self._overflow(event, spill=self.overflow == OVERFLOW_SPILL)
+        return True
+
+    def _overflow(self, event: SignupEvent, spill: bool) -> bool:
+        """
+        キューへ積めなかったイベントを退避、または捨てる
+
+        :param event: 登録内容
+        :param spill: 退避先があれば退避するか
+        :return: 退避できればTrue
+        """
+        if spill and self._spill is not None:
+            # 退避先へ書き込めなくても、コミット後に呼ばれる登録処理の応答を失敗させず、捨てたものとして扱う
+            try:
+                self._spill.put(event)
+            except sqlite3.Error:
+                logger.exception('dropped post-signup hooks for user %s: failed to spill', event.user_id)
+            else:
+                with self._stats_lock:
+                    self.spilled += 1
+                return True
+        else:
+            logger.warning('dropped post-signup hooks for user %s: queue is full', event.user_id)
+
+        with self._stats_lock:
+            self.dropped += 1
+        return False
+
+    def _work(self):
+        """ キューのイベントを実行 キューが空いていれば、退避したイベントを取り出して実行する """
+        while True:
+            try:
+                event = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                self._run_spilled()
+                continue
+            self._run(event)
+
+    def _run_spilled(self):
+        """ 退避したイベントを1件確保して実行し、実行し終えてから退避先から削除する """
+        if self._spill is None:
+            return
+        try:
+            claimed = self._spill.claim(self.spill_lease)
+        except sqlite3.Error:
+            logger.exception('failed to read spilled post-signup events')
+            return
+        if claimed is None:
+            return
+
+        self._run(claimed.event)
+        try:
+            self._spill.complete(claimed)
+        except sqlite3.Error:
+            # 削除できなかったイベントは、リースが切れた後に再び実行される
+            logger.exception('failed to remove spilled post-signup event %s', claimed.id)
+
+    def _run(self, event: SignupEvent):
+        """
+        登録されたすべての処理を実行 失敗した処理があっても、残りの処理は実行する
+
+        :param event: 登録内容
+        """
+        # リクエストと同じく、ワーカスレッドが使ったDBの接続は処理ごとに閉じる
+        close_old_connections()
+        try:
+            for name, hook in self.registry.items():
+                started = time.perf_counter()
+                failed = False
+                try:
+                    hook(event)
+                except Exception:
+                    failed = True
+                    logger.exception('post-signup hook %s failed for user %s', name, event.user_id)
+                self._record(name, time.perf_counter() - started, failed)
+        finally:
+            close_old_connections()
+        with self._stats_lock:
+            self.completed += 1
+
+    def _record(self, name: str, elapsed: float, failed: bool):
+        with self._stats_lock:
+            # 呼び出し回数・失敗回数・合計・最大の所要時間
+            latency = self._latency.setdefault(name, [0, 0, 0.0, 0.0])
+            latency[0] += 1
+            latency[1] += failed
+            latency[2] += elapsed
+            latency[3] = max(latency[3], elapsed)
+            self.failures += failed
+
+    def shutdown(self, timeout: Optional[float] = None) -> int:
+        """
+        新たなイベントを受け付けず、キューに残ったイベントを処理し終えるまで待つ
+        以降に積まれたイベント・期限までに処理できなかったイベントは、退避先があれば退避し、無ければ捨てる
+
+        :param timeout: 待つ秒数 省略時はdrain_timeout
+        :return: 期限までに処理できなかったイベントの件数
+        """
+        self._stopping.set()
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+
+        remaining = 0
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._overflow(event, spill=True)
+            remaining += 1
+        if remaining:
+            logger.warning('%s post-signup events were not processed before shutdown', remaining)
+        return remaining
+
+    def stats(self) -> HookStats:
+        with self._stats_lock:
+            latency = {
+                name: {
+                    'calls': calls,
+                    'failures': failures,
+                    'mean_ms': round(total / calls * 1000, 3) if calls else 0.0,
+                    'max_ms': round(longest * 1000, 3),
+                }
+                for name, (calls, failures, total, longest) in self._latency.items()
+            }
+            counts = (self.submitted, self.completed, self.dropped, self.spilled, self.failures)
+        return HookStats(
+            len([thread for thread in self._threads if thread.is_alive()]),
+            self._queue.qsize(),
+            len(self._spill) if self._spill is not None else 0,
+            *counts,
+            latency,
+        )
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._latency = {}
+            self.submitted = self.completed = self.dropped = self.spilled = self.failures = 0
+
+
+POST_SIGNUP_HOOKS = HookRegistry()
+
+POST_SIGNUP_POOL = HookWorkerPool(
+    POST_SIGNUP_HOOKS,
+    settings.SIGNUP_HOOK_WORKERS,
+    settings.SIGNUP_HOOK_QUEUE_SIZE,
+    settings.SIGNUP_HOOK_OVERFLOW,
+    settings.SIGNUP_HOOK_BLOCK_SECONDS,
+    settings.SIGNUP_HOOK_SPILL_PATH,
+    settings.SIGNUP_HOOK_DRAIN_SECONDS,
+    spill_lease=settings.SIGNUP_HOOK_SPILL_LEASE_SECONDS,
+)
+
+
+def dispatch_post_signup(user_id: int, username: str):
+    """
+    トランザクションが確定した後に、ユーザ登録後の処理をワーカへ渡すよう予約
+    ロールバックしたときは実行されない 処理が登録されていなければ何もしない
+
+    :param user_id: 登録したユーザID
+    :param username: 登録したユーザ名
+    """
+    if not len(POST_SIGNUP_HOOKS):
+        return
+    event = SignupEvent(user_id, username)
+    transaction.on_commit(lambda: POST_SIGNUP_POOL.submit(event))
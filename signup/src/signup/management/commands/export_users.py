@@ -0,0 +1,48 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from signup.usecase.bulk_import import FORMATS, guess_format
+from signup.usecase.export import UserExportAction
+
+
+class Command(BaseCommand):
+    """ 全ユーザをCSV・NDJSONへ書き出す 全件は読み込まず、DBから一定数ずつ読み込みながら書き出す """
+
+    help = 'Export every user to CSV or NDJSON by iterating the table in chunks, optionally gzip-compressed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write. Use "-" to write to standard output.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Output format. Guessed from the extension (ignoring .gz) by default.')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress with gzip. Implied when the path ends with .gz.')
+        parser.add_argument('--chunk-size', type=int, default=settings.SIGNUP_EXPORT_CHUNK_SIZE,
+                            help='Rows read from the database at a time.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.lower().endswith('.gz')
+        file_format = options['format'] or guess_format(path[:-3] if path.lower().endswith('.gz') else path)
+        try:
+            action = UserExportAction(file_format, options['chunk_size'], compress,
+                                      settings.SIGNUP_EXPORT_COMPRESS_LEVEL)
+        except ValueError as e:
+            raise CommandError(e)
+
+        stream = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        written = 0
+        try:
+            for chunk in action():
+                stream.write(chunk)
+                written += len(chunk)
+        except DatabaseError as e:
+            raise CommandError(f'export stopped after {written:,} bytes: {e}')
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+        if path != '-':
+            self.stdout.write(f'exported users to {path} ({written:,} bytes)')
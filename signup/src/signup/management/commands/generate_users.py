@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.db.models import Max
+
+from signup.models import User
+from signup.usecase.synthetic import CHUNK_SIZE, DISTRIBUTION_SEQUENTIAL, DISTRIBUTIONS, ROWS_PER_TRANSACTION, \
+    generate_usernames, generate_users
+
+
+class Command(BaseCommand):
+    """ 負荷試験用のユーザを大量に生成して登録 同じ種・同じDBの状態からであれば同じユーザ名となる """
+
+    help = 'Generate synthetic users for load testing through executemany with relaxed SQLite pragmas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of users to generate.')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default=DISTRIBUTION_SEQUENTIAL,
+                            help='sequential: user000000001..., uniform: random lowercase stems of uniform length, '
+                                 'zipf: a few name stems chosen with a Zipf skew. Stems get a unique number suffix.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--start', type=int,
+                            help='First number of the username suffix. Defaults to the current max id + 1.')
+        parser.add_argument('--min-length', type=int, default=4, help='Shortest stem for the uniform distribution.')
+        parser.add_argument('--max-length', type=int, default=12, help='Longest stem for the uniform distribution.')
+        parser.add_argument('--zipf-exponent', type=float, default=1.1, help='Skew of the zipf distribution.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per executemany.')
+        parser.add_argument('--rows-per-transaction', type=int, default=ROWS_PER_TRANSACTION,
+                            help='Rows committed together in one transaction.')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('count must be positive')
+        start = options['start']
+        if start is None:
+            start = (User.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+        try:
+            usernames = generate_usernames(
+                options['count'], options['distribution'], options['seed'], start,
+                options['min_length'], options['max_length'], options['zipf_exponent'],
+            )
+            result = generate_users(usernames, options['chunk_size'], options['rows_per_transaction'],
+                                    progress=self._progress)
+        except ValueError as e:
+            raise CommandError(e)
+        except DatabaseError as e:
+            raise CommandError(f'generation failed: {e}')
+
+        rate = result.rows / result.elapsed if result.elapsed else 0.0
+        self.stdout.write(f'generated {result.rows:,} users in {result.elapsed:.2f}s ({rate:,.0f} rows/s)')
+        if result.deferred_indexes:
+            self.stdout.write(f'rebuilt indexes: {", ".join(result.deferred_indexes)}')
+        if result.database_bytes is not None:
+            self.stdout.write(f'database size: {result.database_bytes / 1024 / 1024:,.1f} MiB')
+
+    def _progress(self, rows: int, elapsed: float):
+        self.stdout.write(f'{rows:,} rows written ({elapsed:.2f}s)')
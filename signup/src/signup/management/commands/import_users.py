@@ -0,0 +1,54 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from signup.usecase.bulk_import import FORMATS, BulkImportAction, guess_format, open_text, parse_rows
+
+
+class Command(BaseCommand):
+    """ CSV・NDJSONからユーザ情報を一括登録 ファイル全体は読み込まず、1行ずつ読み込みながら登録する """
+
+    help = 'Import usernames from a CSV or NDJSON file with batched bulk_create inside chunked transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import. Use "-" to read from standard input.')
+        parser.add_argument('--format', choices=FORMATS, help='Input format. Guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=settings.SIGNUP_IMPORT_BATCH_SIZE,
+                            help='Rows per bulk_create.')
+        parser.add_argument('--batches-per-transaction', type=int,
+                            default=settings.SIGNUP_IMPORT_BATCHES_PER_TRANSACTION,
+                            help='Batches committed together in one transaction.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        try:
+            action = BulkImportAction(options['batch_size'], options['batches_per_transaction'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        last = None
+        try:
+            with open_text(stream) as lines:
+                for last in action(parse_rows(lines, file_format)):
+                    self.stdout.write(
+                        f'batch {last.batch}: inserted {last.inserted} '
+                        f'(total {last.total_inserted}, errors {last.total_errors}, {last.elapsed:.2f}s)'
+                    )
+                    for row in last.errors:
+                        self.stderr.write(f'line {row.line}: {row.error}: {row.value!r}')
+        except DatabaseError as e:
+            committed = last.total_inserted if last else 0
+            raise CommandError(f'import stopped after {committed} committed rows: {e}')
+
+        if last is None:
+            self.stdout.write('nothing to import')
+            return
+        rate = last.total_inserted / last.elapsed if last.elapsed else 0.0
+        self.stdout.write(
+            f'imported {last.total_inserted} users with {last.total_errors} errors '
+            f'in {last.elapsed:.2f}s ({rate:,.0f} rows/s)'
+        )
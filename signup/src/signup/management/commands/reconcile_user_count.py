@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from signup.usecase.counter import reconcile_user_count
+
+
+class Command(BaseCommand):
+    """ 数えたユーザ数をUserテーブルの件数と突き合わせ、差があれば直す """
+
+    help = 'Compare the maintained user counter with COUNT(*) over signup_user and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report the drift and exit with an error when there is one.')
+
+    def handle(self, *args, **options):
+        result = reconcile_user_count(fix=not options['check'])
+        self.stdout.write(f'counter {result.counted:,}, actual {result.actual:,}, drift {result.drift:+,}')
+        if not result.drift:
+            return
+        if options['check']:
+            raise CommandError('user counter has drifted. Run reconcile_user_count to fix it.')
+        self.stdout.write(f'counter reset to {result.actual:,}')
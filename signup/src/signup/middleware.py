@@ -0,0 +1,19 @@
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+
+from .usecase.identity_map import identity_scope
+
+
+class IdentityMapMiddleware:
+    """
+    リクエストごとにIdentityMapを有効にすることを責務に持つ
+    1つのリクエストの中で同じユーザを参照しても、DBへ問い合わせるのは最初の1回のみとなる
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with identity_scope():
+            return self.get_response(request)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+def count_existing_users(apps, schema_editor):
+    """ 登録済みのユーザ数を、1つ目の行へまとめて数える """
+    User = apps.get_model('signup', 'User')
+    UserCounter = apps.get_model('signup', 'UserCounter')
+    UserCounter.objects.create(shard=0, count=User.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signup', '0002_username_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('shard', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing_users, migrations.RunPython.noop),
+    ]
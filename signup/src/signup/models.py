@@ -3,7 +3,22 @@ from django.db import models
 
 class User(models.Model):
     """ ユーザ情報を表現することを責務に持つ """
-    username = models.CharField(max_length=255)
+    username = models.CharField(max_length=255, unique=True)
 
     def __eq__(self, other: 'User'):
+        if not isinstance(other, User):
+            return NotImplemented
         return self.username == other.username
+
+    def __hash__(self):
+        # __eq__を上書きすると__hash__がNoneとなり、辞書のキー・集合の要素にできないので、等価性と同じくユーザ名から求める
+        return hash(self.username)
+
+
+class UserCounter(models.Model):
+    """
+    ユーザ数を、複数の行へ分けて数えることを責務に持つ
+    登録・削除のたびに1つの行のみを更新するので、同時に登録しても同じ行のロックを待ち合わせにくい
+    """
+    shard = models.PositiveSmallIntegerField(primary_key=True)
+    count = models.BigIntegerField(default=0)
@@ -0,0 +1,167 @@
+import bisect
+import heapq
+import itertools
+import threading
+from array import array
+from typing import Iterable, Iterator
+
+OFFSET_32BIT_LIMIT = 2 ** 32 - 1
+
+
+class SortedStringArray:
+    """
+    整列した文字列を、1つのバイト列と各文字列の開始位置の配列へ詰めて保持することを責務に持つ
+    文字列ごとのオブジェクトを持たないので、文字列のリストより少ないメモリで二分探索できる
+    UTF-8のバイト列の順は文字列の順と一致するので、バイト列のまま比較する
+    """
+
+    def __init__(self, strings: Iterable[str], presorted: bool = False):
+        """
+        :param strings: 保持する文字列 重複は取り除く
+        :param presorted: 文字列が昇順かつ重複しないか Trueであれば整列せずに1件ずつ詰める
+        """
+        if not presorted:
+            strings = sorted(set(strings))
+        data = bytearray()
+        # 合計が4GiBを超えるまでは開始位置を4バイトで持つ
+        offsets = array('I', [0])
+        for string in strings:
+            data += string.encode('utf-8')
+            if offsets.typecode == 'I' and len(data) > OFFSET_32BIT_LIMIT:
+                offsets = array('Q', offsets)
+            offsets.append(len(data))
+        self._data = bytes(data)
+        self._offsets = offsets
+
+    @property
+    def nbytes(self) -> int:
+        """ バイト列・開始位置の配列のメモリ使用量 """
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _item(self, index: int) -> bytes:
+        return self._data[self._offsets[index]:self._offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> str:
+        return self._item(index).decode('utf-8')
+
+    def lower_bound(self, key: bytes) -> int:
+        """
+        key以上となる最初の位置
+
+        :param key: 探す値
+        :return: 位置 すべてがkeyより小さければ要素数
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._item(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def iter_prefix(self, prefix: str) -> Iterator[str]:
+        """
+        前方一致する文字列を昇順に返却
+
+        :param prefix: 前方一致させる文字列
+        :return: 前方一致する文字列
+        """
+        key = prefix.encode('utf-8')
+        for index in range(self.lower_bound(key), len(self)):
+            item = self._item(index)
+            if not item.startswith(key):
+                return
+            yield item.decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class PrefixIndex:
+    """
+    文字列を前方一致で検索するための索引を責務に持つ
+    詰めて保持した整列済みの配列へ、追加分を小さな整列済みのリストとして重ね、一定量たまるとまとめて詰め直す
+    """
+
+    # 詰め直すまでに追加できる件数の下限 配列が大きければ、その1/64まで追加分を保持する
+    MIN_PENDING = 4096
+
+    def __init__(self, strings: Iterable[str] = (), presorted: bool = False):
+        """
+        :param strings: 保持する文字列
+        :param presorted: 文字列が昇順かつ重複しないか
+        """
+        self._lock = threading.Lock()
+        self._base = SortedStringArray(strings, presorted)
+        self._pending: list[str] = []
+        self._removed: set[str] = set()
+        self.compactions = 0
+
+    @property
+    def nbytes(self) -> int:
+        """ 詰めて保持した配列のメモリ使用量 追加分・削除分は含まない """
+        return self._base.nbytes
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._pending) - len(self._removed)
+
+    def add(self, string: str):
+        """
+        文字列を追加
+
+        :param string: 追加する文字列
+        """
+        with self._lock:
+            if string in self._removed:
+                self._removed.discard(string)
+                return
+            index = bisect.bisect_left(self._pending, string)
+            if index < len(self._pending) and self._pending[index] == string:
+                return
+            if next(self._base.iter_prefix(string), None) == string:
+                return
+            self._pending.insert(index, string)
+            if len(self._pending) > max(self.MIN_PENDING, len(self._base) // 64):
+                self._compact()
+
+    def discard(self, string: str):
+        """
+        文字列を取り除く 詰め直すまでは、検索結果から除くための集合として保持する
+
+        :param string: 取り除く文字列
+        """
+        with self._lock:
+            index = bisect.bisect_left(self._pending, string)
+            if index < len(self._pending) and self._pending[index] == string:
+                del self._pending[index]
+            elif next(self._base.iter_prefix(string), None) == string:
+                self._removed.add(string)
+
+    def _compact(self):
+        """ 追加分・削除分を反映した配列へ詰め直す """
+        removed = self._removed
+        self._base = SortedStringArray(
+            (string for string in heapq.merge(self._base, self._pending) if string not in removed), presorted=True
+        )
+        self._pending = []
+        self._removed = set()
+        self.compactions += 1
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        """
+        前方一致する文字列を、昇順に指定の件数まで返却
+
+        :param prefix: 前方一致させる文字列
+        :param limit: 返却する最大の件数
+        :return: 前方一致する文字列
+        """
+        base, pending, removed = self._base, self._pending, self._removed
+        start = bisect.bisect_left(pending, prefix)
+        pending_matches = itertools.takewhile(lambda string: string.startswith(prefix), pending[start:start + limit])
+        matches = heapq.merge(base.iter_prefix(prefix), pending_matches)
+        return list(itertools.islice((string for string in matches if string not in removed), limit))
@@ -0,0 +1,255 @@
+import fcntl
+import functools
+import hashlib
+import ipaddress
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, NamedTuple, Optional, Union
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+
+TypeView = Callable[..., HttpResponse]
+TypeKey = Callable[[HttpRequest], Optional[str]]
+
+# 1つのバケツ 残りのトークン数・最後に補充した時刻(time.monotonic)を持つ
+# 共有メモリは0で初期化されるので、時刻が0のバケツは満杯として扱う
+BUCKET = struct.Struct('dd')
+
+
+class RateLimitResult(NamedTuple):
+    """ 流量制限の判定結果 制限したときは、次のトークンが補充されるまでの秒数を持つ """
+    allowed: bool
+    retry_after: float
+
+
+class SharedTokenBuckets:
+    """
+    キーごとのトークンバケツを、同じホストのすべてのプロセスから共有するメモリへ保持することを責務に持つ
+
+    キーのハッシュ値でバケツを選ぶ バケツの数を超えるキーは同じバケツを共有するので、制限が厳しくなる側へ倒れる
+    バケツはロックを分けた複数の区画(ストライプ)に属し、区画ごとにスレッド間のロックと、
+    ロック用ファイルのバイト範囲ロックでプロセス間の排他をとる
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, slots: int = 65536, stripes: int = 64):
+        """
+        :param name: 共有メモリ・ロック用ファイルの名前 同じ名前のインスタンスが同じバケツを共有する
+        :param rate: 1秒あたりに補充するトークン数
+        :param burst: バケツへためられる最大のトークン数
+        :param slots: バケツの数
+        :param stripes: ロックを分ける区画の数
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate and burst must be positive')
+        if slots < 1 or not 1 <= stripes <= slots:
+            raise ValueError('slots must be positive and stripes must be 1 to slots')
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.slots = slots
+        self.stripes = stripes
+        self.lock_path = os.path.join(tempfile.gettempdir(), f'{name}.lock')
+        self._attach_lock = threading.Lock()
+        self._memory: Optional[shared_memory.SharedMemory] = None
+        self._lock_fd: Optional[int] = None
+        self._thread_locks: list[threading.Lock] = []
+        self._pid: Optional[int] = None
+
+    def _attach(self):
+        """ 共有メモリ・ロック用ファイルを開く 最初のプロセスが作成し、他のプロセスはそれを開く """
+        with self._attach_lock:
+            if self._pid == os.getpid():
+                return
+            size = BUCKET.size * self.slots
+            try:
+                memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+            except FileExistsError:
+                memory = shared_memory.SharedMemory(self.name)
+            # 開いたプロセスが終了したときに共有メモリを破棄しないよう、resource_trackerの管理から外す
+            resource_tracker.unregister(memory._name, 'shared_memory')  # type: ignore[attr-defined]
+            if memory.size < size:
+                memory.close()
+                raise ValueError(f'shared memory {self.name!r} is smaller than {self.slots} buckets')
+
+            self._memory = memory
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            # fork前に獲得されていたロックを引き継がないよう、プロセスごとに作る
+            self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+            self._pid = os.getpid()
+
+    @staticmethod
+    def slot_of(key: str, slots: int) -> int:
+        """
+        キーのバケツの位置 プロセスによらず同じ値となるよう、組み込みのhash()は使わない
+
+        :param key: クライアントIP・ユーザ名など
+        :param slots: バケツの数
+        :return: バケツの位置
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % slots
+
+    def consume(self, key: str, tokens: float = 1.0) -> RateLimitResult:
+        """
+        キーのバケツからトークンを取り出す 足りなければ取り出さずに制限する
+
+        :param key: クライアントIP・ユーザ名など
+        :param tokens: 取り出すトークン数
+        :return: 判定結果
+        """
+        if self._pid != os.getpid():
+            self._attach()
+        slot = self.slot_of(key, self.slots)
+        stripe = slot % self.stripes
+        offset = slot * BUCKET.size
+        buffer = self._memory.buf
+
+        with self._thread_locks[stripe]:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                now = time.monotonic()
+                available, updated = BUCKET.unpack_from(buffer, offset)
+                available = self.burst if updated == 0 else min(self.burst, available + (now - updated) * self.rate)
+                allowed = available >= tokens
+                if allowed:
+                    available -= tokens
+                BUCKET.pack_into(buffer, offset, available, now)
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, stripe)
+
+        return RateLimitResult(allowed, 0.0 if allowed else (tokens - available) / self.rate)
+
+    def reset(self):
+        """ すべてのバケツを満杯へ戻す """
+        if self._pid != os.getpid():
+            self._attach()
+        self._memory.buf[:BUCKET.size * self.slots] = bytes(BUCKET.size * self.slots)
+
+    def unlink(self):
+        """ 共有メモリを破棄 すべてのプロセスで使い終えた後に呼び出す """
+        if self._pid != os.getpid():
+            self._attach()
+        with self._attach_lock:
+            self._memory.close()
+            # unlink()が管理から外すので、開いたときに外した登録を戻しておく
+            resource_tracker.register(self._memory._name, 'shared_memory')  # type: ignore[attr-defined]
+            self._memory.unlink()
+            os.close(self._lock_fd)
+            try:
+                os.unlink(self.lock_path)
+            except FileNotFoundError:
+                pass
+            self._pid = None
+
+
+@functools.lru_cache(maxsize=8)
+def _trusted_networks(proxies: tuple[str, ...]) -> tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    """
+    信頼するリバースプロキシのアドレスを解釈
+
+    :param proxies: IPアドレス、またはCIDR表記のネットワーク
+    :return: ネットワーク
+    """
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted(address: str, networks: tuple) -> bool:
+    """
+    アドレスが信頼するリバースプロキシのものか判定
+
+    :param address: IPアドレス
+    :param networks: 信頼するリバースプロキシのネットワーク
+    :return: 信頼するリバースプロキシであればTrue IPアドレスとして解釈できなければFalse
+    """
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(request: HttpRequest) -> Optional[str]:
+    """
+    リクエストの送信元IP
+    REMOTE_ADDRが信頼するリバースプロキシであれば、X-Forwarded-Forを末尾からたどり、
+    信頼するリバースプロキシ以外で最初に現れるアドレスとする
+    先頭側はクライアントが自由に書けるので、信頼するリバースプロキシが付け足した部分のみを使う
+
+    :param request: HTTPリクエスト
+    :return: 送信元IP
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    networks = _trusted_networks(tuple(settings.SIGNUP_RATE_LIMIT_TRUSTED_PROXIES))
+    if not remote_addr or not _is_trusted(remote_addr, networks):
+        return remote_addr
+
+    forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    forwarded = [address for address in forwarded if address]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, networks):
+            return address
+    # すべて信頼するリバースプロキシであれば、最も手前のものを送信元とする
+    return forwarded[0] if forwarded else remote_addr
+
+
+def username_key(request: HttpRequest) -> Optional[str]:
+    """
+    登録しようとしたユーザ名 キーはハッシュ値へ変換してからバケツを選ぶので、ユーザ名は共有メモリへ残らない
+
+    :param request: ユーザ名をusernameとして含むHTTPリクエスト
+    :return: ユーザ名
+    """
+    return request.POST.get('username')
+
+
+KEY_FUNCTIONS: dict[str, TypeKey] = {
+    'ip': client_ip,
+    'username': username_key,
+}
+
+
+def rate_limited(buckets: SharedTokenBuckets, key: TypeKey, enabled: bool = True) -> Callable[[TypeView], TypeView]:
+    """
+    ビューへ流量制限をかけるデコレータ 制限したときはトップ画面を429で返却する
+
+    :param buckets: トークンバケツ
+    :param key: リクエストからバケツのキーを組み立てる関数 Noneを返却したリクエストは制限しない
+    :param enabled: Falseであれば制限しない
+    :return: デコレータ
+    """
+    def decorator(view: TypeView) -> TypeView:
+        if not enabled:
+            return view
+
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            value = key(request)
+            if value is not None:
+                result = buckets.consume(f'{view.__name__}:{value}')
+                if not result.allowed:
+                    response = render(request, 'index.html',
+                                      context={'error': 'リクエストが多すぎます。しばらく待ってから再度お試しください'},
+                                      status=429)
+                    response['Retry-After'] = str(math.ceil(result.retry_after))
+                    return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+SAVE_RATE_LIMIT = SharedTokenBuckets(
+    settings.SIGNUP_RATE_LIMIT_NAME,
+    settings.SIGNUP_RATE_LIMIT_RATE,
+    settings.SIGNUP_RATE_LIMIT_BURST,
+    settings.SIGNUP_RATE_LIMIT_SLOTS,
+    settings.SIGNUP_RATE_LIMIT_STRIPES,
+)
@@ -0,0 +1,194 @@
+import time
+import uuid
+from typing import Callable, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+
+from .models import User
+
+TypeRender = Callable[[], str]
+
+RESULT_TEMPLATE_NAME = 'result.html'
+KEY_PREFIX = 'signup:result'
+# 他のリクエストが描画し終えるのを待つとき、キャッシュを確認する間隔(秒)
+POLL_INTERVAL = 0.01
+
+
+class ResultCacheStats(NamedTuple):
+    """ ユーザ登録結果画面のキャッシュの利用状況 """
+    hits: int
+    misses: int
+    renders: int
+    waits: int
+    invalidations: int
+
+
+class ResultPageCache:
+    """
+    ユーザごとのユーザ登録結果画面を、描画済みのHTMLとしてCACHESへ保持することを責務に持つ
+
+    キーへはユーザごとの世代を含める ユーザ情報が変わると世代を新しくするので、
+    変わる前の情報で描画中だった画面が後から書き込まれても、古い世代のキーとなり参照されない
+    """
+
+    def __init__(self, alias: str, timeout: int, lock_timeout: int, poll_interval: float = POLL_INTERVAL):
+        """
+        :param alias: CACHESの別名
+        :param timeout: 画面をキャッシュする秒数
+        :param lock_timeout: 描画中に保持するロックの秒数 超えると、待っていたリクエストも描画する
+        :param poll_interval: 描画し終えるのを待つとき、キャッシュを確認する間隔(秒)
+        """
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.hits = self.misses = self.renders = self.waits = self.invalidations = 0
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias]
+
+    def _generation_key(self, user_id: int) -> str:
+        """
+        ユーザの世代を保持するキー
+
+        :param user_id: ユーザID
+        :return: キャッシュのキー
+        """
+        return f'{KEY_PREFIX}:{user_id}:generation'
+
+    def _page_key(self, user_id: int, generation: str) -> str:
+        """
+        ユーザの世代の画面を指すキー
+
+        :param user_id: ユーザID
+        :param generation: 世代
+        :return: キャッシュのキー
+        """
+        return f'{KEY_PREFIX}:{user_id}:{generation}'
+
+    def _new_generation(self, user_id: int) -> Optional[str]:
+        """
+        世代が無ければ作成 描画に成功した画面を書き込む直前にのみ呼び出し、存在しないユーザの世代を作らないようにする
+        世代が破棄されていたときも、以前の世代と重ならないよう乱数とする
+
+        :param user_id: ユーザID
+        :return: 作成した世代 他のリクエストが先に作成・更新していればNone
+        """
+        generation = uuid.uuid4().hex
+        # 世代より長く残る画面は無いので、画面と同じ秒数で破棄してよい
+        if self.cache.add(self._generation_key(user_id), generation, self.timeout):
+            return generation
+        return None
+
+    def _lookup(self, user_id: int) -> tuple[Optional[str], Optional[str]]:
+        """
+        ユーザの現在の世代と、その世代の画面を取得
+
+        :param user_id: ユーザID
+        :return: 世代・画面のHTML 無ければそれぞれNone
+        """
+        generation = self.cache.get(self._generation_key(user_id))
+        if generation is None:
+            return None, None
+        return generation, self.cache.get(self._page_key(user_id, generation))
+
+    def get(self, user_id: int, render: TypeRender) -> str:
+        """
+        キャッシュした画面を返却 無ければ描画してキャッシュする
+        同じ画面を同時に要求されたときは1つのリクエストのみが描画し、他のリクエストは描画し終えるのを待つ
+
+        :param user_id: ユーザID
+        :param render: 画面を描画する関数
+        :return: 画面のHTML
+        """
+        cache = self.cache
+        generation, html = self._lookup(user_id)
+        if html is not None:
+            self.hits += 1
+            return html
+
+        self.misses += 1
+        lock_key = f'{KEY_PREFIX}:{user_id}:lock'
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(lock_key, True, self.lock_timeout):
+            time.sleep(self.poll_interval)
+            generation, html = self._lookup(user_id)
+            if html is not None:
+                self.waits += 1
+                return html
+            if time.monotonic() >= deadline:
+                # 描画していたリクエストが異常終了したとみなし、自ら描画する
+                break
+
+        try:
+            html = render()
+            # 描画を始める前の世代へ書き込む 描画中に破棄されていれば、古い世代となり参照されない
+            if generation is None:
+                generation = self._new_generation(user_id)
+            if generation is not None:
+                cache.set(self._page_key(user_id, generation), html, self.timeout)
+            self.renders += 1
+        finally:
+            cache.delete(lock_key)
+        return html
+
+    def warm(self, user_id: int, html: str):
+        """
+        描画した画面をキャッシュへ書き込む
+
+        :param user_id: ユーザID
+        :param html: 画面のHTML
+        """
+        generation = self.cache.get(self._generation_key(user_id)) or self._new_generation(user_id)
+        if generation is not None:
+            self.cache.set(self._page_key(user_id, generation), html, self.timeout)
+
+    def invalidate(self, user_id: int):
+        """
+        キャッシュした画面を破棄 世代を新しくするので、描画中の古い画面も参照されなくなる
+
+        :param user_id: ユーザID
+        """
+        self.cache.set(self._generation_key(user_id), uuid.uuid4().hex, self.timeout)
+        self.invalidations += 1
+
+    def stats(self) -> ResultCacheStats:
+        return ResultCacheStats(self.hits, self.misses, self.renders, self.waits, self.invalidations)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.renders = self.waits = self.invalidations = 0
+
+
+def render_result_page(context: dict) -> str:
+    """
+    ユーザ登録結果画面を描画 リクエストに依らない画面なので、リクエストの外でも同じHTMLとなる
+
+    :param context: ユーザ情報を含むコンテキスト
+    :return: 画面のHTML
+    """
+    return render_to_string(RESULT_TEMPLATE_NAME, context)
+
+
+RESULT_PAGE_CACHE = ResultPageCache(
+    settings.SIGNUP_RESULT_CACHE_ALIAS,
+    settings.SIGNUP_RESULT_CACHE_TIMEOUT,
+    settings.SIGNUP_RESULT_CACHE_LOCK_SECONDS,
+)
+
+
+@receiver(post_save, sender=User, dispatch_uid='signup.result_cache.invalidate_on_save')
+@receiver(post_delete, sender=User, dispatch_uid='signup.result_cache.invalidate_on_delete')
+def invalidate_result_page(sender, instance: User, **kwargs):
+    """
+    ユーザ情報の更新・削除に合わせて、キャッシュした画面を破棄
+    QuerySet.update()・bulk_create()はシグナルを送らないので、呼び出し元でinvalidate()を呼ぶ
+
+    :param sender: Userクラス
+    :param instance: 更新・削除されたユーザ
+    """
+    RESULT_PAGE_CACHE.invalidate(instance.pk)
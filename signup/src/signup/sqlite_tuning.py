@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def sqlite_pragmas(db: BaseDatabaseWrapper) -> dict[str, str]:
+    """
+    接続しているSQLiteのプラグマの現在の値
+
+    :param db: DBへの接続
+    :return: SIGNUP_SQLITE_PRAGMASに含まれるプラグマの名前・値
+    """
+    values = {}
+    with db.cursor() as cursor:
+        for name in settings.SIGNUP_SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = str(cursor.fetchone()[0])
+    return values
+
+
+@receiver(connection_created, dispatch_uid='signup.sqlite_tuning.configure_sqlite')
+def configure_sqlite(sender, connection: BaseDatabaseWrapper, **kwargs):
+    """
+    SQLiteへ接続するたびに、SIGNUP_SQLITE_PRAGMASのプラグマを設定
+    WALでは読み込みが書き込みを待たず、synchronous=NORMALではコミットごとにファイルを同期しないので、
+    複数のワーカから同時に登録しても1件あたりにロックを保持する時間が短くなる
+
+    :param sender: 接続したバックエンドのDatabaseWrapperクラス
+    :param connection: DBへの接続
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SIGNUP_SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
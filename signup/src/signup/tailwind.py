@@ -0,0 +1,263 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+
+# fortune_telling・signupで同じ内容を持つモジュール 各プロジェクトは単独で動かせるよう互いを参照しないので、
+# ユーティリティを追加するときは両方へ反映する クラスが足りないプロジェクトはbuild_tailwind_css --checkで検知できる
+
+# テンプレートのclass属性 テンプレートタグ・変数は取り除いてから分割する
+CLASS_ATTRIBUTE_RE = re.compile(r'class="([^"]*)"')
+TEMPLATE_SYNTAX_RE = re.compile(r'{%.*?%}|{{.*?}}')
+
+# 書き出すスタイルシート・それを参照するテンプレートの名前
+STYLESHEET_PREFIX = 'tailwind.'
+INCLUDE_TEMPLATE_NAME = 'tailwind.html'
+
+# Tailwind CSS v3のPreflightのうち、テンプレートで使う要素へ効くもの
+PREFLIGHT = '''*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}
+html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,-apple-system,\
+BlinkMacSystemFont,"Segoe UI",Roboto,"Helvetica Neue",Arial,"Noto Sans",sans-serif}
+body{margin:0;line-height:inherit}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;\
+color:inherit;margin:0;padding:0}
+button,[type='button'],[type='reset'],[type='submit']{-webkit-appearance:button;background-color:transparent;\
+background-image:none}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role="button"]{cursor:pointer}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+'''
+
+# 使用しているパレットのみを持つ 増やすときはTailwind CSS v3の既定値から追加する
+COLORS = {
+    'transparent': 'transparent',
+    'white': '#fff',
+    'black': '#000',
+    'slate-50': '#f8fafc', 'slate-100': '#f1f5f9', 'slate-200': '#e2e8f0', 'slate-300': '#cbd5e1',
+    'slate-400': '#94a3b8', 'slate-500': '#64748b', 'slate-600': '#475569', 'slate-700': '#334155',
+    'slate-800': '#1e293b', 'slate-900': '#0f172a',
+    'sky-50': '#f0f9ff', 'sky-100': '#e0f2fe', 'sky-200': '#bae6fd', 'sky-300': '#7dd3fc',
+    'sky-400': '#38bdf8', 'sky-500': '#0ea5e9', 'sky-600': '#0284c7', 'sky-700': '#0369a1',
+    'sky-800': '#075985', 'sky-900': '#0c4a6e',
+}
+FONT_SIZES = {
+    'xs': ('.75rem', '1rem'), 'sm': ('.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'), '7xl': ('4.5rem', '1'), '8xl': ('6rem', '1'), '9xl': ('8rem', '1'),
+}
+LETTER_SPACINGS = {
+    'tighter': '-.05em', 'tight': '-.025em', 'normal': '0em', 'wide': '.025em', 'wider': '.05em', 'widest': '.1em',
+}
+BORDER_RADII = {
+    'none': '0px', 'sm': '.125rem', '': '.25rem', 'md': '.375rem', 'lg': '.5rem', 'xl': '.75rem',
+    '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px',
+}
+SPACING_PROPERTIES = {
+    'p': ('padding',), 'px': ('padding-left', 'padding-right'), 'py': ('padding-top', 'padding-bottom'),
+    'pt': ('padding-top',), 'pr': ('padding-right',), 'pb': ('padding-bottom',), 'pl': ('padding-left',),
+    'm': ('margin',), 'mx': ('margin-left', 'margin-right'), 'my': ('margin-top', 'margin-bottom'),
+    'mt': ('margin-top',), 'mr': ('margin-right',), 'mb': ('margin-bottom',), 'ml': ('margin-left',),
+}
+# 状態を表す接頭辞と、対応する疑似クラス
+VARIANTS = {'hover': ':hover', 'focus': ':focus', 'active': ':active'}
+
+
+class UnknownUtilityError(ValueError):
+    """ スタイルを生成できないユーティリティクラスを使っていることを表現 """
+
+    def __init__(self, classes: Iterable[str]):
+        self.classes = sorted(classes)
+        super().__init__(f'unknown utility classes: {", ".join(self.classes)}')
+
+
+def _spacing(value: str) -> Optional[str]:
+    """
+    余白・大きさの数値をCSSの長さへ変換 1単位は0.25rem
+
+    :param value: 数値・px・auto
+    :return: CSSの長さ 変換できなければNone
+    """
+    if value == 'auto':
+        return 'auto'
+    if value == 'px':
+        return '1px'
+    if not re.fullmatch(r'\d+(\.5)?', value):
+        return None
+    if float(value) == 0:
+        return '0px'
+    return f'{float(value) / 4:g}rem'
+
+
+def _size(value: str, screen: str) -> Optional[str]:
+    """
+    幅・高さをCSSの長さへ変換
+
+    :param value: 数値・分数・full・screenなど
+    :param screen: screenに対応する長さ
+    :return: CSSの長さ 変換できなければNone
+    """
+    keywords = {'full': '100%', 'screen': screen, 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+    if value in keywords:
+        return keywords[value]
+    fraction = re.fullmatch(r'(\d+)/(\d+)', value)
+    if fraction:
+        numerator, denominator = map(int, fraction.groups())
+        return f'{numerator / denominator * 100:.6f}'.rstrip('0').rstrip('.') + '%'
+    return _spacing(value)
+
+
+def _declare(properties: Iterable[str], value: Optional[str]) -> Optional[str]:
+    """
+    複数のプロパティへ同じ値を指定する宣言を組み立てる
+
+    :param properties: プロパティ名
+    :param value: 値 Noneであれば宣言しない
+    :return: 宣言
+    """
+    if value is None:
+        return None
+    return ';'.join(f'{name}:{value}' for name in properties)
+
+
+def _font_size(match: re.Match) -> Optional[str]:
+    """
+    文字の大きさ・行の高さの宣言を組み立てる
+
+    :param match: text-{大きさ}へのマッチ
+    :return: 宣言
+    """
+    size = FONT_SIZES.get(match.group(1))
+    return f'font-size:{size[0]};line-height:{size[1]}' if size else None
+
+
+# (クラス名のパターン, 宣言を組み立てる関数) 出力順はこの並びとし、後に並ぶものほど優先される
+UTILITIES: list[tuple[re.Pattern, Callable[[re.Match], Optional[str]]]] = [
+    (re.compile(r'(block|inline-block|inline|flex|inline-flex|grid|hidden)'),
+     lambda match: 'display:' + {'hidden': 'none'}.get(match.group(1), match.group(1))),
+    (re.compile(r'overflow-(auto|hidden|visible|scroll)'), lambda match: f'overflow:{match.group(1)}'),
+    (re.compile(r'place-content-(center|start|end|between|around|evenly|stretch)'),
+     lambda match: f'place-content:{match.group(1).replace("between", "space-between")}'),
+    (re.compile(r'justify-(start|end|center|between|around|evenly)'),
+     lambda match: 'justify-content:' + {'start': 'flex-start', 'end': 'flex-end'}.get(
+         match.group(1), match.group(1).replace('between', 'space-between').replace('around', 'space-around')
+         .replace('evenly', 'space-evenly'))),
+    (re.compile(r'cursor-(pointer|default|auto|not-allowed)'), lambda match: f'cursor:{match.group(1)}'),
+    (re.compile(r'(m|mx|my|mt|mr|mb|ml)-(.+)'),
+     lambda match: _declare(SPACING_PROPERTIES[match.group(1)], _spacing(match.group(2)))),
+    (re.compile(r'w-(.+)'), lambda match: _declare(('width',), _size(match.group(1), '100vw'))),
+    (re.compile(r'h-(.+)'), lambda match: _declare(('height',), _size(match.group(1), '100vh'))),
+    (re.compile(r'rounded(?:-(.+))?'),
+     lambda match: _declare(('border-radius',), BORDER_RADII.get(match.group(1) or ''))),
+    (re.compile(r'bg-(.+)'), lambda match: _declare(('background-color',), COLORS.get(match.group(1)))),
+    (re.compile(r'(p|px|py|pt|pr|pb|pl)-(.+)'),
+     lambda match: _declare(SPACING_PROPERTIES[match.group(1)], _spacing(match.group(2)))),
+    (re.compile(r'text-(left|center|right|justify)'), lambda match: f'text-align:{match.group(1)}'),
+    (re.compile(r'text-(xs|sm|base|lg|\dxl|xl)'), _font_size),
+    (re.compile(r'tracking-(.+)'), lambda match: _declare(('letter-spacing',), LETTER_SPACINGS.get(match.group(1)))),
+    (re.compile(r'text-(.+)'), lambda match: _declare(('color',), COLORS.get(match.group(1)))),
+]
+
+
+def scan_classes(template_dirs: Optional[Iterable[Path]] = None) -> set[str]:
+    """
+    テンプレートのclass属性で使われているクラスを集める
+
+    :param template_dirs: テンプレートを配置したディレクトリ 省略時は設定ファイルのDIRS
+    :return: クラス名
+    """
+    if template_dirs is None:
+        template_dirs = [Path(directory) for engine in settings.TEMPLATES for directory in engine['DIRS']]
+
+    classes = set()
+    for directory in template_dirs:
+        for path in sorted(Path(directory).rglob('*.html')):
+            for value in CLASS_ATTRIBUTE_RE.findall(path.read_text(encoding='utf-8')):
+                classes.update(TEMPLATE_SYNTAX_RE.sub(' ', value).split())
+    return classes
+
+
+def escape_class_name(class_name: str) -> str:
+    """
+    クラス名をCSSのセレクタで使えるようエスケープ
+
+    :param class_name: クラス名
+    :return: エスケープしたクラス名
+    """
+    return re.sub(r'([^a-zA-Z0-9_-])', r'\\\1', class_name)
+
+
+def build_stylesheet(classes: Iterable[str]) -> str:
+    """
+    使われているクラスのみのスタイルシートを組み立てる
+
+    :param classes: クラス名
+    :return: Preflightと各クラスのルールから成るスタイルシート
+    :raises UnknownUtilityError: スタイルを生成できないクラスがあるとき
+    """
+    rules = []
+    unknown = []
+    for class_name in set(classes):
+        *variants, utility = class_name.split(':')
+        if any(variant not in VARIANTS for variant in variants):
+            unknown.append(class_name)
+            continue
+
+        for order, (pattern, build) in enumerate(UTILITIES):
+            match = pattern.fullmatch(utility)
+            declarations = build(match) if match else None
+            if declarations is not None:
+                break
+        else:
+            unknown.append(class_name)
+            continue
+
+        selector = '.' + escape_class_name(class_name) + ''.join(VARIANTS[variant] for variant in variants)
+        # 状態を伴うルールは、伴わないルールより後に並べて優先させる
+        rules.append(((len(variants), order, class_name), f'{selector}{{{declarations}}}'))
+
+    if unknown:
+        raise UnknownUtilityError(unknown)
+    return PREFLIGHT + ''.join(rule + '\n' for _, rule in sorted(rules))
+
+
+def stylesheet_name(stylesheet: str) -> str:
+    """
+    内容のハッシュ値を含むスタイルシートの名前
+
+    :param stylesheet: スタイルシート
+    :return: 静的ファイルのディレクトリからの相対パス
+    """
+    return f'css/{STYLESHEET_PREFIX}{hashlib.sha256(stylesheet.encode("utf-8")).hexdigest()[:12]}.css'
+
+
+def write_stylesheet(stylesheet: str, static_dir: Path, template_dir: Path) -> str:
+    """
+    内容のハッシュ値を名前に含めてスタイルシートを書き出し、それを参照するテンプレートを書き出す
+
+    :param stylesheet: スタイルシート
+    :param static_dir: 静的ファイルのディレクトリ
+    :param template_dir: テンプレートのディレクトリ
+    :return: 静的ファイルのディレクトリからの相対パス
+    """
+    name = stylesheet_name(stylesheet)
+    destination = static_dir / name
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # 古いスタイルシートは参照されなくなるので削除
+    for stale in destination.parent.glob(f'{STYLESHEET_PREFIX}*.css'):
+        if stale != destination:
+            stale.unlink()
+    destination.write_text(stylesheet, encoding='utf-8')
+
+    (template_dir / INCLUDE_TEMPLATE_NAME).write_text(
+        '{# build_tailwind_cssコマンドが生成 直接編集しない #}\n'
+        '{% load static %}'
+        f'<link rel="stylesheet" href="{{% static \'{name}\' %}}">\n',
+        encoding='utf-8'
+    )
+    return name
@@ -1,6 +1,7 @@
 from django.urls import path
 
-from .views import index, save, result
+from .views import index, save, result, result_batch, user_list, user_list_api, user_count_api, user_export, \
+    autocomplete, availability, availability_stats, hook_stats, page_cache_stats, bulk_import
 
 app_name = 'ユーザ登録'
 
@@ -9,4 +10,19 @@ urlpatterns = [
     path('save', save, name='登録'),
 
     path('result/<int:user_id>', result, name='登録結果'),
+    path('api/results', result_batch, name='登録結果API'),
+
+    path('users', user_list, name='ユーザ一覧'),
+    path('api/users', user_list_api, name='ユーザ一覧API'),
+    path('api/users/count', user_count_api, name='ユーザ数API'),
+    path('api/users/export', user_export, name='ユーザ出力'),
+    path('autocomplete', autocomplete, name='ユーザ名補完'),
+
+    path('availability', availability, name='ユーザ名確認'),
+    path('availability/stats', availability_stats, name='ユーザ名確認統計'),
+
+    path('hooks/stats', hook_stats, name='登録後処理統計'),
+    path('pages/stats', page_cache_stats, name='ページキャッシュ統計'),
+
+    path('import', bulk_import, name='一括登録'),
 ]
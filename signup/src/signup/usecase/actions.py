@@ -1,5 +1,14 @@
-from typing import TypedDict
+from typing import Optional, TypedDict
+
+from django.db import transaction
+
+from ..hooks import dispatch_post_signup
 from ..models import User
+from ..result_cache import RESULT_PAGE_CACHE, render_result_page
+from .autocomplete import USERNAME_INDEX
+from .availability import USERNAME_FILTER
+from .counter import increment_user_count
+from .identity_map import load_user, load_users
 
 
 class SaveAction:
@@ -10,9 +19,21 @@ class SaveAction:
         ユーザ情報をDBへ登録
         :param username: 登録ユーザのユーザ名
         :return 登録されたユーザModel
+        :raises IntegrityError: ユーザ名が登録済みのとき
         """
         user = User(username=username)
-        user.save()
+        # 一意制約の違反で、呼び出し元のトランザクションまで使えなくならないようセーブポイントを置く
+        # ユーザ数も同じトランザクションで数える
+        with transaction.atomic():
+            user.save()
+            increment_user_count(1, user.id)
+        # 以降の存在確認・前方一致検索でDBへ問い合わせずに済むよう、プロセス内のフィルタ・索引へも反映
+        USERNAME_FILTER.add(username)
+        USERNAME_INDEX.add(username)
+        # リダイレクト先の結果画面をキャッシュから返却できるよう、確定後に描画しておく
+        transaction.on_commit(lambda: RESULT_PAGE_CACHE.warm(user.id, render_result_page({'user': user})))
+        # メール送信などの登録後の処理は、確定後にワーカへ渡し、リクエストを待たせない
+        dispatch_post_signup(user.id, username)
 
         return user
 
@@ -29,10 +50,24 @@ class ResultViewAction:
         """
         ユーザ情報をコンテキストとして組み立て
         :param user_id 表示対象ユーザID
-        :return ユーザ情報を含むコンテキスト
+        :return ユーザ情報を含むコンテキスト identity_scopeの中では、同じユーザを再び問い合わせない
         """
-        user = User.objects.get(id=user_id)
+        user = load_user(user_id)
 
         return {
             'user': user
         }
+
+
+class BatchResultViewAction:
+    """ 複数のユーザの情報を、まとめて問い合わせて組み立てることを責務に持つ """
+
+    def __call__(self, user_ids: list[int]) -> list[Optional[User]]:
+        """
+        ユーザ情報を、指定された順に組み立て
+        :param user_ids: 表示対象ユーザID 重複していてもよい
+        :return: ユーザIDと同じ順のユーザModel 存在しないユーザはNone
+        """
+        users = load_users(user_ids)
+
+        return [users.get(user_id) for user_id in user_ids]
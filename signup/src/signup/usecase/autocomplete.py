@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from ..models import User
+from ..prefix_index import PrefixIndex
+
+# 組み立てるときに一度に読み込む件数
+BUILD_CHUNK_SIZE = 10000
+
+
+class IndexStats(NamedTuple):
+    """ ユーザ名の前方一致索引の大きさ・利用状況 """
+    items: int
+    nbytes: int
+    searches: int
+    compactions: int
+    builds: int
+
+
+class UsernameIndex:
+    """
+    ユーザ名の前方一致検索を、DBへ問い合わせずプロセス内の索引で処理することを責務に持つ
+
+    他のプロセスが登録したユーザ名は、refresh_intervalごとに主キーが前回より大きいレコードを読み込んで反映する
+    他のプロセスが削除したユーザ名は、組み立て直すまで候補に残る
+    """
+
+    def __init__(self, refresh_interval: Optional[float]):
+        """
+        :param refresh_interval: 他のプロセスが登録したユーザ名を読み込む間隔(秒) Noneであれば読み込まない
+        """
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._index: Optional[PrefixIndex] = None
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self.searches = self.builds = 0
+
+    def build(self):
+        """ Userテーブルのユーザ名から索引を組み立てる """
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        """
+        ロックを獲得した状態で索引を組み立てる
+        SQLiteの既定の照合順序はUTF-8のバイト順なので、一意制約の索引の順に読めば整列し直さずに済む
+        """
+        last_id = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        usernames = User.objects.filter(id__lte=last_id).order_by('username') \
+            .values_list('username', flat=True).iterator(chunk_size=BUILD_CHUNK_SIZE)
+        self._index = PrefixIndex(usernames, presorted=connection.vendor == 'sqlite')
+        self._last_id = last_id
+        self._refreshed_at = time.monotonic()
+        self.builds += 1
+
+    def _ensure_current(self) -> PrefixIndex:
+        """
+        索引が組み立てられていなければ組み立て、読み込む間隔を過ぎていれば他のプロセスが登録したユーザ名を反映
+
+        :return: 検索に使う索引
+        """
+        if self._index is not None and not self._refresh_due():
+            return self._index
+
+        with self._lock:
+            if self._index is None:
+                self._build()
+            elif self._refresh_due():
+                for user_id, username in User.objects.filter(id__gt=self._last_id).order_by('id') \
+                        .values_list('id', 'username').iterator(chunk_size=BUILD_CHUNK_SIZE):
+                    self._index.add(username)
+                    self._last_id = user_id
+                self._refreshed_at = time.monotonic()
+            return self._index
+
+    def _refresh_due(self) -> bool:
+        return self.refresh_interval is not None and time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def add(self, username: str):
+        """
+        登録したユーザ名を索引へ反映 索引が組み立てられる前であれば、組み立てるときにDBから読み込まれる
+
+        :param username: 登録したユーザ名
+        """
+        index = self._index
+        if index is not None:
+            index.add(username)
+
+    def discard(self, username: str):
+        """
+        削除したユーザ名を索引から取り除く
+
+        :param username: 削除したユーザ名
+        """
+        index = self._index
+        if index is not None:
+            index.discard(username)
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        """
+        前方一致するユーザ名を、昇順に指定の件数まで返却
+
+        :param prefix: 入力中のユーザ名
+        :param limit: 返却する最大の件数
+        :return: ユーザ名
+        """
+        index = self._ensure_current()
+        self.searches += 1
+        return index.search(prefix, limit)
+
+    def stats(self) -> IndexStats:
+        index = self._index
+        return IndexStats(
+            items=len(index) if index is not None else 0,
+            nbytes=index.nbytes if index is not None else 0,
+            searches=self.searches,
+            compactions=index.compactions if index is not None else 0,
+            builds=self.builds,
+        )
+
+    def clear(self):
+        """ 索引・統計情報を破棄 次に検索するときに組み立て直す """
+        with self._lock:
+            self._index = None
+            self._last_id = 0
+            self.searches = self.builds = 0
+
+
+USERNAME_INDEX = UsernameIndex(settings.SIGNUP_AUTOCOMPLETE_REFRESH_SECONDS)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='signup.autocomplete.discard_on_delete')
+def discard_deleted_username(sender, instance: User, **kwargs):
+    """
+    削除したユーザを候補から取り除く
+
+    :param sender: Userクラス
+    :param instance: 削除されたユーザ
+    """
+    USERNAME_INDEX.discard(instance.username)
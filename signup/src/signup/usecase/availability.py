@@ -0,0 +1,170 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+from ..bloom import BloomFilter
+from ..models import User
+
+# 登録済みの件数に対して確保する容量の倍率 フィルタを組み立て直すまでに登録できる余裕とする
+CAPACITY_HEADROOM = 2
+# 組み立てるときに一度に読み込む件数
+BUILD_CHUNK_SIZE = 10000
+
+
+class FilterStats(NamedTuple):
+    """ ユーザ名のBloomフィルタの大きさ・判定結果の件数 """
+    capacity: int
+    false_positive_rate: float
+    bits: int
+    hash_count: int
+    nbytes: int
+    items: int
+    queries: int
+    negatives: int
+    database_checks: int
+    false_positives: int
+    builds: int
+
+
+class UsernameFilter:
+    """
+    ユーザ名が使えるかを、DBへ問い合わせる前にプロセス内のBloomフィルタで判定することを責務に持つ
+    フィルタに含まれないユーザ名は登録されていないので、DBへは問い合わせない
+
+    他のプロセスが登録したユーザ名は、refresh_intervalごとに主キーが前回より大きいレコードを読み込んで反映する
+    反映されるまでの間は使えると判定することがあるが、最終的にはusernameの一意制約が重複を防ぐ
+    """
+
+    def __init__(self, false_positive_rate: float, min_capacity: int, refresh_interval: Optional[float]):
+        """
+        :param false_positive_rate: フィルタの偽陽性率 フィルタの大きさはこの値から決める
+        :param min_capacity: フィルタへ確保する最小の容量
+        :param refresh_interval: 他のプロセスが登録したユーザ名を読み込む間隔(秒) Noneであれば読み込まない
+        """
+        self.false_positive_rate = false_positive_rate
+        self.min_capacity = min_capacity
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._filter: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self.queries = self.negatives = self.database_checks = self.false_positives = self.builds = 0
+
+    def build(self):
+        """ Userテーブルのユーザ名からフィルタを組み立てる """
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        """ ロックを獲得した状態でフィルタを組み立てる """
+        capacity = max(self.min_capacity, User.objects.count() * CAPACITY_HEADROOM)
+        bloom = BloomFilter(capacity, self.false_positive_rate)
+        last_id = 0
+        for user_id, username in User.objects.order_by('id').values_list('id', 'username').iterator(
+                chunk_size=BUILD_CHUNK_SIZE):
+            bloom.add(username)
+            last_id = user_id
+
+        self._filter = bloom
+        self._last_id = last_id
+        self._refreshed_at = time.monotonic()
+        self.builds += 1
+
+    def _ensure_current(self) -> BloomFilter:
+        """
+        フィルタが組み立てられていなければ組み立て、読み込む間隔を過ぎていれば他のプロセスが登録したユーザ名を反映
+
+        :return: 判定に使うフィルタ
+        """
+        if self._filter is not None and not self._refresh_due():
+            return self._filter
+
+        with self._lock:
+            if self._filter is None:
+                self._build()
+            elif self._refresh_due():
+                self._refresh()
+            return self._filter
+
+    def _refresh_due(self) -> bool:
+        return self.refresh_interval is not None and time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def _refresh(self):
+        """ 前回より主キーが大きいレコードのユーザ名を反映 容量を超えたときは大きなフィルタで組み立て直す """
+        for user_id, username in User.objects.filter(id__gt=self._last_id).order_by('id') \
+                .values_list('id', 'username').iterator(chunk_size=BUILD_CHUNK_SIZE):
+            self._filter.add(username)
+            self._last_id = user_id
+        self._refreshed_at = time.monotonic()
+
+        if len(self._filter) > self._filter.capacity:
+            self._build()
+
+    def add(self, username: str):
+        """
+        登録したユーザ名をフィルタへ反映 フィルタが組み立てられる前であれば、組み立てるときにDBから読み込まれる
+
+        :param username: 登録したユーザ名
+        """
+        bloom = self._filter
+        if bloom is None:
+            return
+        bloom.add(username)
+        if len(bloom) > bloom.capacity:
+            self.build()
+
+    def is_available(self, username: str) -> bool:
+        """
+        ユーザ名が使えるか判定 フィルタに含まれるときのみDBへ問い合わせる
+
+        :param username: ユーザ名
+        :return: 登録されていなければTrue
+        """
+        bloom = self._ensure_current()
+        self.queries += 1
+        if username not in bloom:
+            self.negatives += 1
+            return True
+
+        self.database_checks += 1
+        if User.objects.filter(username=username).exists():
+            return False
+        self.false_positives += 1
+        return True
+
+    def stats(self) -> FilterStats:
+        """
+        フィルタの大きさ・判定結果の件数
+
+        :return: 統計情報 フィルタが組み立てられる前は大きさを0とする
+        """
+        bloom = self._filter
+        return FilterStats(
+            capacity=bloom.capacity if bloom is not None else 0,
+            false_positive_rate=self.false_positive_rate,
+            bits=bloom.size if bloom is not None else 0,
+            hash_count=bloom.hash_count if bloom is not None else 0,
+            nbytes=bloom.nbytes if bloom is not None else 0,
+            items=len(bloom) if bloom is not None else 0,
+            queries=self.queries,
+            negatives=self.negatives,
+            database_checks=self.database_checks,
+            false_positives=self.false_positives,
+            builds=self.builds,
+        )
+
+    def clear(self):
+        """ フィルタ・統計情報を破棄 次に判定するときに組み立て直す """
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self.queries = self.negatives = self.database_checks = self.false_positives = self.builds = 0
+
+
+USERNAME_FILTER = UsernameFilter(
+    settings.SIGNUP_USERNAME_FILTER_FALSE_POSITIVE_RATE,
+    settings.SIGNUP_USERNAME_FILTER_MIN_CAPACITY,
+    settings.SIGNUP_USERNAME_FILTER_REFRESH_SECONDS,
+)
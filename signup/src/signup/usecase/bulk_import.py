@@ -0,0 +1,268 @@
+import csv
+import io
+import json
+import time
+from typing import IO, Iterable, Iterator, NamedTuple
+
+from django.db import transaction
+
+from ..models import User
+from .autocomplete import USERNAME_INDEX
+from .availability import USERNAME_FILTER
+from .counter import increment_user_count
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+# エラー行として報告する値の最大文字数
+ERROR_VALUE_MAX_LENGTH = 100
+# 登録済みのユーザ名を確認するとき、1回のIN句へ含める件数
+TAKEN_LOOKUP_CHUNK_SIZE = 500
+
+
+class ParsedRow(NamedTuple):
+    """ 読み込んだ1行 登録できない行はerrorへ理由を持つ """
+    line: int
+    value: str
+    error: str = ''
+
+
+class BatchResult(NamedTuple):
+    """ 1バッチ分の登録結果 """
+    batch: int
+    inserted: int
+    errors: list[ParsedRow]
+    total_inserted: int
+    total_errors: int
+    elapsed: float
+
+
+def progress_record(result: BatchResult) -> dict:
+    """
+    バッチごとの登録結果を、JSONとして出力できる形式へ変換
+
+    :param result: 1バッチ分の登録結果
+    :return: 登録結果を表す辞書
+    """
+    return {
+        'batch': result.batch,
+        'inserted': result.inserted,
+        'total_inserted': result.total_inserted,
+        'total_errors': result.total_errors,
+        'elapsed': round(result.elapsed, 3),
+        'errors': [{'line': row.line, 'value': row.value, 'error': row.error} for row in result.errors],
+    }
+
+
+def guess_format(filename: str) -> str:
+    """
+    ファイル名の拡張子から形式を推測
+
+    :param filename: ファイル名
+    :return: csv・ndjsonのいずれか 推測できなければcsv
+    """
+    return FORMAT_NDJSON if filename.lower().endswith(('.ndjson', '.jsonl')) else FORMAT_CSV
+
+
+def open_text(stream: IO[bytes]) -> IO[str]:
+    """
+    バイト列のストリームを、全体を読み込まずに1行ずつ読めるテキストのストリームとする
+
+    :param stream: アップロードされたファイルなど
+    :return: UTF-8として読むテキストのストリーム BOMは取り除く
+    """
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def _validate(line: int, value: str) -> ParsedRow:
+    """
+    ユーザ名として登録できるか検証
+
+    :param line: 行番号
+    :param value: ユーザ名
+    :return: 読み込んだ行
+    """
+    username = value.strip()
+    if not username:
+        return ParsedRow(line, value, 'empty username')
+    if len(username) > USERNAME_MAX_LENGTH:
+        return ParsedRow(line, username[:ERROR_VALUE_MAX_LENGTH], f'longer than {USERNAME_MAX_LENGTH} characters')
+    return ParsedRow(line, username)
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    """
+    CSVを1行ずつ読み込む 1行目にusername列を含む見出しがあれば、その列をユーザ名とする
+
+    :param lines: CSVの各行
+    :return: 読み込んだ行
+    """
+    reader = csv.reader(lines)
+    column = 0
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield ParsedRow(reader.line_num, '', f'invalid CSV: {e}')
+            continue
+
+        if reader.line_num == 1:
+            header = [cell.strip().lower() for cell in row]
+            if 'username' in header:
+                column = header.index('username')
+                continue
+        if not row:
+            continue
+        if len(row) <= column:
+            yield ParsedRow(reader.line_num, ','.join(row)[:ERROR_VALUE_MAX_LENGTH], 'missing username column')
+            continue
+        yield _validate(reader.line_num, row[column])
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    """
+    NDJSONを1行ずつ読み込む 各行は{"username": ...}形式のオブジェクトか、文字列とする
+
+    :param lines: NDJSONの各行
+    :return: 読み込んだ行
+    """
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            value = json.loads(text)
+        except ValueError as e:
+            yield ParsedRow(line, text.strip()[:ERROR_VALUE_MAX_LENGTH], f'invalid JSON: {e}')
+            continue
+
+        if isinstance(value, dict):
+            value = value.get('username')
+        if not isinstance(value, str):
+            yield ParsedRow(line, text.strip()[:ERROR_VALUE_MAX_LENGTH], 'username must be a string')
+            continue
+        yield _validate(line, value)
+
+
+def parse_rows(lines: Iterable[str], file_format: str) -> Iterator[ParsedRow]:
+    """
+    指定の形式で1行ずつ読み込む
+
+    :param lines: 各行
+    :param file_format: csv・ndjsonのいずれか
+    :return: 読み込んだ行
+    """
+    if file_format == FORMAT_NDJSON:
+        return parse_ndjson(lines)
+    if file_format == FORMAT_CSV:
+        return parse_csv(lines)
+    raise ValueError(f'unknown format: {file_format}')
+
+
+class BulkImportAction:
+    """
+    ユーザ情報をバッチ単位でまとめてDBへ登録することを責務に持つ
+    一定数のバッチごとにトランザクションを区切るので、途中で失敗してもそれまでのトランザクションは確定している
+    """
+
+    def __init__(self, batch_size: int = 1000, batches_per_transaction: int = 10):
+        """
+        :param batch_size: 1回のbulk_createで登録する件数
+        :param batches_per_transaction: 1トランザクションで登録するバッチ数
+        """
+        if batch_size < 1 or batches_per_transaction < 1:
+            raise ValueError('batch_size and batches_per_transaction must be positive')
+        self.batch_size = batch_size
+        self.batches_per_transaction = batches_per_transaction
+
+    def __call__(self, rows: Iterable[ParsedRow]) -> Iterator[BatchResult]:
+        """
+        読み込んだ行を登録し、バッチごとの結果を返却
+        メモリへ保持するのは1トランザクション分の行のみ
+
+        :param rows: 読み込んだ行
+        :return: バッチごとの登録結果 トランザクションの確定後に返却する
+        """
+        rows = iter(rows)
+        started = time.perf_counter()
+        batch_number = total_inserted = total_errors = 0
+
+        while True:
+            batches = []
+            for _ in range(self.batches_per_transaction):
+                valid, errors = self._take_batch(rows)
+                if not valid and not errors:
+                    break
+                batches.append((valid, errors))
+            if not batches:
+                return
+
+            inserted = []
+            with transaction.atomic():
+                for valid, errors in batches:
+                    # 先に登録したバッチも同じトランザクション内なので、登録済みとして確認できる
+                    accepted = self._reject_taken(valid, errors)
+                    User.objects.bulk_create([User(username=row.value) for row in accepted],
+                                             batch_size=self.batch_size)
+                    increment_user_count(len(accepted))
+                    inserted.append(accepted)
+
+            for accepted, (_, errors) in zip(inserted, batches):
+                for row in accepted:
+                    USERNAME_FILTER.add(row.value)
+                    USERNAME_INDEX.add(row.value)
+                batch_number += 1
+                total_inserted += len(accepted)
+                total_errors += len(errors)
+                yield BatchResult(
+                    batch=batch_number,
+                    inserted=len(accepted),
+                    errors=errors,
+                    total_inserted=total_inserted,
+                    total_errors=total_errors,
+                    elapsed=time.perf_counter() - started,
+                )
+
+    def _take_batch(self, rows: Iterator[ParsedRow]) -> tuple[list[ParsedRow], list[ParsedRow]]:
+        """
+        1バッチ分の行を取り出す エラー行もバッチの件数へ含め、1バッチの大きさを抑える
+
+        :param rows: 読み込んだ行
+        :return: 登録する行・エラー行
+        """
+        valid = []
+        errors = []
+        for row in rows:
+            if row.error:
+                errors.append(row)
+            else:
+                valid.append(row)
+            if len(valid) + len(errors) >= self.batch_size:
+                break
+        return valid, errors
+
+    def _reject_taken(self, valid: list[ParsedRow], errors: list[ParsedRow]) -> list[ParsedRow]:
+        """
+        登録済み・バッチ内で重複するユーザ名の行をエラー行とする
+        一意制約の違反でトランザクション全体を取り消さずに済むよう、登録する前にインデックスで確認する
+
+        :param valid: 登録する行
+        :param errors: エラー行 重複する行を追加する
+        :return: 登録できる行
+        """
+        usernames = list({row.value for row in valid})
+        taken = set()
+        for start in range(0, len(usernames), TAKEN_LOOKUP_CHUNK_SIZE):
+            taken.update(User.objects.filter(username__in=usernames[start:start + TAKEN_LOOKUP_CHUNK_SIZE])
+                         .values_list('username', flat=True))
+
+        accepted = []
+        for row in valid:
+            if row.value in taken:
+                errors.append(row._replace(error='username already taken'))
+                continue
+            taken.add(row.value)
+            accepted.append(row)
+        return accepted
@@ -0,0 +1,91 @@
+import random
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from ..models import User, UserCounter
+
+
+class Reconciliation(NamedTuple):
+    """ 数えたユーザ数と実際のユーザ数との差 """
+    counted: int
+    actual: int
+
+    @property
+    def drift(self) -> int:
+        return self.counted - self.actual
+
+
+def _shard(key: Optional[int]) -> int:
+    """
+    更新する行
+
+    :param key: 主キーなど、行を決める値 Noneであれば乱数で決める
+    :return: 行の番号
+    """
+    shards = settings.SIGNUP_USER_COUNTER_SHARDS
+    return random.randrange(shards) if key is None else key % shards
+
+
+def increment_user_count(delta: int, key: Optional[int] = None):
+    """
+    ユーザ数を増減 呼び出し元のトランザクションの中で更新するので、ユーザの登録・削除と同時に確定する
+
+    :param delta: 増減させる数
+    :param key: 主キーなど、更新する行を決める値 Noneであれば乱数で決める
+    """
+    if not delta:
+        return
+    shard = _shard(key)
+    if UserCounter.objects.filter(shard=shard).update(count=F('count') + delta):
+        return
+    # 行数を増やした直後は行が無いので作成する 同時に作成されたときは更新し直す
+    try:
+        with transaction.atomic():
+            UserCounter.objects.create(shard=shard, count=delta)
+    except IntegrityError:
+        UserCounter.objects.filter(shard=shard).update(count=F('count') + delta)
+
+
+def user_count() -> int:
+    """
+    すべての行を合計したユーザ数 Userテーブルを数えないので、件数に依らず行数分の時間で読める
+
+    :return: ユーザ数
+    """
+    return UserCounter.objects.aggregate(total=Sum('count'))['total'] or 0
+
+
+def reconcile_user_count(fix: bool = True) -> Reconciliation:
+    """
+    数えたユーザ数をUserテーブルの件数と突き合わせ、差があれば実際の件数へ合わせる
+    登録・削除を待たせるので、利用者の少ない時間帯に実行する
+
+    :param fix: 差を直すか
+    :return: 直す前のユーザ数・実際のユーザ数
+    """
+    with transaction.atomic():
+        # 突き合わせる間にユーザ数が変わらないよう、先に書き込んで登録・削除を待たせてから数える
+        # SQLiteはSELECT FOR UPDATEに対応しないので、更新によりDB全体の書き込みロックを獲得する
+        UserCounter.objects.filter(shard=0).update(count=F('count'))
+        counted = sum(UserCounter.objects.select_for_update().values_list('count', flat=True))
+        result = Reconciliation(counted, User.objects.count())
+        if fix and result.drift:
+            UserCounter.objects.exclude(shard=0).update(count=0)
+            UserCounter.objects.update_or_create(shard=0, defaults={'count': result.actual})
+    return result
+
+
+@receiver(post_delete, sender=User, dispatch_uid='signup.counter.decrement_on_delete')
+def decrement_on_delete(sender, instance: User, **kwargs):
+    """
+    削除したユーザの分、ユーザ数を減らす 削除と同じトランザクションの中で呼ばれる
+
+    :param sender: Userクラス
+    :param instance: 削除されたユーザ
+    """
+    increment_user_count(-1, instance.pk)
@@ -0,0 +1,96 @@
+import csv
+import io
+import itertools
+import json
+import zlib
+from typing import Iterator
+
+from ..models import User
+from .bulk_import import FORMAT_CSV, FORMAT_NDJSON, FORMATS
+
+CONTENT_TYPES = {
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_NDJSON: 'application/x-ndjson',
+}
+GZIP_CONTENT_TYPE = 'application/gzip'
+# zlibへgzip形式のヘッダ・フッタを付けさせるためのウィンドウサイズ
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# json.dumps()は既定以外の引数で呼ぶたびにエンコーダを組み立てるので、1つを使い回す
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+class UserExportAction:
+    """
+    全ユーザをCSV・NDJSONへ書き出すことを責務に持つ
+    Modelを組み立てず、DBから一定数ずつ読み込んだ行を順に書き出すので、件数に依らず使うメモリは変わらない
+    書き出した形式は一括登録でそのまま読み込める
+    """
+
+    def __init__(self, file_format: str = FORMAT_CSV, chunk_size: int = 2000, compress: bool = False,
+                 compress_level: int = 6):
+        """
+        :param file_format: csv・ndjsonのいずれか
+        :param chunk_size: DBから一度に読み込む件数 書き出すときもこの件数ずつまとめる
+        :param compress: gzip形式で圧縮しながら書き出すか
+        :param compress_level: gzipの圧縮レベル
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive')
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.compress_level = compress_level
+
+    @property
+    def content_type(self) -> str:
+        return GZIP_CONTENT_TYPE if self.compress else CONTENT_TYPES[self.file_format]
+
+    @property
+    def filename(self) -> str:
+        return f'users.{self.file_format}' + ('.gz' if self.compress else '')
+
+    def __call__(self) -> Iterator[bytes]:
+        """
+        全ユーザを主キーの順に書き出す
+
+        :return: 書き出した内容を一定数の行ごとに区切ったバイト列
+        """
+        chunks = (text.encode('utf-8') for text in self._encode())
+        if not self.compress:
+            yield from chunks
+            return
+
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, GZIP_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def _encode(self) -> Iterator[str]:
+        """
+        DBから一定数ずつ読み込んだ行を、その件数ごとにまとめて文字列とする
+
+        :return: 一定数の行を表す文字列 CSVでは先頭に見出しを含める
+        """
+        rows = User.objects.order_by('id').values_list('id', 'username').iterator(chunk_size=self.chunk_size)
+        if self.file_format == FORMAT_NDJSON:
+            while chunk := list(itertools.islice(rows, self.chunk_size)):
+                yield ''.join(
+                    f'{{"id": {user_id}, "username": {JSON_ENCODER.encode(username)}}}\n' for user_id, username in chunk
+                )
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(('id', 'username'))
+        while chunk := list(itertools.islice(rows, self.chunk_size)):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # 1件も無ければ見出しのみ
+            yield buffer.getvalue()
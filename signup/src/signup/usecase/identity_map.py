@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import User
+
+# まとめて読み込むとき、1回のIN句へ含める件数 DBごとのパラメータ数の上限を超えないよう区切る
+LOOKUP_CHUNK_SIZE = 500
+
+
+class IdentityMap:
+    """
+    1つのリクエスト・バッチ処理の間、読み込んだユーザを主キーごとに1つのインスタンスとして保持することを責務に持つ
+    同じユーザを繰り返し参照しても、DBへ問い合わせるのは最初の1回のみとなる
+    """
+
+    def __init__(self):
+        self._users: dict[int, User] = {}
+        self.hits = self.misses = 0
+
+    def get(self, user_id: int) -> User:
+        """
+        主キーに対応するユーザ 読み込み済みであれば同じインスタンスを返却
+
+        :param user_id: ユーザID
+        :return: ユーザModel
+        :raises User.DoesNotExist: ユーザが存在しないとき
+        """
+        user = self._users.get(user_id)
+        if user is not None:
+            self.hits += 1
+            return user
+
+        self.misses += 1
+        user = User.objects.get(id=user_id)
+        self._users[user.id] = user
+        return user
+
+    def get_many(self, user_ids: Iterable[int]) -> dict[int, User]:
+        """
+        主キーに対応するユーザをまとめて返却 読み込んでいないユーザのみをまとめて問い合わせる
+
+        :param user_ids: ユーザID
+        :return: 主キーをキーとするユーザModel 存在しないユーザは含まない
+        """
+        users: dict[int, User] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            user = self._users.get(user_id)
+            if user is None:
+                missing.append(user_id)
+            else:
+                users[user_id] = user
+        self.hits += len(users)
+        self.misses += len(missing)
+
+        for user_id, user in fetch_users(missing).items():
+            users[user_id] = self.add(user)
+        return users
+
+    def add(self, user: User) -> User:
+        """
+        ユーザを保持 同じ主キーのユーザを保持済みであれば、そのインスタンスを返却
+
+        :param user: 登録・読み込みしたユーザModel
+        :return: 保持しているユーザModel
+        """
+        return self._users.setdefault(user.id, user)
+
+    def discard(self, user_id: int):
+        """
+        保持しているユーザを破棄
+
+        :param user_id: ユーザID
+        """
+        self._users.pop(user_id, None)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+_current: ContextVar[Optional[IdentityMap]] = ContextVar('signup_identity_map', default=None)
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    """
+    処理中のリクエスト・バッチ処理のIdentityMap
+
+    :return: identity_scopeの外ではNone
+    """
+    return _current.get()
+
+
+@contextmanager
+def identity_scope() -> Iterator[IdentityMap]:
+    """
+    IdentityMapを有効にする範囲 入れ子にしたときは外側のIdentityMapをそのまま使う
+
+    :return: 範囲内で使うIdentityMap
+    """
+    identity_map = _current.get()
+    if identity_map is not None:
+        yield identity_map
+        return
+
+    token = _current.set(IdentityMap())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def load_user(user_id: int) -> User:
+    """
+    主キーに対応するユーザ identity_scopeの中であればIdentityMapを経由する
+
+    :param user_id: ユーザID
+    :return: ユーザModel
+    :raises User.DoesNotExist: ユーザが存在しないとき
+    """
+    identity_map = _current.get()
+    if identity_map is None:
+        return User.objects.get(id=user_id)
+    return identity_map.get(user_id)
+
+
+def fetch_users(user_ids: Iterable[int]) -> dict[int, User]:
+    """
+    主キーに対応するユーザを、一定数ずつのIN句でまとめて問い合わせる
+
+    :param user_ids: ユーザID 重複していてもよい
+    :return: 主キーをキーとするユーザModel 存在しないユーザは含まない
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    users: dict[int, User] = {}
+    for start in range(0, len(user_ids), LOOKUP_CHUNK_SIZE):
+        users.update(User.objects.in_bulk(user_ids[start:start + LOOKUP_CHUNK_SIZE]))
+    return users
+
+
+def load_users(user_ids: Iterable[int]) -> dict[int, User]:
+    """
+    主キーに対応するユーザをまとめて返却 identity_scopeの中であればIdentityMapを経由する
+
+    :param user_ids: ユーザID
+    :return: 主キーをキーとするユーザModel 存在しないユーザは含まない
+    """
+    identity_map = _current.get()
+    if identity_map is None:
+        return fetch_users(user_ids)
+    return identity_map.get_many(user_ids)
+
+
+@receiver(post_save, sender=User, dispatch_uid='signup.identity_map.remember_on_save')
+def remember_saved_user(sender, instance: User, **kwargs):
+    """
+    保存したユーザを、以降の参照で同じインスタンスとなるようIdentityMapへ保持
+
+    :param sender: Userクラス
+    :param instance: 保存されたユーザ
+    """
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.discard(instance.pk)
+        identity_map.add(instance)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='signup.identity_map.forget_on_delete')
+def forget_deleted_user(sender, instance: User, **kwargs):
+    """
+    削除したユーザをIdentityMapから破棄
+
+    :param sender: Userクラス
+    :param instance: 削除されたユーザ
+    """
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.discard(instance.pk)
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from typing import NamedTuple, Optional
+
+from ..models import User
+
+DIRECTION_NEXT = 'n'
+DIRECTION_PREVIOUS = 'p'
+
+
+class InvalidCursorError(ValueError):
+    """ カーソルを解釈できないことを表現することを責務に持つ """
+
+
+class UserRow(NamedTuple):
+    """ 一覧の1行 Modelを組み立てずに、表示する列のみを持つ """
+    id: int
+    username: str
+
+
+class Page(NamedTuple):
+    """ 一覧の1ページ 前後のページが無ければカーソルはNone """
+    users: list[UserRow]
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+
+def encode_cursor(direction: str, key: int) -> str:
+    """
+    ページの境界となる主キーを、利用者が中身に依存しないカーソルへ変換
+
+    :param direction: 境界より後ろ(n)・前(p)のいずれを読むか
+    :param key: 境界となる主キー
+    :return: URLへそのまま含められるカーソル
+    """
+    payload = json.dumps([direction, key], separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+    カーソルから読む向き・境界となる主キーを取り出す
+
+    :param cursor: encode_cursorで組み立てたカーソル
+    :return: 読む向き・境界となる主キー
+    :raises InvalidCursorError: カーソルを解釈できないとき
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, key = json.loads(payload)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError(f'invalid cursor: {cursor!r}') from e
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREVIOUS) or type(key) is not int or key < 0:
+        raise InvalidCursorError(f'invalid cursor: {cursor!r}')
+    return direction, key
+
+
+class UserListAction:
+    """
+    ユーザ一覧の1ページを、主キーを境界とするキーセット方式で組み立てることを責務に持つ
+    OFFSETで読み飛ばさず主キーのインデックスから読み始めるので、何ページ目であっても同じ時間で読める
+    全体の件数も数えない
+    """
+
+    def __init__(self, page_size: int):
+        """
+        :param page_size: 1ページの件数
+        """
+        if page_size < 1:
+            raise ValueError('page_size must be positive')
+        self.page_size = page_size
+
+    def __call__(self, cursor: Optional[str] = None) -> Page:
+        """
+        カーソルが指すページを組み立て
+
+        :param cursor: 前後のページへのカーソル Noneであれば先頭のページ
+        :return: 1ページ分のユーザ・前後のページへのカーソル
+        :raises InvalidCursorError: カーソルを解釈できないとき
+        """
+        direction, key = decode_cursor(cursor) if cursor else (DIRECTION_NEXT, 0)
+        rows = User.objects.values_list('id', 'username')
+        if direction == DIRECTION_NEXT:
+            rows = rows.filter(id__gt=key).order_by('id')
+        else:
+            rows = rows.filter(id__lt=key).order_by('-id')
+        # 1件多く読み、続きのページがあるかを件数を数えずに判定する
+        users = [UserRow(*row) for row in rows[:self.page_size + 1]]
+        has_more = len(users) > self.page_size
+        users = users[:self.page_size]
+        if direction == DIRECTION_PREVIOUS:
+            users.reverse()
+        if not users:
+            return Page(users, None, None)
+
+        first, last = users[0].id, users[-1].id
+        if direction == DIRECTION_NEXT:
+            has_next = has_more
+            has_previous = cursor is not None and User.objects.filter(id__lt=first).exists()
+        else:
+            has_previous = has_more
+            has_next = User.objects.filter(id__gt=last).exists()
+        return Page(
+            users,
+            encode_cursor(DIRECTION_NEXT, last) if has_next else None,
+            encode_cursor(DIRECTION_PREVIOUS, first) if has_previous else None,
+        )
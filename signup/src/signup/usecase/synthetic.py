@@ -0,0 +1,294 @@
+import itertools
+import random
+import string
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from django.db import connection, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from ..models import User
+from .counter import increment_user_count
+
+DISTRIBUTION_SEQUENTIAL = 'sequential'
+DISTRIBUTION_UNIFORM = 'uniform'
+DISTRIBUTION_ZIPF = 'zipf'
+DISTRIBUTIONS = (DISTRIBUTION_SEQUENTIAL, DISTRIBUTION_UNIFORM, DISTRIBUTION_ZIPF)
+
+# zipf分布で選ぶユーザ名の語幹 先頭ほど多く選ばれる
+STEMS = (
+    'taro', 'hanako', 'yuki', 'ken', 'sakura', 'hiro', 'mai', 'sho', 'aoi', 'ren',
+    'john', 'mary', 'alex', 'sam', 'chris', 'kim', 'lee', 'max', 'anna', 'emma',
+    'django', 'python', 'ruby', 'rust', 'go', 'java', 'kotlin', 'swift', 'scala', 'perl',
+    'cat', 'dog', 'fox', 'owl', 'bear', 'wolf', 'lion', 'tiger', 'panda', 'koala',
+    'sun', 'moon', 'star', 'sky', 'sea', 'river', 'forest', 'stone', 'fire', 'snow',
+)
+# 乱数をまとめて生成する件数
+GENERATE_CHUNK_SIZE = 10_000
+# 乱数のバイトを英小文字へ変換する表 26で割り切れない分だけ、先頭の文字がわずかに多く選ばれる
+LETTER_TABLE = bytes(ord('a') + byte % len(string.ascii_lowercase) for byte in range(256))
+# 1回のexecutemanyで登録する件数
+CHUNK_SIZE = 10_000
+# 1トランザクションで登録する件数
+ROWS_PER_TRANSACTION = 1_000_000
+# 登録の間、SQLiteへ設定するプラグマ 登録後は元の値へ戻す
+RELAXED_SQLITE_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    # 負の値はKiB単位 256MiBとする
+    'cache_size': '-262144',
+}
+
+
+class LoadResult(NamedTuple):
+    """ 生成したユーザの登録結果 """
+    rows: int
+    elapsed: float
+    database_bytes: Optional[int]
+    deferred_indexes: list[str]
+
+
+def generate_usernames(count: int, distribution: str = DISTRIBUTION_SEQUENTIAL, seed: int = 0, start: int = 1,
+                       min_length: int = 4, max_length: int = 12, zipf_exponent: float = 1.1) -> Iterator[str]:
+    """
+    重複しないユーザ名を生成 同じ引数であれば同じ並びとなる
+    語幹の末尾へ通し番号を付けるので、語幹が重なっても重複しない
+
+    :param count: 件数
+    :param distribution: sequential(通し番号のみ)・uniform(長さが一様な英小文字)・zipf(少数の語幹へ偏る)のいずれか
+    :param seed: 乱数の種
+    :param start: 通し番号の始まり 登録済みのユーザ名と重ならないよう、既存の主キーより大きな値とする
+    :param min_length: uniformの語幹の最小の長さ
+    :param max_length: uniformの語幹の最大の長さ
+    :param zipf_exponent: zipfで順位がkの語幹を選ぶ重みを1/k^sとするときのs
+    :return: ユーザ名
+    """
+    numbers = range(start, start + count)
+    if distribution == DISTRIBUTION_SEQUENTIAL:
+        # 0埋めにより、ユーザ名の並びが主キーの並びと一致する
+        return (f'user{number:09d}' for number in numbers)
+
+    rng = random.Random(seed)
+    if distribution == DISTRIBUTION_UNIFORM:
+        if not 1 <= min_length <= max_length:
+            raise ValueError('lengths must satisfy 1 <= min_length <= max_length')
+        return _uniform_usernames(numbers, rng, range(min_length, max_length + 1))
+    if distribution == DISTRIBUTION_ZIPF:
+        weights = list(itertools.accumulate(1 / rank ** zipf_exponent for rank in range(1, len(STEMS) + 1)))
+        return _zipf_usernames(numbers, rng, weights)
+    raise ValueError(f'unknown distribution: {distribution}')
+
+
+def _uniform_usernames(numbers: range, rng: random.Random, lengths: range) -> Iterator[str]:
+    """
+    長さが一様な英小文字の語幹へ通し番号を付けたユーザ名 乱数は一定数ずつまとめて生成する
+
+    :param numbers: 通し番号
+    :param rng: 乱数生成器
+    :param lengths: 語幹の長さの候補
+    :return: ユーザ名
+    """
+    for start in range(numbers.start, numbers.stop, GENERATE_CHUNK_SIZE):
+        chunk = range(start, min(start + GENERATE_CHUNK_SIZE, numbers.stop))
+        sizes = rng.choices(lengths, k=len(chunk))
+        letters = rng.randbytes(sum(sizes)).translate(LETTER_TABLE).decode('ascii')
+        offset = 0
+        for number, size in zip(chunk, sizes):
+            yield letters[offset:offset + size] + str(number)
+            offset += size
+
+
+def _zipf_usernames(numbers: range, rng: random.Random, cum_weights: list[float]) -> Iterator[str]:
+    """
+    順位に対してzipf分布となるよう選んだ語幹へ通し番号を付けたユーザ名 乱数は一定数ずつまとめて生成する
+
+    :param numbers: 通し番号
+    :param rng: 乱数生成器
+    :param cum_weights: 語幹を選ぶ重みの累積和
+    :return: ユーザ名
+    """
+    for start in range(numbers.start, numbers.stop, GENERATE_CHUNK_SIZE):
+        chunk = range(start, min(start + GENERATE_CHUNK_SIZE, numbers.stop))
+        for number, stem in zip(chunk, rng.choices(STEMS, cum_weights=cum_weights, k=len(chunk))):
+            yield stem + str(number)
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+@contextmanager
+def relaxed_sqlite_pragmas(db: BaseDatabaseWrapper) -> Iterator[None]:
+    """
+    登録の間、SQLiteの同期・ジャーナルを緩め、終了後に元の値へ戻す ジャーナルがWALであればWALのままとする
+    同期しないので、登録中にOSが停止するとDBが壊れ得る
+    SQLite以外・トランザクションの中(プラグマを変更できない)では何もしない
+
+    :param db: DBへの接続
+    """
+    if db.vendor != 'sqlite' or db.in_atomic_block:
+        yield
+        return
+
+    with db.cursor() as cursor:
+        original = {}
+        for name, value in RELAXED_SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            original[name] = cursor.fetchone()[0]
+            # WALから切り替えるには他の接続が無いことを要するので、稼働中のDBではWALのまま登録する
+            if name == 'journal_mode' and str(original[name]).lower() == 'wal':
+                del original[name]
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with db.cursor() as cursor:
+            for name, value in original.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def deferred_indexes(db: BaseDatabaseWrapper, table: str) -> Iterator[list[str]]:
+    """
+    登録の間、テーブルの索引を削除し、終了後にまとめて作り直す
+    作り直すときは整列してから組み立てるので、1行ずつ索引を更新するより速い
+    SQLiteで列定義のUNIQUEにより作られる索引(sqlite_autoindex_*)はテーブルの一部であり削除できないので対象外とする
+    SQLite以外では索引を保ったまま登録する
+
+    :param db: DBへの接続
+    :param table: テーブル名
+    :return: 削除した索引の名前
+    """
+    if db.vendor != 'sqlite':
+        yield []
+        return
+
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                       [table])
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {db.ops.quote_name(name)}')
+    try:
+        yield [name for name, _ in indexes]
+    finally:
+        with db.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+
+def database_bytes(db: BaseDatabaseWrapper) -> Optional[int]:
+    """
+    DBの大きさ
+
+    :param db: DBへの接続
+    :return: バイト数 SQLite以外ではNone
+    """
+    if db.vendor != 'sqlite':
+        return None
+    with db.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return page_count * cursor.fetchone()[0]
+
+
+def _insert_chunks(usernames: Iterable[str], sql: str, chunk_size: int, rows_per_transaction: int,
+                   db: BaseDatabaseWrapper, sort_chunks: bool, counted: bool) -> Iterator[int]:
+    """
+    ユーザ名をexecutemanyで大きなトランザクションごとに登録
+
+    :param usernames: ユーザ名
+    :param sql: 1件を登録するSQL
+    :param chunk_size: 1回のexecutemanyで登録する件数
+    :param rows_per_transaction: 1トランザクションで登録する件数
+    :param db: DBへの接続
+    :param sort_chunks: 登録先の索引を更新する位置がまとまるよう、1回分ずつ整列してから登録するか
+    :param counted: 登録した件数を、同じトランザクションでユーザ数へ加えるか
+    :return: トランザクションを確定するたびに、それまでに登録した件数
+    """
+    chunks = _chunks(usernames, chunk_size)
+    total = 0
+    while True:
+        inserted = 0
+        with transaction.atomic(using=db.alias), db.cursor() as cursor:
+            for chunk in chunks:
+                if sort_chunks:
+                    chunk.sort()
+                cursor.executemany(sql, [(username,) for username in chunk])
+                inserted += len(chunk)
+                if inserted >= rows_per_transaction:
+                    break
+            if counted:
+                increment_user_count(inserted)
+        if not inserted:
+            return
+        total += inserted
+        yield total
+
+
+def load_usernames(usernames: Iterable[str], chunk_size: int = CHUNK_SIZE,
+                   rows_per_transaction: int = ROWS_PER_TRANSACTION,
+                   db: BaseDatabaseWrapper = connection) -> Iterator[int]:
+    """
+    ユーザ名を登録 Modelを組み立てず、シグナルも送らない ユーザ数は登録と同じトランザクションで数える
+
+    SQLiteでは索引の無い一時テーブルへ登録してから、ユーザ名の順にまとめて複写する
+    列定義のUNIQUEによる索引は削除できないが、整列した順に追加することで索引を末尾へ積み上げるだけとなり、
+    1行ずつ索引の途中へ挿入するより速い 重複があれば複写の時点で失敗し、1件も登録されない
+
+    :param usernames: ユーザ名
+    :param chunk_size: 1回のexecutemanyで登録する件数
+    :param rows_per_transaction: 1トランザクションで登録する件数
+    :param db: DBへの接続
+    :return: トランザクションを確定するたびに、それまでに登録・一時テーブルへ登録した件数
+    """
+    if chunk_size < 1 or rows_per_transaction < 1:
+        raise ValueError('chunk_size and rows_per_transaction must be positive')
+    table = db.ops.quote_name(User._meta.db_table)
+    column = db.ops.quote_name('username')
+    if db.vendor != 'sqlite':
+        yield from _insert_chunks(usernames, f'INSERT INTO {table} ({column}) VALUES (%s)', chunk_size,
+                                  rows_per_transaction, db, sort_chunks=True, counted=True)
+        return
+
+    staging = db.ops.quote_name(f'{User._meta.db_table}_staging')
+    with db.cursor() as cursor:
+        cursor.execute(f'CREATE TEMP TABLE {staging} (username TEXT NOT NULL)')
+    try:
+        total = 0
+        for total in _insert_chunks(usernames, f'INSERT INTO {staging} VALUES (%s)', chunk_size,
+                                    rows_per_transaction, db, sort_chunks=False, counted=False):
+            yield total
+        with transaction.atomic(using=db.alias), db.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {table} ({column}) SELECT username FROM {staging} ORDER BY username')
+            increment_user_count(total)
+    finally:
+        with db.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {staging}')
+
+
+def generate_users(usernames: Iterable[str], chunk_size: int = CHUNK_SIZE,
+                   rows_per_transaction: int = ROWS_PER_TRANSACTION, db: BaseDatabaseWrapper = connection,
+                   progress=None) -> LoadResult:
+    """
+    索引の作成を遅らせ、SQLiteのプラグマを緩めた状態でユーザ名を登録
+
+    :param usernames: ユーザ名
+    :param chunk_size: 1回のexecutemanyで登録する件数
+    :param rows_per_transaction: 1トランザクションで登録する件数
+    :param db: DBへの接続
+    :param progress: トランザクションを確定するたびに、登録した件数・経過時間で呼び出す関数
+    :return: 登録結果
+    """
+    started = time.perf_counter()
+    total = 0
+    with relaxed_sqlite_pragmas(db), deferred_indexes(db, User._meta.db_table) as deferred:
+        for total in load_usernames(usernames, chunk_size, rows_per_transaction, db):
+            if progress is not None:
+                progress(total, time.perf_counter() - started)
+    return LoadResult(total, time.perf_counter() - started, database_bytes(db), deferred)
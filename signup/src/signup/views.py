@@ -1,26 +1,50 @@
+import json
+from typing import Iterator
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template
 from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 
-from .usecase.actions import SaveAction, ResultViewAction
+from .hooks import POST_SIGNUP_POOL
+from .precompressed import PAGE_CACHE, render_precompressed
+from .ratelimit import KEY_FUNCTIONS, SAVE_RATE_LIMIT, rate_limited
+from .result_cache import RESULT_PAGE_CACHE, render_result_page
+from .static_export import static_page
+from .usecase.actions import SaveAction, ResultViewAction, BatchResultViewAction
+from .usecase.autocomplete import USERNAME_INDEX
+from .usecase.availability import USERNAME_FILTER
+from .usecase.bulk_import import FORMATS, USERNAME_MAX_LENGTH, BatchResult, BulkImportAction, guess_format, \
+    open_text, parse_rows, progress_record
+from .usecase.counter import user_count
+from .usecase.export import UserExportAction
+from .usecase.listing import Page, UserListAction
 
 
+@static_page
 def index(request: HttpRequest) -> HttpResponse:
     """
     トップ画面
     :param request: HTTPリクエスト
     :return: トップ画面のテンプレートから組み立てられたHTTPレスポンス
     """
-    return render(request, 'index.html')
+    return render_precompressed(request, 'index.html')
 
 
+@rate_limited(SAVE_RATE_LIMIT, KEY_FUNCTIONS[settings.SIGNUP_RATE_LIMIT_KEY], settings.SIGNUP_RATE_LIMIT_ENABLED)
 def save(request: HttpRequest) -> HttpResponse:
     """
-    ユーザ登録処理
+    ユーザ登録処理 同じクライアントからの登録が多すぎるときは、DBへ問い合わせずに429を返却する
     :param request: HTTPリクエスト
-    :return: ユーザ登録結果画面へのリダイレクトを表現するHTTPレスポンス
+    :return: ユーザ登録結果画面へのリダイレクトを表現するHTTPレスポンス ユーザ名が登録済みであればトップ画面
     """
-    user = SaveAction()(request.POST['username'])
+    try:
+        user = SaveAction()(request.POST['username'])
+    except IntegrityError:
+        return render(request, 'index.html', context={'error': 'このユーザ名は登録済みです'}, status=409)
 
     return redirect(reverse('ユーザ登録:登録結果', args=[user.id]))
 
@@ -30,6 +54,266 @@ def result(request: HttpRequest, user_id: int) -> HttpResponse:
     ユーザ登録結果画面
     :param request: HTTPリクエスト
     :param user_id: 表示対象ユーザの識別子
-    :return: ユーザ登録結果画面を表現するHTTPレスポンス
+    :return: ユーザ登録結果画面を表現するHTTPレスポンス ユーザ情報が変わるまではキャッシュした画面を返却
+    """
+    html = RESULT_PAGE_CACHE.get(user_id, lambda: render_result_page(ResultViewAction()(user_id)))
+    return HttpResponse(html)
+
+
+@require_GET
+def result_batch(request: HttpRequest) -> HttpResponse:
+    """
+    複数のユーザ情報の取得 指定されたユーザをまとめて問い合わせ、1回のリクエストで返却する
+
+    :param request: ユーザIDをカンマ区切りでidsとして含むHTTPリクエスト
+    :return: 指定された順のユーザ情報をJSONで表現するHTTPレスポンス 存在しないユーザはfoundをfalseとする
+    """
+    try:
+        user_ids = [int(user_id) for user_id in request.GET.get('ids', '').split(',')]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be comma-separated integers'}, status=400)
+    if len(user_ids) > settings.SIGNUP_RESULT_BATCH_MAX_IDS:
+        return JsonResponse({'error': f'ids must be at most {settings.SIGNUP_RESULT_BATCH_MAX_IDS}'}, status=400)
+
+    users = BatchResultViewAction()(user_ids)
+    return JsonResponse({'results': [
+        {'id': user_id, 'found': True, 'username': user.username} if user is not None else
+        {'id': user_id, 'found': False}
+        for user_id, user in zip(user_ids, users)
+    ]})
+
+
+# ユーザ一覧の行を、まとめて出力する件数
+LIST_ROWS_PER_CHUNK = 25
+
+
+def _list_page(request: HttpRequest) -> Page:
+    """
+    クエリパラメータのカーソル・件数が指すユーザ一覧の1ページ
+
+    :param request: カーソルをcursor、1ページの件数をsizeとして含み得るHTTPリクエスト
+    :return: 1ページ分のユーザ
+    :raises ValueError: カーソル・件数を解釈できないとき カーソルはInvalidCursorErrorとする
+    """
+    page_size = int(request.GET.get('size', settings.SIGNUP_LIST_PAGE_SIZE))
+    if page_size > settings.SIGNUP_LIST_MAX_PAGE_SIZE:
+        raise ValueError(f'size must be at most {settings.SIGNUP_LIST_MAX_PAGE_SIZE}')
+    return UserListAction(page_size)(request.GET.get('cursor') or None)
+
+
+@require_GET
+def user_list(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ一覧画面 1ページ分の行を、描画した順に逐次返却する
+
+    :param request: HTTPリクエスト
+    :return: ユーザ一覧画面を逐次返却するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+    try:
+        page = _list_page(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return StreamingHttpResponse(_render_user_list(page))
+
+
+def _render_user_list(page: Page) -> Iterator[str]:
+    """
+    ユーザ一覧画面を、先頭・一定数の行・末尾の順に描画
+
+    :param page: 1ページ分のユーザ
+    :return: 画面のHTMLの断片
+    """
+    yield get_template('user_list_head.html').render()
+    row_template = get_template('user_list_row.html')
+    for start in range(0, len(page.users), LIST_ROWS_PER_CHUNK):
+        yield ''.join(row_template.render({'user': user}) for user in page.users[start:start + LIST_ROWS_PER_CHUNK])
+    yield get_template('user_list_foot.html').render({
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@require_GET
+def user_list_api(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ一覧API
+
+    :param request: HTTPリクエスト
+    :return: 1ページ分のユーザ・前後のページへのカーソルをJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+    try:
+        page = _list_page(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'users': [user._asdict() for user in page.users],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_GET
+def user_count_api(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ数API Userテーブルを数えず、登録・削除のたびに数えた値を返却する
+
+    :param request: HTTPリクエスト
+    :return: ユーザ数をJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+
+    return JsonResponse({'count': user_count()})
+
+
+@require_GET
+def user_export(request: HttpRequest) -> HttpResponse:
+    """
+    全ユーザの書き出し 全件を読み込まず、DBから一定数ずつ読み込みながら逐次返却する
+
+    :param request: 形式をformat、gzip形式で圧縮するかをgzip(1)として含み得るHTTPリクエスト
+    :return: 全ユーザをCSV・NDJSONで逐次返却するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+    try:
+        action = UserExportAction(request.GET.get('format', FORMATS[0]), settings.SIGNUP_EXPORT_CHUNK_SIZE,
+                                  request.GET.get('gzip') == '1', settings.SIGNUP_EXPORT_COMPRESS_LEVEL)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    response = StreamingHttpResponse(action(), content_type=action.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{action.filename}"'
+    return response
+
+
+@require_GET
+def autocomplete(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ名の入力補完 DBへ問い合わせず、プロセス内の索引から前方一致するユーザ名を返却する
+
+    :param request: 入力中のユーザ名をq、最大件数をlimitとして含むHTTPリクエスト
+    :return: 前方一致するユーザ名を昇順にJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+    prefix = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= settings.SIGNUP_AUTOCOMPLETE_MAX_RESULTS:
+        return JsonResponse({'error': f'limit must be 1 to {settings.SIGNUP_AUTOCOMPLETE_MAX_RESULTS}'}, status=400)
+
+    return JsonResponse({'prefix': prefix, 'usernames': USERNAME_INDEX.search(prefix, limit)})
+
+
+@require_GET
+def availability(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ名が使えるかの確認 登録されていないと判定できるユーザ名は、DBへ問い合わせずに返却する
+
+    :param request: ユーザ名をusernameとして含むHTTPリクエスト
+    :return: ユーザ名・使えるかをJSONで表現するHTTPレスポンス
+    """
+    username = request.GET.get('username', '')
+    if not username or len(username) > USERNAME_MAX_LENGTH:
+        return JsonResponse({'error': f'username must be 1 to {USERNAME_MAX_LENGTH} characters'}, status=400)
+
+    return JsonResponse({'username': username, 'available': USERNAME_FILTER.is_available(username)})
+
+
+@require_GET
+def availability_stats(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ名の確認に使うBloomフィルタの統計情報
+
+    :param request: HTTPリクエスト
+    :return: フィルタのメモリ使用量・判定結果の件数をJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+
+    return JsonResponse(USERNAME_FILTER.stats()._asdict())
+
+
+@require_GET
+def hook_stats(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ登録後の処理の統計情報
+
+    :param request: HTTPリクエスト
+    :return: 実行を待つイベントの件数・処理ごとの所要時間をJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+
+    return JsonResponse(POST_SIGNUP_POOL.stats()._asdict())
+
+
+@require_GET
+def page_cache_stats(request: HttpRequest) -> HttpResponse:
+    """
+    圧縮済みのページを保持するキャッシュの統計情報
+
+    :param request: HTTPリクエスト
+    :return: ヒット率・圧縮により削減した転送量などをJSONで表現するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+
+    return JsonResponse(PAGE_CACHE.stats()._asdict())
+
+
+@require_POST
+def bulk_import(request: HttpRequest) -> HttpResponse:
+    """
+    ユーザ情報の一括登録 アップロードされたCSV・NDJSONを1行ずつ読み込みながら登録する
+
+    :param request: ファイルをfileとして含むHTTPリクエスト 形式はformatで指定でき、省略時は拡張子から推測
+    :return: バッチごとの登録結果をNDJSONで逐次返却するHTTPレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'staff only'}, status=403)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'file is required'}, status=400)
+    file_format = request.POST.get('format') or guess_format(upload.name)
+    if file_format not in FORMATS:
+        return JsonResponse({'error': f'format must be one of {", ".join(FORMATS)}'}, status=400)
+    try:
+        batch_size = int(request.POST.get('batch_size', settings.SIGNUP_IMPORT_BATCH_SIZE))
+        action = BulkImportAction(batch_size, settings.SIGNUP_IMPORT_BATCHES_PER_TRANSACTION)
+    except ValueError:
+        return JsonResponse({'error': 'batch_size must be a positive integer'}, status=400)
+
+    results = action(parse_rows(open_text(upload), file_format))
+    return StreamingHttpResponse(_import_progress(results), content_type='application/x-ndjson')
+
+
+def _import_progress(results: Iterator[BatchResult]) -> Iterator[str]:
+    """
+    バッチごとの登録結果をNDJSONの行とする 失敗したときは、確定済みの件数とともに理由を出力して終える
+
+    :param results: バッチごとの登録結果
+    :return: NDJSONの各行
     """
-    return render(request, 'result.html', context=ResultViewAction()(user_id))
+    last = None
+    try:
+        for last in results:
+            yield json.dumps(progress_record(last), ensure_ascii=False) + '\n'
+    except DatabaseError as e:
+        yield json.dumps({'error': str(e), 'total_inserted': last.total_inserted if last else 0}) + '\n'
+        return
+    yield json.dumps({
+        'done': True,
+        'total_inserted': last.total_inserted if last else 0,
+        'total_errors': last.total_errors if last else 0,
+    }) + '\n'
@@ -0,0 +1,38 @@
+import pytest
+
+from signup.bloom import BloomFilter
+
+
+class TestBloomFilter:
+    """ 偽陽性を許す集合として振る舞うか検証 """
+
+    # 偽陽性率からビット数・ハッシュ関数の数を決めるか
+    def test_size(self):
+        # GIVEN
+        expected = (9586, 7, 1199)
+        # WHEN
+        sut = BloomFilter(1000, 0.01)
+        actual = (sut.size, sut.hash_count, sut.nbytes)
+        # THEN
+        assert actual == expected
+
+    # 追加した要素は必ず含まれ、追加していない要素を含むと判定する割合が偽陽性率程度に収まるか
+    def test_contains(self):
+        # GIVEN
+        sut = BloomFilter(1000, 0.01)
+        added = [f'user{index}' for index in range(1000)]
+        others = [f'other{index}' for index in range(10000)]
+        # WHEN
+        sut.update(added)
+        false_positives = sum(other in sut for other in others)
+        # THEN
+        assert all(item in sut for item in added)
+        assert len(sut) == 1000
+        assert false_positives / len(others) < 0.02
+
+    # 容量・偽陽性率が範囲外であれば例外を送出するか
+    @pytest.mark.parametrize('capacity, false_positive_rate', [(0, 0.01), (1000, 0), (1000, 1)])
+    def test_invalid(self, capacity, false_positive_rate):
+        # WHEN / THEN
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, false_positive_rate)
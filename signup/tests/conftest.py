@@ -82,3 +82,46 @@ class AssertionHelper:
 @pytest.fixture
 def assertion_helper():
     return AssertionHelper()
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """ テストごとにテンプレートが描画されるよう、圧縮済みのページを破棄 """
+    from signup.precompressed import PAGE_CACHE
+
+    PAGE_CACHE.clear()
+    yield
+    PAGE_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_username_filter():
+    """ テストごとにDBの状態から組み立てるよう、ユーザ名のBloomフィルタ・前方一致索引を破棄 """
+    from signup.usecase.autocomplete import USERNAME_INDEX
+    from signup.usecase.availability import USERNAME_FILTER
+
+    USERNAME_FILTER.clear()
+    USERNAME_INDEX.clear()
+    yield
+    USERNAME_FILTER.clear()
+    USERNAME_INDEX.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """ テストごとに結果画面が描画されるよう、キャッシュした画面を破棄 """
+    from signup.result_cache import RESULT_PAGE_CACHE
+
+    RESULT_PAGE_CACHE.cache.clear()
+    RESULT_PAGE_CACHE.reset_stats()
+    yield
+    RESULT_PAGE_CACHE.cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_save_rate_limit():
+    """ 前のテスト・前回の実行で使ったトークンが残らないよう、ユーザ登録の流量制限を戻す """
+    from signup.ratelimit import SAVE_RATE_LIMIT
+
+    SAVE_RATE_LIMIT.reset()
+    yield
@@ -0,0 +1,239 @@
+import threading
+import time
+
+import pytest
+
+from signup import hooks
+from signup.hooks import HookRegistry, HookWorkerPool, SignupEvent, SpillQueue
+from signup.usecase.actions import SaveAction
+from .data.user import user_creation
+
+
+def record_event(event: SignupEvent):
+    """ 設定から登録する処理の例 """
+
+
+@pytest.fixture
+def registry():
+    return HookRegistry()
+
+
+@pytest.fixture
+def blocked(registry):
+    """ 解放するまで、ワーカを止めておく処理 """
+    release = threading.Event()
+    started = threading.Event()
+    events = []
+
+    @registry.register(name='blocked')
+    def hook(event: SignupEvent):
+        started.set()
+        release.wait(5)
+        events.append(event)
+
+    yield started, release, events
+    release.set()
+
+
+class TestHookRegistry:
+    """ ユーザ登録後の処理を登録できるか検証 """
+
+    # デコレータ・設定のパスから登録し、登録した順に返却するか
+    def test_register(self, registry):
+        # GIVEN
+        @registry.register
+        def first(event):
+            pass
+
+        path = f'{record_event.__module__}.record_event'
+        # WHEN
+        registry.load([path])
+        registry.register(name='second')(first)
+        registry.unregister('second')
+        # THEN
+        assert [name for name, _ in registry.items()] == [
+            f'{first.__module__}.{first.__qualname__}', path]
+
+
+class TestSpillQueue:
+    """ 退避したイベントを、処理し終えるまで失わずに取り出せるか検証 """
+
+    # 確保したイベントは、処理し終えるまで他のワーカへ渡さず、削除もしないか
+    def test_claim(self, tmp_path):
+        # GIVEN
+        sut = SpillQueue(tmp_path / 'spill.sqlite3')
+        sut.put(SignupEvent(1, 'first'))
+        sut.put(SignupEvent(2, 'second'))
+        # WHEN
+        first = sut.claim()
+        second = sut.claim()
+        exhausted = sut.claim()
+        depth = len(sut)
+        sut.complete(first)
+        sut.complete(second)
+        # THEN
+        assert [first.event, second.event, exhausted] == [SignupEvent(1, 'first'), SignupEvent(2, 'second'), None]
+        assert depth == 2
+        assert len(sut) == 0
+
+    # 処理し終えないままリースが切れたイベントは、再び取り出せるか
+    def test_expired_lease(self, tmp_path):
+        # GIVEN
+        sut = SpillQueue(tmp_path / 'spill.sqlite3')
+        sut.put(SignupEvent(1, 'crashed'))
+        abandoned = sut.claim(lease=60)
+        # WHEN
+        during_lease = sut.claim(lease=60)
+        after_lease = sut.claim(lease=0)
+        # THEN
+        assert during_lease is None
+        assert after_lease == abandoned
+
+
+class TestHookWorkerPool:
+    """ ユーザ登録後の処理をワーカスレッドで実行できるか検証 """
+
+    # 失敗した処理があっても残りの処理を実行し、所要時間・失敗を数えるか
+    def test_run(self, registry):
+        # GIVEN
+        events = []
+        registry.register(lambda event: 1 / 0, name='failing')
+        registry.register(events.append, name='append')
+        sut = HookWorkerPool(registry, workers=2, queue_size=10, overflow='drop', poll_interval=0.01)
+        # WHEN
+        for number in range(3):
+            sut.submit(SignupEvent(number, f'user{number}'))
+        remaining = sut.shutdown(timeout=5)
+        actual = sut.stats()
+        # THEN
+        assert remaining == 0
+        assert sorted(event.user_id for event in events) == [0, 1, 2]
+        assert (actual.submitted, actual.completed, actual.failures, actual.queue_depth) == (3, 3, 3, 0)
+        assert actual.latency['failing']['failures'] == 3
+        assert actual.latency['append']['calls'] == 3
+
+    # dropでは、キューがあふれたイベントを捨てるか
+    def test_drop(self, registry, blocked):
+        # GIVEN
+        started, release, events = blocked
+        sut = HookWorkerPool(registry, workers=1, queue_size=1, overflow='drop', poll_interval=0.01)
+        sut.submit(SignupEvent(1, 'running'))
+        started.wait(5)
+        sut.submit(SignupEvent(2, 'queued'))
+        # WHEN
+        accepted = sut.submit(SignupEvent(3, 'overflow'))
+        release.set()
+        sut.shutdown(timeout=5)
+        # THEN
+        assert accepted is False
+        assert [event.user_id for event in events] == [1, 2]
+        assert sut.stats().dropped == 1
+
+    # blockでは、空くまで待っても空かなければ捨てるか
+    def test_block(self, registry, blocked):
+        # GIVEN
+        started, release, events = blocked
+        sut = HookWorkerPool(registry, workers=1, queue_size=1, overflow='block', block_timeout=0.05,
+                             poll_interval=0.01)
+        sut.submit(SignupEvent(1, 'running'))
+        started.wait(5)
+        sut.submit(SignupEvent(2, 'queued'))
+        # WHEN
+        accepted = sut.submit(SignupEvent(3, 'overflow'))
+        release.set()
+        sut.shutdown(timeout=5)
+        # THEN
+        assert accepted is False
+        assert sut.stats().dropped == 1
+
+    # spillでは、あふれたイベントをファイルへ退避し、手が空いたときに実行するか
+    def test_spill(self, registry, blocked, tmp_path):
+        # GIVEN
+        started, release, events = blocked
+        path = tmp_path / 'spill.sqlite3'
+        sut = HookWorkerPool(registry, workers=1, queue_size=1, overflow='spill', spill_path=path,
+                             poll_interval=0.01)
+        sut.submit(SignupEvent(1, 'running'))
+        started.wait(5)
+        sut.submit(SignupEvent(2, 'queued'))
+        # WHEN
+        accepted = sut.submit(SignupEvent(3, 'あふれた'))
+        spilled_depth = len(SpillQueue(path))
+        release.set()
+        deadline = time.monotonic() + 5
+        while len(events) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sut.shutdown(timeout=5)
+        # THEN
+        assert accepted is True
+        assert spilled_depth == 1
+        assert events == [SignupEvent(1, 'running'), SignupEvent(2, 'queued'), SignupEvent(3, 'あふれた')]
+        assert sut.stats().spilled_depth == 0
+
+    # 退避先へ書き込めなければ、例外を送出せずにイベントを捨てるか
+    def test_spill_unwritable(self, registry, blocked, tmp_path):
+        # GIVEN
+        started, release, events = blocked
+        path = tmp_path / 'missing' / 'spill.sqlite3'
+        sut = HookWorkerPool(registry, workers=1, queue_size=1, overflow='spill', spill_path=path,
+                             poll_interval=0.01)
+        sut.submit(SignupEvent(1, 'running'))
+        started.wait(5)
+        sut.submit(SignupEvent(2, 'queued'))
+        # WHEN
+        accepted = sut.submit(SignupEvent(3, 'overflow'))
+        release.set()
+        sut.shutdown(timeout=5)
+        # THEN
+        assert accepted is False
+        assert [event.user_id for event in events] == [1, 2]
+        assert (sut.stats().dropped, sut.stats().spilled) == (1, 0)
+
+    # 期限までに実行できなかったイベント・終了後のイベントは退避するか
+    def test_shutdown(self, registry, blocked, tmp_path):
+        # GIVEN
+        started, release, events = blocked
+        path = tmp_path / 'spill.sqlite3'
+        sut = HookWorkerPool(registry, workers=1, queue_size=10, overflow='drop', spill_path=path,
+                             poll_interval=0.01)
+        sut.submit(SignupEvent(1, 'running'))
+        started.wait(5)
+        sut.submit(SignupEvent(2, 'queued'))
+        # WHEN
+        remaining = sut.shutdown(timeout=0.05)
+        sut.submit(SignupEvent(3, 'after shutdown'))
+        release.set()
+        # THEN
+        assert remaining == 1
+        spill = SpillQueue(path)
+        claimed = [spill.claim(), spill.claim(), spill.claim()]
+        assert [claimed[0].event, claimed[1].event, claimed[2]] == [
+            SignupEvent(2, 'queued'), SignupEvent(3, 'after shutdown'), None]
+
+    # 退避先の無いspillは受け付けないか
+    def test_invalid(self, registry):
+        with pytest.raises(ValueError):
+            HookWorkerPool(registry, overflow='spill')
+
+
+@pytest.mark.django_db
+class TestDispatchPostSignup:
+    """ ユーザ登録が確定した後に、登録後の処理を実行するか検証 """
+
+    # 確定するまではワーカへ渡さず、確定後に実行するか
+    def test_save(self, monkeypatch, registry, django_capture_on_commit_callbacks):
+        # GIVEN
+        events = []
+        registry.register(events.append)
+        pool = HookWorkerPool(registry, workers=1, queue_size=10, overflow='drop', poll_interval=0.01)
+        monkeypatch.setattr(hooks, 'POST_SIGNUP_HOOKS', registry)
+        monkeypatch.setattr(hooks, 'POST_SIGNUP_POOL', pool)
+        with user_creation():
+            # WHEN
+            with django_capture_on_commit_callbacks(execute=True):
+                user = SaveAction()('Django')
+                submitted_before_commit = pool.stats().submitted
+            pool.shutdown(timeout=5)
+            # THEN
+            assert submitted_before_commit == 0
+            assert events == [SignupEvent(user.id, 'Django')]
@@ -0,0 +1,25 @@
+from signup.models import User
+
+
+class TestUser:
+    """ ユーザModelを辞書のキー・集合の要素として扱えるか検証 """
+
+    # 等価なユーザは同じハッシュ値となり、集合で重複が除かれるか
+    def test_hash(self):
+        # GIVEN
+        users = [User(username='Django'), User(username='Django'), User(username='Python')]
+        expected = {'Django', 'Python'}
+        # WHEN
+        actual = {user.username for user in set(users)}
+        # THEN
+        assert actual == expected
+        assert hash(users[0]) == hash(users[1])
+
+    # ユーザ以外との比較は等価とならないか
+    def test_eq_other(self):
+        # GIVEN
+        sut = User(username='Django')
+        # WHEN
+        actual = sut == 'Django'
+        # THEN
+        assert actual is False
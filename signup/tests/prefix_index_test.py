@@ -0,0 +1,57 @@
+from signup.prefix_index import PrefixIndex, SortedStringArray
+
+
+class TestSortedStringArray:
+    """ 詰めて保持した文字列を前方一致で検索できるか検証 """
+
+    # 前方一致する文字列を昇順に返却し、重複を取り除くか
+    def test_iter_prefix(self):
+        # GIVEN
+        sut = SortedStringArray(['django', 'dj', 'python', 'djangoプロジェクト', 'django', 'deno'])
+        expected = ['dj', 'django', 'djangoプロジェクト']
+        # WHEN
+        actual = list(sut.iter_prefix('dj'))
+        # THEN
+        assert actual == expected
+        assert len(sut) == 5
+
+    # 整列済みとして渡した文字列をそのまま保持するか
+    def test_presorted(self):
+        # GIVEN
+        strings = ['a', 'ab', 'b']
+        # WHEN
+        sut = SortedStringArray(iter(strings), presorted=True)
+        # THEN
+        assert list(sut) == strings
+        assert sut.nbytes == 4 + 4 * 4
+
+
+class TestPrefixIndex:
+    """ 追加・削除を反映して前方一致で検索できるか検証 """
+
+    # 追加分・削除分を反映した結果を、指定の件数まで返却するか
+    def test_search(self):
+        # GIVEN
+        sut = PrefixIndex(['django', 'dj', 'deno'])
+        # WHEN
+        sut.add('djinn')
+        sut.add('django')
+        sut.discard('dj')
+        actual = sut.search('dj', 2)
+        # THEN
+        assert actual == ['django', 'djinn']
+        assert len(sut) == 3
+
+    # 追加分がたまると詰め直し、検索結果は変わらないか
+    def test_compact(self):
+        # GIVEN
+        sut = PrefixIndex()
+        usernames = [f'user{number:05d}' for number in range(PrefixIndex.MIN_PENDING + 1)]
+        # WHEN
+        for username in reversed(usernames):
+            sut.add(username)
+        sut.discard('user00001')
+        actual = sut.search('user0000', 5)
+        # THEN
+        assert sut.compactions == 1
+        assert actual == ['user00000', 'user00002', 'user00003', 'user00004', 'user00005']
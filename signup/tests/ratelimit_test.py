@@ -0,0 +1,120 @@
+import multiprocessing
+import uuid
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from signup.ratelimit import SharedTokenBuckets, client_ip, rate_limited
+
+
+@pytest.fixture
+def buckets_name():
+    """ 他のテストと共有メモリを共有しないよう、テストごとに名前を分ける """
+    name = f'signup_test_{uuid.uuid4().hex[:12]}'
+    yield name
+    SharedTokenBuckets(name, 1, 1, slots=64, stripes=4).unlink()
+
+
+def consume_many(name: str, times: int, results):
+    """ 別のプロセスからトークンを取り出す """
+    buckets = SharedTokenBuckets(name, 0.001, 100, slots=64, stripes=4)
+    results.put(sum(buckets.consume('client').allowed for _ in range(times)))
+
+
+class TestSharedTokenBuckets:
+    """ キーごとのトークンバケツで流量を制限できるか検証 """
+
+    # 最大数まで受け付けた後は制限し、補充されるまでの秒数を返却するか
+    def test_burst(self, buckets_name):
+        # GIVEN
+        sut = SharedTokenBuckets(buckets_name, rate=0.5, burst=3, slots=64, stripes=4)
+        # WHEN
+        actual = [sut.consume('client') for _ in range(4)]
+        # THEN
+        assert [result.allowed for result in actual] == [True, True, True, False]
+        assert 0 < actual[-1].retry_after <= 2
+        assert sut.consume('other').allowed
+
+    # 時間の経過に応じてトークンを補充するか
+    def test_refill(self, buckets_name, monkeypatch):
+        # GIVEN
+        now = [1000.0]
+        monkeypatch.setattr('signup.ratelimit.time.monotonic', lambda: now[0])
+        sut = SharedTokenBuckets(buckets_name, rate=2, burst=1, slots=64, stripes=4)
+        sut.consume('client')
+        # WHEN
+        denied = sut.consume('client').allowed
+        now[0] += 0.5
+        allowed = sut.consume('client').allowed
+        # THEN
+        assert (denied, allowed) == (False, True)
+
+    # 複数のプロセスから同時に取り出しても、合計で最大数までしか受け付けないか
+    def test_processes(self, buckets_name):
+        # GIVEN
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=consume_many, args=(buckets_name, 60, results)) for _ in range(4)]
+        # WHEN
+        for process in processes:
+            process.start()
+        actual = sum(results.get(timeout=10) for _ in processes)
+        for process in processes:
+            process.join()
+        # THEN
+        assert actual == 100
+
+
+class TestRateLimited:
+    """ ビューへ流量制限をかけられるか検証 """
+
+    # 制限したときはビューを呼ばず、429とRetry-Afterを返却するか
+    def test_decorator(self, buckets_name):
+        # GIVEN
+        calls = []
+        buckets = SharedTokenBuckets(buckets_name, rate=1, burst=1, slots=64, stripes=4)
+
+        @rate_limited(buckets, client_ip)
+        def view(request):
+            calls.append(request)
+            return HttpResponse()
+
+        request = RequestFactory().post('/save', {'username': 'Django'})
+        # WHEN
+        first = view(request)
+        second = view(request)
+        # THEN
+        assert (first.status_code, second.status_code) == (200, 429)
+        assert second['Retry-After'] == '1'
+        assert len(calls) == 1
+
+
+class TestClientIp:
+    """ 送信元IPを取得できるか検証 """
+
+    # 信頼するリバースプロキシを経由したときのみ、X-Forwarded-Forから送信元を取得するか
+    @pytest.mark.parametrize('remote_addr, forwarded_for, expected', [
+        ('203.0.113.1', '198.51.100.1', '203.0.113.1'),
+        ('10.0.0.1', '198.51.100.1', '198.51.100.1'),
+        ('10.0.0.1', 'spoofed, 198.51.100.1, 10.0.0.2', '198.51.100.1'),
+        ('10.0.0.1', '', '10.0.0.1'),
+        ('10.0.0.1', '10.0.0.3, 10.0.0.2', '10.0.0.3'),
+    ])
+    @override_settings(SIGNUP_RATE_LIMIT_TRUSTED_PROXIES=('10.0.0.0/8',))
+    def test_trusted_proxies(self, remote_addr, forwarded_for, expected):
+        # GIVEN
+        request = RequestFactory().post('/save', REMOTE_ADDR=remote_addr, HTTP_X_FORWARDED_FOR=forwarded_for)
+        # WHEN
+        actual = client_ip(request)
+        # THEN
+        assert actual == expected
+
+    # 信頼するリバースプロキシを指定しなければ、X-Forwarded-Forを無視するか
+    def test_ignore_forwarded_for(self):
+        # GIVEN
+        request = RequestFactory().post('/save', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1')
+        # WHEN
+        actual = client_ip(request)
+        # THEN
+        assert actual == '10.0.0.1'
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from signup.models import User
+from signup.result_cache import RESULT_PAGE_CACHE, ResultPageCache
+from .data.user import user_exists
+
+
+class TestResultPageCache:
+    """ 描画した画面をキャッシュし、同時に要求されても1度のみ描画するか検証 """
+
+    # 2回目以降は描画せずにキャッシュした画面を返却するか
+    def test_get(self):
+        # GIVEN
+        sut = ResultPageCache('default', timeout=60, lock_timeout=5)
+        rendered = []
+
+        def render():
+            rendered.append(1)
+            return '<p>Django</p>'
+
+        # WHEN
+        actual = [sut.get(1, render) for _ in range(3)]
+        # THEN
+        assert actual == ['<p>Django</p>'] * 3
+        assert len(rendered) == 1
+        assert sut.stats()[:3] == (2, 1, 1)
+
+    # キャッシュされていない画面を同時に要求されたとき、1度のみ描画するか
+    def test_stampede(self):
+        # GIVEN
+        sut = ResultPageCache('default', timeout=60, lock_timeout=5)
+        rendered = []
+        results = []
+
+        def render():
+            rendered.append(1)
+            time.sleep(0.1)
+            return '<p>Django</p>'
+
+        threads = [threading.Thread(target=lambda: results.append(sut.get(1, render))) for _ in range(10)]
+        # WHEN
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # THEN
+        assert len(rendered) == 1
+        assert results == ['<p>Django</p>'] * 10
+        assert sut.stats().waits == 9
+
+    # 描画中に破棄されたとき、描画し終えた古い画面を返却しないか
+    def test_invalidate_while_rendering(self):
+        # GIVEN
+        sut = ResultPageCache('default', timeout=60, lock_timeout=5)
+
+        def stale_render():
+            sut.invalidate(1)
+            return '<p>old</p>'
+
+        sut.get(1, stale_render)
+        # WHEN
+        actual = sut.get(1, lambda: '<p>new</p>')
+        # THEN
+        assert actual == '<p>new</p>'
+
+    # 描画に失敗したユーザについては、世代を作らないか
+    def test_no_generation_on_failure(self):
+        # GIVEN
+        sut = ResultPageCache('default', timeout=60, lock_timeout=5)
+
+        def render():
+            raise User.DoesNotExist
+
+        # WHEN
+        with pytest.raises(User.DoesNotExist):
+            sut.get(404, render)
+        # THEN
+        assert sut.cache.get('signup:result:404:generation') is None
+        assert sut.cache.get('signup:result:404:lock') is None
+
+
+@pytest.mark.django_db
+class TestInvalidation:
+    """ ユーザ情報の更新・削除に合わせてキャッシュした画面を破棄するか検証 """
+
+    # 更新後は新しいユーザ名で描画するか
+    def test_save(self):
+        with user_exists() as user:
+            # GIVEN
+            RESULT_PAGE_CACHE.get(user.id, lambda: user.username)
+            user.username = 'Python'
+            # WHEN
+            user.save()
+            actual = RESULT_PAGE_CACHE.get(user.id, lambda: user.username)
+            # THEN
+            assert actual == 'Python'
+
+    # 削除後はキャッシュした画面を返却しないか
+    def test_delete(self):
+        with user_exists() as user:
+            # GIVEN
+            user_id = user.id
+            RESULT_PAGE_CACHE.get(user_id, lambda: 'cached')
+            # WHEN
+            User.objects.filter(id=user_id).delete()
+            actual = RESULT_PAGE_CACHE.get(user_id, lambda: 'rendered')
+            # THEN
+            assert actual == 'rendered'
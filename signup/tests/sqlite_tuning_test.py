@@ -0,0 +1,42 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from signup.sqlite_tuning import sqlite_pragmas
+from signup.usecase.synthetic import relaxed_sqlite_pragmas
+
+
+@pytest.fixture
+def file_connection(tmp_path):
+    """ WALを設定できるよう、ファイルのSQLiteへの接続を別に作る """
+    db = DatabaseWrapper({**connection.settings_dict, 'NAME': str(tmp_path / 'tuning.sqlite3')}, alias='tuning')
+    yield db
+    db.close()
+
+
+class TestConfigureSqlite:
+    """ SQLiteへ接続するたびにプラグマを設定するか検証 """
+
+    # 接続したときに、設定のプラグマとなるか
+    def test_configure(self, file_connection):
+        # WHEN
+        actual = sqlite_pragmas(file_connection)
+        # THEN
+        assert actual == {
+            'journal_mode': 'wal',
+            'synchronous': '1',
+            'mmap_size': str(256 * 1024 * 1024),
+            'cache_size': str(-64 * 1024),
+        }
+
+    # 登録の間にプラグマを緩めても、WALのまま元の値へ戻すか
+    def test_relaxed(self, file_connection):
+        # GIVEN
+        expected = sqlite_pragmas(file_connection)
+        # WHEN
+        with relaxed_sqlite_pragmas(file_connection):
+            relaxed = sqlite_pragmas(file_connection)
+        actual = sqlite_pragmas(file_connection)
+        # THEN
+        assert (relaxed['journal_mode'], relaxed['synchronous']) == ('wal', '0')
+        assert actual == expected
@@ -0,0 +1,21 @@
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from signup import static_export
+
+
+class TestExportStaticPages:
+    """ 訪問者ごとに内容が変わる画面を書き出さないか検証 """
+
+    # CSRFトークンのCookieを発行するユーザ登録画面は、理由を添えて書き出さないか
+    def test_skip_csrf(self, tmp_path: Path):
+        # GIVEN
+        stdout = StringIO()
+        expected = 'skipped  /signup/ (ユーザ登録:トップ): sets cookies (csrftoken)'
+        # WHEN
+        call_command('export_static_pages', '--output', str(tmp_path), '--host', 'testserver', stdout=stdout)
+        # THEN
+        assert expected in stdout.getvalue()
+        assert static_export.read_manifest(tmp_path) == []
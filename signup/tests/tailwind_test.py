@@ -0,0 +1,16 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+
+class TestBuildTailwindCss:
+    """ 書き出し済みのスタイルシートがテンプレートと一致しているか検証 """
+
+    # テンプレートを変更したあと、スタイルシートを生成し直しているか
+    def test_up_to_date(self):
+        # GIVEN
+        stdout = StringIO()
+        # WHEN
+        call_command('build_tailwind_css', '--check', stdout=stdout)
+        # THEN
+        assert stdout.getvalue() == ''
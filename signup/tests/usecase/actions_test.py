@@ -1,7 +1,8 @@
 import pytest
 
-from signup.usecase.actions import SaveAction, ResultViewAction
+from signup.usecase.actions import SaveAction, ResultViewAction, BatchResultViewAction
 from signup.models import User
+from signup.usecase.identity_map import LOOKUP_CHUNK_SIZE, identity_scope
 from ..data.user import user_creation, user_exists
 
 
@@ -37,3 +38,43 @@ class TestResultViewAction:
             actual = sut(user.id)
             # THEN
             assert actual == expected
+
+
+@pytest.mark.django_db
+class TestBatchResultViewAction:
+    """ 複数のユーザ情報をまとめて構築できるか検証 """
+
+    # 指定された順に返却し、存在しないユーザはNoneとするか
+    def test_view(self, django_assert_num_queries):
+        # GIVEN
+        sut = BatchResultViewAction()
+        with user_exists() as user:
+            missing_id = user.id + 1
+            # WHEN
+            with django_assert_num_queries(1):
+                actual = sut([missing_id, user.id, user.id])
+            # THEN
+            assert actual == [None, user, user]
+
+    # IN句へ含める件数を超えたときは、区切って問い合わせるか
+    def test_chunk(self, django_assert_num_queries):
+        # GIVEN
+        sut = BatchResultViewAction()
+        user_ids = list(range(1, LOOKUP_CHUNK_SIZE * 2 + 2))
+        # WHEN
+        with django_assert_num_queries(3):
+            actual = sut(user_ids)
+        # THEN
+        assert actual == [None] * len(user_ids)
+
+    # identity_scopeの中では、読み込み済みのユーザを問い合わせないか
+    def test_identity_scope(self, django_assert_num_queries):
+        # GIVEN
+        sut = BatchResultViewAction()
+        with user_exists() as user, identity_scope():
+            loaded = ResultViewAction()(user.id)['user']
+            # WHEN
+            with django_assert_num_queries(0):
+                actual = sut([user.id])
+            # THEN
+            assert actual[0] is loaded
@@ -0,0 +1,49 @@
+import pytest
+
+from signup.models import User
+from signup.usecase.actions import SaveAction
+from signup.usecase.autocomplete import USERNAME_INDEX, UsernameIndex
+from ..data.user import user_creation
+
+
+@pytest.mark.django_db
+class TestUsernameIndex:
+    """ ユーザ名の前方一致検索をDBへ問い合わせずに処理できるか検証 """
+
+    # Userテーブルから組み立てた索引で、問い合わせずに検索するか
+    def test_search(self, django_assert_num_queries):
+        # GIVEN
+        sut = UsernameIndex(refresh_interval=None)
+        with user_creation():
+            User.objects.bulk_create([User(username=username) for username in ('Django', 'Deno', 'Dart', 'Python')])
+            sut.build()
+            # WHEN
+            with django_assert_num_queries(0):
+                actual = sut.search('D', 2)
+            # THEN
+            assert actual == ['Dart', 'Deno']
+
+    # 他のプロセスが登録したユーザ名を、読み込む間隔を過ぎてから反映するか
+    def test_refresh(self):
+        # GIVEN
+        sut = UsernameIndex(refresh_interval=0)
+        with user_creation():
+            sut.build()
+            User.objects.create(username='Django')
+            # WHEN
+            actual = sut.search('Dj', 10)
+            # THEN
+            assert actual == ['Django']
+
+    # 登録処理で登録・削除したユーザ名を反映するか
+    def test_save_and_delete(self):
+        with user_creation():
+            # GIVEN
+            USERNAME_INDEX.build()
+            user = SaveAction()('Django')
+            SaveAction()('Djinn')
+            # WHEN
+            user.delete()
+            actual = USERNAME_INDEX.search('Dj', 10)
+            # THEN
+            assert actual == ['Djinn']
@@ -0,0 +1,80 @@
+import pytest
+
+from signup.models import User
+from signup.usecase.actions import SaveAction
+from signup.usecase.availability import USERNAME_FILTER, UsernameFilter
+from ..data.user import user_creation, user_exists
+
+
+@pytest.mark.django_db
+class TestUsernameFilter:
+    """ ユーザ名が使えるかを、Bloomフィルタを前段に置いて判定できるか検証 """
+
+    # フィルタに含まれないユーザ名は、DBへ問い合わせずに使えると判定するか
+    def test_negative(self, django_assert_num_queries):
+        # GIVEN
+        sut = UsernameFilter(0.01, 100, refresh_interval=None)
+        with user_exists():
+            sut.build()
+            # WHEN
+            with django_assert_num_queries(0):
+                actual = sut.is_available('Python')
+            # THEN
+            assert actual is True
+            assert sut.stats().negatives == 1
+
+    # フィルタに含まれるユーザ名は、DBで登録済みか確かめるか
+    def test_positive(self):
+        # GIVEN
+        sut = UsernameFilter(0.01, 100, refresh_interval=None)
+        with user_exists() as user:
+            sut.build()
+            sut.add('Python')
+            # WHEN
+            actual = (sut.is_available(user.username), sut.is_available('Python'))
+            stats = sut.stats()
+            # THEN
+            assert actual == (False, True)
+            assert (stats.database_checks, stats.false_positives) == (2, 1)
+
+    # 他のプロセスが登録したユーザ名を、読み込む間隔を過ぎてから反映するか
+    def test_refresh(self):
+        # GIVEN
+        sut = UsernameFilter(0.01, 100, refresh_interval=0)
+        with user_creation():
+            sut.build()
+            User.objects.create(username='Django')
+            # WHEN
+            actual = sut.is_available('Django')
+            # THEN
+            assert actual is False
+            assert sut.stats().items == 1
+
+    # 容量を超えたときは、大きなフィルタで組み立て直すか
+    def test_rebuild(self):
+        # GIVEN
+        sut = UsernameFilter(0.01, 2, refresh_interval=None)
+        with user_creation():
+            User.objects.bulk_create([User(username=f'user{index}') for index in range(3)])
+            sut.build()
+            # WHEN
+            for index in range(3, 10):
+                User.objects.create(username=f'user{index}')
+                sut.add(f'user{index}')
+            stats = sut.stats()
+            # THEN
+            assert stats.builds > 1
+            assert stats.capacity >= stats.items
+            assert not any(sut.is_available(f'user{index}') for index in range(10))
+
+    # 登録処理で登録したユーザ名を反映するか
+    def test_save_action(self):
+        # GIVEN
+        with user_creation():
+            USERNAME_FILTER.build()
+            # WHEN
+            SaveAction()('Django')
+            actual = USERNAME_FILTER.is_available('Django')
+            # THEN
+            assert actual is False
+            assert USERNAME_FILTER.stats().items == 1
@@ -0,0 +1,142 @@
+import io
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError
+from pytest import MonkeyPatch
+
+from signup.models import User
+from signup.usecase.bulk_import import BulkImportAction, ParsedRow, open_text, parse_csv, parse_ndjson
+from ..data.user import user_creation, user_exists
+
+
+class TestParseCsv:
+    """ CSVからユーザ名を読み込めるか検証 """
+
+    # 見出しの列をユーザ名とし、登録できない行を理由とともに返却するか
+    def test_parse(self):
+        # GIVEN
+        lines = io.StringIO('id,username\n1,Django\n2,\n3\n4,"Py,thon"\n')
+        expected = [
+            ParsedRow(2, 'Django'),
+            ParsedRow(3, '', 'empty username'),
+            ParsedRow(4, '3', 'missing username column'),
+            ParsedRow(5, 'Py,thon'),
+        ]
+        # WHEN
+        actual = list(parse_csv(lines))
+        # THEN
+        assert actual == expected
+
+    # 見出しが無ければ1列目をユーザ名とし、BOMを取り除くか
+    def test_without_header(self):
+        # GIVEN
+        lines = open_text(io.BytesIO('﻿Django\r\nPython\r\n'.encode('utf-8')))
+        expected = [ParsedRow(1, 'Django'), ParsedRow(2, 'Python')]
+        # WHEN
+        actual = list(parse_csv(lines))
+        # THEN
+        assert actual == expected
+
+
+class TestParseNdjson:
+    """ NDJSONからユーザ名を読み込めるか検証 """
+
+    # オブジェクト・文字列のいずれの行も読み込み、不正な行を理由とともに返却するか
+    def test_parse(self):
+        # GIVEN
+        lines = io.StringIO('{"username": "Django"}\n"Python"\n\n{"username": 1}\n{broken\n')
+        expected = [
+            (1, 'Django', ''),
+            (2, 'Python', ''),
+            (4, '{"username": 1}', 'username must be a string'),
+        ]
+        # WHEN
+        actual = list(parse_ndjson(lines))
+        # THEN
+        assert actual[:3] == expected
+        assert actual[3].line == 5
+        assert actual[3].error.startswith('invalid JSON')
+
+
+@pytest.mark.django_db
+class TestBulkImportAction:
+    """ ユーザ情報をバッチ単位で登録できるか検証 """
+
+    # バッチごとに登録結果を返却し、すべての行を登録するか
+    def test_import(self):
+        # GIVEN
+        rows = [ParsedRow(line, f'user{line}') for line in range(1, 8)] + [ParsedRow(8, '', 'empty username')]
+        sut = BulkImportAction(batch_size=3, batches_per_transaction=2)
+        expected_progress = [(1, 3, 3), (2, 3, 6), (3, 1, 7)]
+        with user_creation():
+            # WHEN
+            results = list(sut(rows))
+            actual_progress = [(result.batch, result.inserted, result.total_inserted) for result in results]
+            # THEN
+            assert actual_progress == expected_progress
+            assert results[-1].errors == [rows[-1]]
+            assert User.objects.count() == 7
+
+    # 登録済み・ファイル内で重複するユーザ名をエラー行とし、それ以外を登録するか
+    def test_duplicate(self):
+        # GIVEN
+        rows = [ParsedRow(1, 'Django'), ParsedRow(2, 'Python'), ParsedRow(3, 'Ruby'), ParsedRow(4, 'Python')]
+        sut = BulkImportAction(batch_size=2, batches_per_transaction=2)
+        expected_errors = [ParsedRow(1, 'Django', 'username already taken'),
+                           ParsedRow(4, 'Python', 'username already taken')]
+        with user_exists():
+            # WHEN
+            results = list(sut(rows))
+            actual_errors = [row for result in results for row in result.errors]
+            # THEN
+            assert actual_errors == expected_errors
+            assert results[-1].total_inserted == 2
+            assert sorted(User.objects.values_list('username', flat=True)) == ['Django', 'Python', 'Ruby']
+
+    # 失敗したトランザクションのみを取り消し、それまでに確定した行は残すか
+    def test_chunked_transaction(self, monkeypatch: MonkeyPatch):
+        # GIVEN
+        rows = [ParsedRow(line, f'user{line}') for line in range(1, 9)]
+        sut = BulkImportAction(batch_size=2, batches_per_transaction=2)
+        bulk_create = User.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(users, **kwargs):
+            calls.append(len(users))
+            if len(calls) == 4:
+                raise DatabaseError('disk full')
+            return bulk_create(users, **kwargs)
+
+        monkeypatch.setattr(User.objects, 'bulk_create', failing_bulk_create)
+        with user_creation():
+            # WHEN
+            results = []
+            with pytest.raises(DatabaseError):
+                for result in sut(rows):
+                    results.append(result)
+            # THEN
+            assert [result.total_inserted for result in results] == [2, 4]
+            assert User.objects.count() == 4
+
+
+@pytest.mark.django_db
+class TestImportUsersCommand:
+    """ ファイルからユーザ情報を一括登録できるか検証 """
+
+    # バッチごとの進捗・エラー行を出力するか
+    def test_import(self, tmp_path):
+        # GIVEN
+        path = tmp_path / 'users.ndjson'
+        path.write_text('{"username": "Django"}\n{"username": ""}\n"Python"\n', encoding='utf-8')
+        stdout = StringIO()
+        stderr = StringIO()
+        with user_creation():
+            # WHEN
+            call_command('import_users', str(path), '--batch-size', '2', stdout=stdout, stderr=stderr)
+            actual = sorted(User.objects.values_list('username', flat=True))
+            # THEN
+            assert actual == ['Django', 'Python']
+            assert 'batch 2: inserted 1 (total 2, errors 1' in stdout.getvalue()
+            assert "line 2: empty username: ''" in stderr.getvalue()
@@ -0,0 +1,87 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+
+from signup.models import User, UserCounter
+from signup.usecase.actions import SaveAction
+from signup.usecase.bulk_import import BulkImportAction, ParsedRow
+from signup.usecase.counter import increment_user_count, reconcile_user_count, user_count
+from ..data.user import user_creation
+
+
+@pytest.mark.django_db
+class TestUserCounter:
+    """ 登録・削除と同じトランザクションでユーザ数を数えられるか検証 """
+
+    # 登録・削除のたびに、いずれかの行を増減させて合計がユーザ数と一致するか
+    def test_save_and_delete(self, settings):
+        # GIVEN
+        settings.SIGNUP_USER_COUNTER_SHARDS = 4
+        with user_creation():
+            users = [SaveAction()(f'user{number}') for number in range(10)]
+            # WHEN
+            users[0].delete()
+            # THEN
+            assert user_count() == 9 == User.objects.count()
+            assert UserCounter.objects.filter(count__gt=0).count() > 1
+
+    # 登録に失敗したときは数えないか
+    def test_rollback(self):
+        with user_creation():
+            # GIVEN
+            SaveAction()('Django')
+            # WHEN
+            with pytest.raises(IntegrityError):
+                SaveAction()('Django')
+            # THEN
+            assert user_count() == 1
+
+    # 一括登録で登録した件数を数えるか
+    def test_bulk_import(self):
+        # GIVEN
+        rows = [ParsedRow(line, f'user{line}') for line in range(1, 6)]
+        with user_creation():
+            # WHEN
+            list(BulkImportAction(batch_size=2)(rows))
+            # THEN
+            assert user_count() == 5
+
+    # 行が無ければ作成して数えるか
+    def test_missing_shard(self):
+        # GIVEN
+        UserCounter.objects.all().delete()
+        # WHEN
+        increment_user_count(3, key=5)
+        # THEN
+        assert user_count() == 3
+
+
+@pytest.mark.django_db
+class TestReconcile:
+    """ 数えたユーザ数を実際の件数と突き合わせられるか検証 """
+
+    # 差があれば実際の件数へ直すか
+    def test_fix(self):
+        with user_creation():
+            # GIVEN
+            User.objects.bulk_create([User(username='Django'), User(username='Python')])
+            # WHEN
+            result = reconcile_user_count()
+            # THEN
+            assert (result.counted, result.actual, result.drift) == (0, 2, -2)
+            assert user_count() == 2
+
+    # --checkでは直さずにエラーとするか
+    def test_check_command(self):
+        with user_creation():
+            # GIVEN
+            User.objects.create(username='Django')
+            stdout = StringIO()
+            # WHEN
+            with pytest.raises(CommandError):
+                call_command('reconcile_user_count', '--check', stdout=stdout)
+            # THEN
+            assert 'drift -1' in stdout.getvalue()
+            assert user_count() == 0
@@ -0,0 +1,110 @@
+import gzip
+import io
+import json
+import tracemalloc
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from signup.models import User
+from signup.usecase.bulk_import import open_text, parse_rows
+from signup.usecase.export import UserExportAction
+from signup.usecase.synthetic import generate_usernames, load_usernames
+from ..data.user import user_creation
+
+
+def export(action: UserExportAction) -> bytes:
+    return b''.join(action())
+
+
+@pytest.mark.django_db
+class TestUserExportAction:
+    """ 全ユーザを一定数ずつ読み込みながら書き出せるか検証 """
+
+    # CSVへ書き出した内容を、一括登録でそのまま読み込めるか
+    def test_csv(self):
+        # GIVEN
+        usernames = ['Django', 'a,b', '"quoted"', 'あ']
+        with user_creation():
+            User.objects.bulk_create([User(username=username) for username in usernames])
+            # WHEN
+            actual = export(UserExportAction('csv', chunk_size=3))
+            # THEN
+            rows = list(parse_rows(open_text(io.BytesIO(actual)), 'csv'))
+            assert actual.startswith(b'id,username\n')
+            assert [row.value for row in rows] == usernames
+
+    # NDJSONの各行へ主キー・ユーザ名を書き出すか
+    def test_ndjson(self):
+        with user_creation():
+            # GIVEN
+            user = User.objects.create(username='Django')
+            # WHEN
+            actual = export(UserExportAction('ndjson'))
+            # THEN
+            assert [json.loads(line) for line in actual.splitlines()] == [{'id': user.id, 'username': 'Django'}]
+
+    # 圧縮しても、展開すれば同じ内容となるか
+    def test_gzip(self):
+        with user_creation():
+            # GIVEN
+            User.objects.bulk_create([User(username=f'user{number}') for number in range(100)])
+            # WHEN
+            actual = export(UserExportAction('csv', chunk_size=7, compress=True))
+            # THEN
+            assert gzip.decompress(actual) == export(UserExportAction('csv'))
+
+    # ユーザがいなければ見出しのみとなるか
+    def test_empty(self):
+        # WHEN
+        actual = export(UserExportAction('csv'))
+        # THEN
+        assert actual == b'id,username\n'
+
+    # 不正な形式・件数は受け付けないか
+    @pytest.mark.parametrize('file_format, chunk_size', [('xml', 10), ('csv', 0)])
+    def test_invalid(self, file_format, chunk_size):
+        with pytest.raises(ValueError):
+            UserExportAction(file_format, chunk_size)
+
+    # 100万件を書き出しても、使うメモリが書き出す大きさに比例しないか
+    @pytest.mark.slow
+    @pytest.mark.parametrize('file_format, compress', [('csv', False), ('ndjson', True)])
+    def test_flat_memory(self, file_format, compress):
+        # GIVEN
+        rows = 1_000_000
+        for _ in load_usernames(generate_usernames(rows)):
+            pass
+        action = UserExportAction(file_format, chunk_size=2000, compress=compress)
+        written = 0
+        # WHEN
+        tracemalloc.start()
+        try:
+            for chunk in action():
+                written += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # THEN
+        assert written > 1024 * 1024
+        assert peak < 4 * 1024 * 1024
+
+
+@pytest.mark.django_db
+class TestExportUsersCommand:
+    """ 全ユーザをファイルへ書き出せるか検証 """
+
+    # 拡張子から形式・圧縮を決めて書き出すか
+    def test_command(self, tmp_path):
+        # GIVEN
+        path = tmp_path / 'users.ndjson.gz'
+        stdout = StringIO()
+        with user_creation():
+            User.objects.create(username='Django')
+            # WHEN
+            call_command('export_users', str(path), stdout=stdout)
+            # THEN
+            assert [json.loads(line)['username'] for line in gzip.decompress(path.read_bytes()).splitlines()] == [
+                'Django']
+            assert 'exported users' in stdout.getvalue()
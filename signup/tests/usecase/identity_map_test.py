@@ -0,0 +1,73 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from signup.middleware import IdentityMapMiddleware
+from signup.models import User
+from signup.usecase.actions import ResultViewAction
+from signup.usecase.identity_map import current_identity_map, identity_scope
+from ..data.user import user_exists
+
+
+@pytest.mark.django_db
+class TestIdentityMap:
+    """ 同じユーザを繰り返し参照したとき、同じインスタンスを問い合わせずに返却するか検証 """
+
+    # identity_scopeの中では、最初の1回のみ問い合わせるか
+    def test_scope(self, django_assert_num_queries):
+        # GIVEN
+        sut = ResultViewAction()
+        with user_exists() as user:
+            # WHEN
+            with identity_scope() as identity_map, django_assert_num_queries(1):
+                actual = [sut(user.id)['user'] for _ in range(3)]
+            # THEN
+            assert all(item is actual[0] for item in actual)
+            assert (identity_map.hits, identity_map.misses) == (2, 1)
+
+    # identity_scopeの外では、呼び出すたびに問い合わせるか
+    def test_without_scope(self, django_assert_num_queries):
+        # GIVEN
+        sut = ResultViewAction()
+        with user_exists() as user:
+            # WHEN
+            with django_assert_num_queries(3):
+                actual = [sut(user.id)['user'] for _ in range(3)]
+            # THEN
+            assert actual[0] is not actual[1]
+
+    # 保存・削除したユーザを反映するか
+    def test_signals(self, django_assert_num_queries):
+        with user_exists() as user:
+            with identity_scope() as identity_map:
+                # GIVEN
+                saved = User.objects.get(id=user.id)
+                saved.username = 'Python'
+                # WHEN
+                saved.save()
+                with django_assert_num_queries(0):
+                    actual = ResultViewAction()(user.id)['user']
+                saved.delete()
+                # THEN
+                assert actual is saved
+                assert user.id not in identity_map
+
+
+class TestIdentityMapMiddleware:
+    """ リクエストごとにIdentityMapを有効にするか検証 """
+
+    # リクエストの処理中のみIdentityMapを参照できるか
+    def test_request(self):
+        # GIVEN
+        scopes = []
+
+        def get_response(request):
+            scopes.append(current_identity_map())
+            return HttpResponse()
+
+        sut = IdentityMapMiddleware(get_response)
+        # WHEN
+        sut(RequestFactory().get('/'))
+        # THEN
+        assert scopes[0] is not None
+        assert current_identity_map() is None
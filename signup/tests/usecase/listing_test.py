@@ -0,0 +1,86 @@
+import pytest
+
+from signup.models import User
+from signup.usecase.listing import InvalidCursorError, UserListAction, decode_cursor, encode_cursor
+from ..data.user import user_creation
+
+
+def create_users(count: int) -> list[int]:
+    """
+    連番のユーザ名でユーザを登録
+
+    :param count: 件数
+    :return: 登録したユーザのID
+    """
+    User.objects.bulk_create([User(username=f'user{number:02d}') for number in range(count)])
+    return list(User.objects.order_by('id').values_list('id', flat=True))
+
+
+class TestCursor:
+    """ カーソルを組み立て・解釈できるか検証 """
+
+    # 組み立てたカーソルから、読む向き・境界の主キーを取り出せるか
+    def test_round_trip(self):
+        # GIVEN
+        expected = ('p', 5_000_000)
+        # WHEN
+        actual = decode_cursor(encode_cursor(*expected))
+        # THEN
+        assert actual == expected
+
+    # 解釈できないカーソルであれば例外を送出するか
+    @pytest.mark.parametrize('cursor', ['broken', encode_cursor('x', 1), encode_cursor('n', -1), 'WyJuIix0cnVlXQ'])
+    def test_invalid(self, cursor):
+        # WHEN / THEN
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.django_db
+class TestUserListAction:
+    """ 主キーを境界としてユーザ一覧のページを組み立てられるか検証 """
+
+    # 次のページへのカーソルをたどり、すべてのユーザを1度ずつ読めるか
+    def test_forward(self):
+        # GIVEN
+        sut = UserListAction(page_size=3)
+        with user_creation():
+            ids = create_users(7)
+            # WHEN
+            pages = [sut()]
+            while pages[-1].next_cursor:
+                pages.append(sut(pages[-1].next_cursor))
+            # THEN
+            assert [[user.id for user in page.users] for page in pages] == [ids[0:3], ids[3:6], ids[6:7]]
+            assert pages[0].previous_cursor is None
+            assert all(page.previous_cursor for page in pages[1:])
+
+    # 前のページへのカーソルで、直前のページと同じユーザを読めるか
+    def test_backward(self):
+        # GIVEN
+        sut = UserListAction(page_size=3)
+        with user_creation():
+            ids = create_users(7)
+            last = sut(sut(sut().next_cursor).next_cursor)
+            # WHEN
+            previous = sut(last.previous_cursor)
+            first = sut(previous.previous_cursor)
+            # THEN
+            assert [user.id for user in previous.users] == ids[3:6]
+            assert [user.id for user in first.users] == ids[0:3]
+            assert first.previous_cursor is None
+            assert first.next_cursor is not None
+
+    # 件数を数えず、1ページを定数回の問い合わせで組み立てるか
+    def test_no_count(self, django_assert_num_queries):
+        # GIVEN
+        sut = UserListAction(page_size=3)
+        with user_creation():
+            create_users(7)
+            cursor = sut().next_cursor
+            # WHEN
+            with django_assert_num_queries(2) as captured:
+                sut(cursor)
+            # THEN
+            assert not any('COUNT' in query['sql'].upper() for query in captured.captured_queries)
+            assert not any('OFFSET' in query['sql'].upper() for query in captured.captured_queries)
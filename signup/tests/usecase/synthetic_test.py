@@ -0,0 +1,80 @@
+import re
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from signup.models import User
+from signup.usecase.synthetic import STEMS, generate_usernames, generate_users
+from ..data.user import user_creation, user_exists
+
+
+class TestGenerateUsernames:
+    """ 指定の分布で重複しないユーザ名を生成できるか検証 """
+
+    # 同じ種からは同じユーザ名を生成し、重複しないか
+    @pytest.mark.parametrize('distribution', ['sequential', 'uniform', 'zipf'])
+    def test_repeatable(self, distribution):
+        # WHEN
+        first = list(generate_usernames(20_000, distribution, seed=1))
+        second = list(generate_usernames(20_000, distribution, seed=1))
+        # THEN
+        assert first == second
+        assert len(set(first)) == len(first)
+
+    # uniformでは語幹が指定の長さの英小文字となるか
+    def test_uniform(self):
+        # WHEN
+        actual = list(generate_usernames(1000, 'uniform', seed=1, start=1, min_length=3, max_length=5))
+        # THEN
+        assert all(re.fullmatch(r'[a-z]{3,5}\d+', username) for username in actual)
+
+    # zipfでは順位の高い語幹ほど多く選ばれるか
+    def test_zipf(self):
+        # WHEN
+        stems = Counter(re.match(r'\D+', username).group() for username in generate_usernames(20_000, 'zipf'))
+        # THEN
+        assert stems[STEMS[0]] > stems[STEMS[1]] > stems[STEMS[9]]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGenerateUsers:
+    """ 生成したユーザ名をまとめて登録できるか検証 """
+
+    # すべてのユーザ名を登録し、緩めたプラグマを元へ戻すか
+    def test_generate(self):
+        # GIVEN
+        usernames = list(generate_usernames(2500, 'uniform', seed=1))
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            expected_synchronous = cursor.fetchone()[0]
+        with user_creation():
+            # WHEN
+            result = generate_users(usernames, chunk_size=1000, rows_per_transaction=2000)
+            # THEN
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                assert cursor.fetchone()[0] == expected_synchronous
+            assert result.rows == 2500
+            assert result.database_bytes > 0
+            assert set(User.objects.values_list('username', flat=True)) == set(usernames)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGenerateUsersCommand:
+    """ 登録済みのユーザ名と重ならないユーザを生成できるか検証 """
+
+    # 既存の主キーより後ろの通し番号で生成し、件数・速度を出力するか
+    def test_command(self):
+        # GIVEN
+        stdout = StringIO()
+        with user_exists() as user:
+            # WHEN
+            call_command('generate_users', '100', '--distribution', 'zipf', '--seed', '3', stdout=stdout)
+            # THEN
+            assert User.objects.count() == 101
+            assert not User.objects.filter(username__regex=rf'\D{user.id}$').exists()
+            assert 'generated 100 users' in stdout.getvalue()
+            assert 'database size' in stdout.getvalue()
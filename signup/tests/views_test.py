@@ -1,8 +1,17 @@
+import gzip
+import json
+import os
+import re
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.loader import get_template
+from django.test import override_settings
 from django.urls import reverse
 from django.test.client import Client
 
 from signup.models import User
+from signup.precompressed import PAGE_CACHE
 from .data.user import user_creation, user_exists
 
 
@@ -31,6 +40,44 @@ class TestIndex:
         # THEN
         assertion_helper.assert_template_used(response, 'index.html')
 
+    # 圧縮済みのページを返却し、埋め込まれたCSRFトークンで登録できるか
+    @pytest.mark.django_db
+    def test_precompressed(self):
+        # GIVEN
+        client = Client(enforce_csrf_checks=True)
+        username = 'Python'
+        with user_creation():
+            # WHEN
+            response = client.get(reverse(self.named_url), HTTP_ACCEPT_ENCODING='gzip')
+            body = gzip.decompress(response.content).decode('utf-8')
+            token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', body).group(1)
+            client.post(reverse('ユーザ登録:登録'), {'csrfmiddlewaretoken': token, 'username': username})
+            actual = User.objects.get(username=username)
+            # THEN
+            assert response['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response['Vary']
+            assert actual.username == username
+
+    # 開発時は、テンプレートファイルが更新されたときのみ描画し直すか
+    @override_settings(DEBUG=True)
+    def test_invalidate_on_template_change(self):
+        # GIVEN
+        client = Client()
+        path = get_template('index.html').origin.name
+        stat = os.stat(path)
+        client.get(reverse(self.named_url))
+        client.get(reverse(self.named_url))
+        unchanged = PAGE_CACHE.stats().misses
+        # WHEN
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        try:
+            client.get(reverse(self.named_url))
+        finally:
+            os.utime(path, (stat.st_atime, stat.st_mtime))
+        # THEN
+        assert unchanged == 1
+        assert PAGE_CACHE.stats().misses == 2
+
 
 @pytest.mark.django_db
 class TestSave:
@@ -63,6 +110,49 @@ class TestSave:
             # THEN
             assertion_helper.assert_redirect_routes(response, expected)
 
+    # 登録処理で描画しておいた結果画面を、DBへ問い合わせずに返却するか
+    def test_warm_result(self, django_capture_on_commit_callbacks, django_assert_num_queries):
+        # GIVEN
+        client = Client()
+        username = 'Python'
+        with user_creation():
+            with django_capture_on_commit_callbacks(execute=True):
+                response = client.post(reverse(self.named_url), {'username': username})
+            # WHEN
+            with django_assert_num_queries(0):
+                actual = client.get(response['Location'])
+            # THEN
+            assert f'ようこそ、{username}さん' in actual.content.decode('utf-8')
+
+    # 登録済みのユーザ名であれば、登録せずにトップ画面を返却するか
+    def test_duplicate(self, assertion_helper):
+        # GIVEN
+        client = Client()
+        expected = 409
+        with user_exists() as user:
+            # WHEN
+            response = client.post(reverse(self.named_url), {'username': user.username})
+            # THEN
+            assert response.status_code == expected
+            assertion_helper.assert_template_used(response, 'index.html')
+            assert User.objects.filter(username=user.username).count() == 1
+
+    # 同じ送信元からの登録が多すぎるときは、登録せずに429を返却するか
+    def test_rate_limit(self, settings):
+        # GIVEN
+        client = Client()
+        with user_creation():
+            responses = [
+                client.post(reverse(self.named_url), {'username': f'user{number}'})
+                for number in range(settings.SIGNUP_RATE_LIMIT_BURST)
+            ]
+            # WHEN
+            response = client.post(reverse(self.named_url), {'username': 'Python'})
+            # THEN
+            assert all(item.status_code == 302 for item in responses)
+            assert response.status_code == 429
+            assert not User.objects.filter(username='Python').exists()
+
 
 @pytest.mark.django_db
 class TestResult:
@@ -93,3 +183,250 @@ class TestResult:
             response = client.post(reverse(self.named_url, args=[user.id]))
             # THEN
             assertion_helper.assert_context_get(response, 'user', expected)
+
+
+@pytest.mark.django_db
+class TestResultBatch:
+    """ 複数のユーザ情報を1回のリクエストで取得できるか検証 """
+
+    named_url = 'ユーザ登録:登録結果API'
+
+    # 指定された順に返却し、存在しないユーザを明示するか
+    def test_batch(self):
+        # GIVEN
+        client = Client()
+        with user_exists() as user:
+            missing_id = user.id + 1
+            # WHEN
+            actual = client.get(reverse(self.named_url), {'ids': f'{missing_id},{user.id}'}).json()
+            # THEN
+            assert actual == {'results': [
+                {'id': missing_id, 'found': False},
+                {'id': user.id, 'found': True, 'username': 'Django'},
+            ]}
+
+    # 不正・多すぎるユーザIDは400を返却するか
+    @pytest.mark.parametrize('ids', ['', '1,a', ','.join(['1'] * 501)])
+    def test_invalid(self, ids):
+        # GIVEN
+        client = Client()
+        # WHEN
+        actual = client.get(reverse(self.named_url), {'ids': ids}).status_code
+        # THEN
+        assert actual == 400
+
+
+@pytest.mark.django_db
+class TestUserList:
+    """ ユーザ一覧を画面・APIで参照できるか検証 """
+
+    # APIで1ページ分のユーザ・次のページへのカーソルを返却するか
+    def test_api(self, admin_client):
+        # GIVEN
+        with user_creation():
+            User.objects.bulk_create([User(username=username) for username in ('Django', 'Python', 'Ruby')])
+            # WHEN
+            first = admin_client.get(reverse('ユーザ登録:ユーザ一覧API'), {'size': 2}).json()
+            second = admin_client.get(reverse('ユーザ登録:ユーザ一覧API'), {'size': 2, 'cursor': first['next']}).json()
+            # THEN
+            assert [user['username'] for user in first['users'] + second['users']] == ['Django', 'Python', 'Ruby']
+            assert first['previous'] is None
+            assert second['next'] is None
+
+    # 画面を逐次返却し、各ユーザの結果画面へのリンクを含むか
+    def test_view(self, admin_client):
+        # GIVEN
+        with user_exists() as user:
+            # WHEN
+            response = admin_client.get(reverse('ユーザ登録:ユーザ一覧'))
+            body = b''.join(response.streaming_content).decode('utf-8')
+            # THEN
+            assert response.streaming
+            assert reverse('ユーザ登録:登録結果', args=[user.id]) in body
+            assert body.rstrip().endswith('</html>')
+
+    # 数えたユーザ数を返却するか
+    def test_count(self, admin_client):
+        # GIVEN
+        client = Client()
+        with user_creation():
+            client.post(reverse('ユーザ登録:登録'), {'username': 'Django'})
+            # WHEN
+            actual = admin_client.get(reverse('ユーザ登録:ユーザ数API')).json()
+            # THEN
+            assert actual == {'count': 1}
+
+    # 不正なカーソル・件数であれば400を返却し、管理者以外は利用できないか
+    def test_errors(self, admin_client):
+        # GIVEN
+        url = reverse('ユーザ登録:ユーザ一覧API')
+        # WHEN
+        actual = [
+            admin_client.get(url, {'cursor': 'broken'}).status_code,
+            admin_client.get(url, {'size': 0}).status_code,
+            admin_client.get(url, {'size': 100_000}).status_code,
+            Client().get(url).status_code,
+        ]
+        # THEN
+        assert actual == [400, 400, 400, 403]
+
+
+@pytest.mark.django_db
+class TestAutocomplete:
+    """ 入力中のユーザ名に前方一致するユーザ名を参照できるか検証 """
+
+    named_url = 'ユーザ登録:ユーザ名補完'
+
+    # 前方一致するユーザ名を昇順に返却し、不正な件数・管理者以外を拒否するか
+    def test_autocomplete(self, admin_client):
+        # GIVEN
+        with user_creation():
+            User.objects.bulk_create([User(username=username) for username in ('Django', 'Deno', 'Python')])
+            # WHEN
+            actual = admin_client.get(reverse(self.named_url), {'q': 'D', 'limit': 5}).json()
+            # THEN
+            assert actual == {'prefix': 'D', 'usernames': ['Deno', 'Django']}
+            assert admin_client.get(reverse(self.named_url), {'q': 'D', 'limit': 0}).status_code == 400
+            assert Client().get(reverse(self.named_url), {'q': 'D'}).status_code == 403
+
+
+@pytest.mark.django_db
+class TestAvailability:
+    """ ユーザ名が使えるかを確認できるか検証 """
+
+    named_url = 'ユーザ登録:ユーザ名確認'
+
+    # 登録済みのユーザ名のみ、使えないと返却するか
+    def test_availability(self):
+        # GIVEN
+        client = Client()
+        expected = [
+            {'username': 'Django', 'available': False},
+            {'username': 'Python', 'available': True},
+        ]
+        with user_exists():
+            # WHEN
+            actual = [client.get(reverse(self.named_url), {'username': username}).json()
+                      for username in ('Django', 'Python')]
+            # THEN
+            assert actual == expected
+
+    # ユーザ名が無ければ400を返却するか
+    def test_bad_request(self):
+        # GIVEN
+        client = Client()
+        expected = 400
+        # WHEN
+        actual = client.get(reverse(self.named_url)).status_code
+        # THEN
+        assert actual == expected
+
+    # 管理者であれば、フィルタのメモリ使用量・判定結果の件数を参照できるか
+    def test_stats(self, admin_client):
+        # GIVEN
+        admin_client.get(reverse(self.named_url), {'username': 'Python'})
+        # WHEN
+        response = admin_client.get(reverse('ユーザ登録:ユーザ名確認統計'))
+        actual = response.json()
+        # THEN
+        assert actual['nbytes'] > 0
+        assert actual['queries'] == 1
+        assert actual['negatives'] == 1
+        assert Client().get(reverse('ユーザ登録:ユーザ名確認統計')).status_code == 403
+
+
+@pytest.mark.django_db
+class TestUserExport:
+    """ 全ユーザを書き出せるか検証 """
+
+    named_url = 'ユーザ登録:ユーザ出力'
+
+    # 管理者以外は利用できず、不正な形式は400を返却するか
+    @pytest.mark.parametrize('client_fixture, query, expected', [
+        ('client', '', 403),
+        ('admin_client', '?format=xml', 400),
+    ])
+    def test_error(self, request, client_fixture, query, expected):
+        # GIVEN
+        client = request.getfixturevalue(client_fixture)
+        # WHEN
+        actual = client.get(reverse(self.named_url) + query).status_code
+        # THEN
+        assert actual == expected
+
+    # 圧縮したCSVを添付ファイルとして逐次返却するか
+    def test_export(self, admin_client):
+        with user_exists() as user:
+            # WHEN
+            response = admin_client.get(reverse(self.named_url), {'gzip': '1'})
+            actual = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+            # THEN
+            assert response['Content-Type'] == 'application/gzip'
+            assert 'filename="users.csv.gz"' in response['Content-Disposition']
+            assert actual == f'id,username\n{user.id},Django\n'
+
+
+@pytest.mark.django_db
+class TestHookStats:
+    """ ユーザ登録後の処理の統計情報を取得できるか検証 """
+
+    # 管理者には実行を待つイベントの件数・所要時間を返却するか
+    def test_stats(self, admin_client):
+        # WHEN
+        actual = admin_client.get(reverse('ユーザ登録:登録後処理統計')).json()
+        # THEN
+        assert {'queue_depth', 'spilled_depth', 'dropped', 'latency'} <= set(actual)
+
+
+class TestPageCacheStats:
+    """ 圧縮済みのページを保持するキャッシュの統計情報を取得できるか検証 """
+
+    named_url = 'ユーザ登録:ページキャッシュ統計'
+
+    # 管理者にはヒット数・圧縮により削減した転送量を返却し、それ以外には403を返却するか
+    @pytest.mark.django_db
+    def test_stats(self, admin_client):
+        # GIVEN
+        client = Client()
+        client.get(reverse('ユーザ登録:トップ'), HTTP_ACCEPT_ENCODING='gzip')
+        client.get(reverse('ユーザ登録:トップ'), HTTP_ACCEPT_ENCODING='gzip')
+        # WHEN
+        actual = admin_client.get(reverse(self.named_url)).json()
+        # THEN
+        assert actual['hits'] == 1
+        assert actual['misses'] == 1
+        assert actual['bytes_saved'] > 0
+        assert client.get(reverse(self.named_url)).status_code == 403
+
+
+@pytest.mark.django_db
+class TestBulkImport:
+    """ アップロードしたファイルからユーザ情報を一括登録できるか検証 """
+
+    named_url = 'ユーザ登録:一括登録'
+
+    # 管理者以外は利用できないか
+    def test_forbidden(self):
+        # GIVEN
+        client = Client()
+        upload = SimpleUploadedFile('users.csv', b'Django\n')
+        expected = 403
+        # WHEN
+        actual = client.post(reverse(self.named_url), {'file': upload}).status_code
+        # THEN
+        assert actual == expected
+
+    # バッチごとの登録結果をNDJSONで逐次返却するか
+    def test_import(self, admin_client):
+        # GIVEN
+        upload = SimpleUploadedFile('users.csv', b'username\nDjango\nPython\n\xe3\x81\x82\n')
+        expected_usernames = ['Django', 'Python', 'あ']
+        with user_creation():
+            # WHEN
+            response = admin_client.post(reverse(self.named_url), {'file': upload, 'batch_size': '2'})
+            progress = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            actual_usernames = sorted(User.objects.values_list('username', flat=True))
+            # THEN
+            assert [record.get('total_inserted') for record in progress] == [2, 3, 3]
+            assert progress[-1]['done'] is True
+            assert actual_usernames == expected_usernames